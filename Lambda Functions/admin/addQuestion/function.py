@@ -1,84 +1,196 @@
-import json
-import boto3
-import os
- 
-dynamodb = boto3.resource('dynamodb')
-table_name = os.environ.get('QUESTION_TABLE', 'QuestionBank')
-table = dynamodb.Table(table_name)
- 
-def lambda_handler(event, context):
-    try:
- 
-        # --- Authorization check ---
-        claims = event['requestContext']['authorizer']['claims']
-        groups = claims.get('cognito:groups', '')
- 
-        if not groups:
-            return {
-                "statusCode": 403,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                    "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-                },
-                "body": json.dumps({"error": "Access denied: No group found in token"})
-            }
- 
-        if 'Admins' not in groups:
-            return {
-                "statusCode": 403,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                    "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-                },
-                "body": json.dumps({"error": "Access denied: Admins only"})
-            }
- 
-        # --- Parse request body ---
-        body = json.loads(event['body'])
-        question_id = body.get('question_id')
-        question_text = body.get('question_text')
-        options = body.get('options')
-        answer = body.get('answer')
- 
-        if not (question_id and question_text and options and answer):
-            return {
-                "statusCode": 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                    "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-                },
-                "body": json.dumps({"error": "Invalid input: Missing required fields"})
-            }
- 
-        # --- Save to DynamoDB ---
-        table.put_item(Item={
-            'question_id': question_id,
-            'question_text': question_text,
-            'options': options,
-            'answer': answer
-        })
- 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            "body": json.dumps({"message": "Question added successfully"})
-        }
- 
-    except Exception as e:
-        print("Error:", str(e))
-        return {
-            "statusCode": 500,
-            "headers": {                             
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            "body": json.dumps({"error": str(e)})
-        }
+import csv
+import io
+import json
+from quiz_common.aws import lazy_table
+from quiz_common.batch import batch_get, batch_write
+from quiz_common.cache import bump_catalog_version
+from quiz_common.metrics import instrumented, phase
+from quiz_common.quiz_sync import sync_quizzes
+from quiz_common.responses import request_header, request_text, response
+from quiz_common.search import update_index
+from quiz_common.summary import add_counts
+ 
+table = lazy_table('QuestionBank')
+index_table = lazy_table('QuestionIndex')
+meta_table = lazy_table('QuizMeta')
+quiz_table = lazy_table('Quizzes')
+snapshot_table = lazy_table('QuizSnapshots')
+ 
+MAX_BULK_QUESTIONS = 5000
+ 
+# Returns an error message for an invalid question, else None
+def validate_question(question):
+    if not isinstance(question, dict):
+        return "Invalid input: question must be an object"
+    if not (question.get('question_id') and question.get('question_text')
+            and question.get('options') and question.get('answer')):
+        return "Invalid input: Missing required fields"
+    if not isinstance(question['options'], dict):
+        return "Invalid input: options must be an object"
+    if question['answer'] not in question['options'].values():
+        return "Invalid input: answer must be one of the options"
+    return None
+ 
+def question_item(question):
+    item = {
+        'question_id': str(question['question_id']),
+        'question_text': question['question_text'],
+        'options': question['options'],
+        'answer': question['answer']
+    }
+    if question.get('topic'):
+        item['topic'] = question['topic']
+    return item
+ 
+# CSV columns: question_id, question_text, answer, optional topic and one
+# option_<key> column per option (option_A, option_B, ...). Empty option
+# cells are skipped so questions can have different option counts.
+def parse_csv(text):
+    questions = []
+    for row in csv.DictReader(io.StringIO(text)):
+        options = {}
+        for column, value in row.items():
+            if column and column.startswith('option_') and value:
+                options[column[len('option_'):]] = value
+        questions.append({
+            'question_id': row.get('question_id'),
+            'question_text': row.get('question_text'),
+            'options': options,
+            'answer': row.get('answer'),
+            'topic': row.get('topic'),
+        })
+    return questions
+ 
+# Bulk requests are a CSV body, a JSON array or {"questions": [...]} and
+# come back as a list; anything else is returned as the single question body
+def parse_body(event):
+    raw = request_text(event)
+ 
+    if (request_header(event, 'Content-Type') or '').lower().startswith('text/csv'):
+        return parse_csv(raw)
+ 
+    body = json.loads(raw)
+    if isinstance(body, list):
+        return body
+    if isinstance(body, dict) and isinstance(body.get('questions'), list):
+        return body['questions']
+    return body
+ 
+# Validate every row, keep the first occurrence of each question_id and write
+# the rest in BatchWriteItem calls. Bad rows are reported, not fatal. Rows
+# that replace an existing question only move the search postings that
+# changed, are not counted as new and are synced into the quizzes using
+# them, so the old items are read first.
+def import_questions(questions):
+    failed = []
+    rows = {}
+    requests = []
+ 
+    for index, question in enumerate(questions):
+        error = validate_question(question)
+        if not error and str(question['question_id']) in rows:
+            error = "Duplicate question_id in request"
+        if error:
+            question_id = question.get('question_id') if isinstance(question, dict) else None
+            failed.append({"row": index, "question_id": question_id, "error": error})
+            continue
+ 
+        item = question_item(question)
+        rows[item['question_id']] = index
+        requests.append({'PutRequest': {'Item': item}})
+ 
+    previous = batch_get(table, list(rows), 'question_id')
+    write_failures = batch_write(table, requests, 'question_id')
+    for question_id, error in write_failures.items():
+        failed.append({"row": rows[question_id], "question_id": question_id, "error": error})
+ 
+    written = [
+        request['PutRequest']['Item'] for request in requests
+        if request['PutRequest']['Item']['question_id'] not in write_failures
+    ]
+    index_questions([(item['question_id'], previous.get(item['question_id']), item) for item in written])
+    count_questions(sum(1 for item in written if item['question_id'] not in previous))
+    sync_replaced([(previous[item['question_id']], item) for item in written if item['question_id'] in previous])
+ 
+    failed.sort(key=lambda f: f['row'])
+    return len(requests) - len(write_failures), failed
+ 
+# A failed posting only hides the question from search until the next
+# reindex (viewQuestions PUT {"reindex": true}), so it is logged, not fatal
+def index_questions(changes):
+    failures = update_index(index_table, changes)
+    if failures:
+        print("Index update failed for", len(failures), "postings:", list(failures.items())[:5])
+ 
+# Quizzes compile the answer key, choices and snapshot from their questions,
+# so a replaced question is passed on with the fields that differ
+def sync_replaced(pairs):
+    updates = []
+    for old, item in pairs:
+        changed = {k: item.get(k) for k in set(old) | set(item) if old.get(k) != item.get(k)}
+        if changed:
+            updates.append(dict(changed, question_id=item['question_id']))
+    if updates:
+        sync_quizzes(quiz_table, table, snapshot_table, updates=updates)
+ 
+# The dashboard counter is informational: a failure is logged, not returned
+def count_questions(added):
+    try:
+        add_counts(meta_table, questions=added)
+    except Exception as e:
+        print("Error updating summary:", str(e))
+ 
+@instrumented('addQuestion')
+def lambda_handler(event, context):
+    try:
+ 
+        # --- Authorization check ---
+        with phase('auth'):
+            claims = event['requestContext']['authorizer']['claims']
+            groups = claims.get('cognito:groups', '')
+ 
+            if not groups:
+                return response(403, {"error": "Access denied: No group found in token"})
+ 
+            if 'Admins' not in groups:
+                return response(403, {"error": "Access denied: Admins only"})
+ 
+        # --- Bulk import ---
+        body = parse_body(event)
+        if isinstance(body, list):
+            questions = body
+            if len(questions) > MAX_BULK_QUESTIONS:
+                return response(400, {"error": f"Invalid input: at most {MAX_BULK_QUESTIONS} questions per request"})
+ 
+            with phase('write'):
+                imported, failed = import_questions(questions)
+                if imported:
+                    bump_catalog_version(meta_table)
+ 
+            return response(200, {
+                "message": f"{imported} of {len(questions)} questions imported",
+                "imported": imported,
+                "failed": failed
+            })
+ 
+        # --- Single question ---
+        error = validate_question(body)
+        if error:
+            return response(400, {"error": error})
+ 
+        # --- Save to DynamoDB ---
+        with phase('write'):
+            item = question_item(body)
+            old = table.put_item(Item=item, ReturnValues='ALL_OLD').get('Attributes')
+            index_questions([(item['question_id'], old, item)])
+            if old is None:
+                count_questions(1)
+            else:
+                sync_replaced([(old, item)])
+            bump_catalog_version(meta_table)
+ 
+        return response(200, {"message": "Question added successfully"})
+ 
+    except Exception as e:
+        print("Error:", str(e))
+        return response(500, {"error": str(e)})
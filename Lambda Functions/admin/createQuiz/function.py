@@ -1,84 +1,146 @@
-import json
-import boto3
-import uuid
-from datetime import datetime
- 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('Quizzes')
- 
-def lambda_handler(event, context):
-    try:
-        # Authorization
-        claims = event['requestContext']['authorizer']['claims']
-        groups = claims.get('cognito:groups', '')
- 
-        if not groups or 'Admins' not in groups:
-            return {
-                'statusCode': 403,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                    "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-                },
-                'body': json.dumps({'error': 'Access denied: Admins only'})
-            }
- 
-        # Parse input
-        body = json.loads(event['body'])
-        title = body.get('title')
-        topic = body.get('topic')
-        duration = body.get('duration')
-        marks = body.get('marks')
-        question_ids = body.get('question_ids', [])
- 
-        if not (title and topic and duration and marks and question_ids):
-            return {
-                'statusCode': 400,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                    "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-                },
-                'body': json.dumps({'error': 'Missing required fields'})
-            }
- 
-        quiz_id = f"quiz-{str(uuid.uuid4())[:8]}"
-        created_at = datetime.utcnow().isoformat()
- 
-        # Save quiz to DynamoDB
-        table.put_item(
-            Item={
-                'quiz_id': quiz_id,
-                'title': title,
-                'topic': topic,
-                'duration': duration,
-                'marks': marks,
-                'question_ids': question_ids,
-                'created_at': created_at
-            }
-        )
- 
-        return {
-            'statusCode': 200,
-            "headers": {   
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            'body': json.dumps({
-                'message': 'Quiz created successfully',
-                'quiz_id': quiz_id
-            })
-        }
- 
-    except Exception as e:
-        print("Error:", str(e))
-        return {
-            'statusCode': 500,
-            "headers": {   
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            'body': json.dumps({'error': str(e)})
-        }
+import uuid
+from datetime import datetime
+from quiz_common.answers import compile_answer_key
+from quiz_common.aws import lazy_table
+from quiz_common.batch import batch_get, batch_write
+from quiz_common.cache import bump_catalog_version
+from quiz_common.metrics import instrumented, phase
+from quiz_common.pagination import decode_token, encode_token
+from quiz_common.pools import MAX_POOLS, pool_items, topic_question_ids
+from quiz_common.snapshots import publish_snapshot, publish_snapshots
+from quiz_common.summary import add_counts
+from quiz_common.responses import json_body, response
+ 
+table = lazy_table('Quizzes')
+question_table = lazy_table('QuestionBank')
+index_table = lazy_table('QuestionIndex')
+meta_table = lazy_table('QuizMeta')
+snapshot_table = lazy_table('QuizSnapshots')
+ 
+REBUILD_PAGE_SIZE = 25     # quizzes snapshotted per rebuild call
+ 
+ 
+# pools is a list of {"topic": ..., "count": N}: every student gets N
+# questions drawn from the questions of that topic. Returns the stored pool
+# specs and the member ids of each pool.
+def resolve_pools(pools):
+    if not isinstance(pools, list) or len(pools) > MAX_POOLS:
+        raise ValueError(f'pools must be a list of at most {MAX_POOLS} entries')
+    specs, members = [], []
+    for spec in pools:
+        topic = spec.get('topic') if isinstance(spec, dict) else None
+        count = spec.get('count') if isinstance(spec, dict) else None
+        if not topic or not isinstance(count, int) or count < 1:
+            raise ValueError('Each pool needs a topic and a positive count')
+        question_ids = topic_question_ids(index_table, topic)
+        if len(question_ids) < count:
+            raise ValueError(f"Pool '{topic}' has only {len(question_ids)} questions")
+        specs.append({'topic': topic, 'count': count, 'size': len(question_ids)})
+        members.append(question_ids)
+    return specs, members
+ 
+ 
+# Publish snapshots for one page of Quizzes. Run once after creating the
+# QuizSnapshots table, repeating with next_token until it is null;
+# re-running is harmless.
+def rebuild_snapshots(next_token):
+    kwargs = {'Limit': REBUILD_PAGE_SIZE, 'ProjectionExpression': 'quiz_id'}
+    start_key = decode_token(next_token)
+    if start_key:
+        kwargs['ExclusiveStartKey'] = start_key
+    page = table.scan(**kwargs)
+    quiz_ids = [item['quiz_id'] for item in page.get('Items', [])]
+    statuses = publish_snapshots(snapshot_table, table, question_table, quiz_ids)
+    if quiz_ids:
+        bump_catalog_version(meta_table)
+    return {
+        'published': sum(1 for s in statuses.values() if s == 'published'),
+        'pooled': sum(1 for s in statuses.values() if s == 'pooled'),
+        'failed': {qid: s for qid, s in statuses.items() if s not in ('published', 'pooled', 'missing')},
+        'next_token': encode_token(page.get('LastEvaluatedKey')),
+    }
+ 
+@instrumented('createQuiz')
+def lambda_handler(event, context):
+    try:
+        # Authorization
+        with phase('auth'):
+            claims = event['requestContext']['authorizer']['claims']
+            groups = claims.get('cognito:groups', '')
+ 
+            if not groups or 'Admins' not in groups:
+                return response(403, {'error': 'Access denied: Admins only'})
+ 
+        # Parse input
+        body = json_body(event)
+        if body.get('rebuild'):
+            with phase('write'):
+                result = rebuild_snapshots(body.get('next_token'))
+            return response(200, result)
+ 
+        title = body.get('title')
+        topic = body.get('topic')
+        duration = body.get('duration')
+        marks = body.get('marks')
+        question_ids = body.get('question_ids', [])
+        pools = body.get('pools', [])
+ 
+        if not (title and topic and duration and marks and (question_ids or pools)):
+            return response(400, {'error': 'Missing required fields'})
+ 
+        quiz_id = f"quiz-{str(uuid.uuid4())[:8]}"
+        created_at = datetime.utcnow().isoformat()
+        with phase('read'):
+            try:
+                pool_specs, pool_members = resolve_pools(pools)
+                members = pool_items(quiz_id, pool_members)
+            except ValueError as e:
+                return response(400, {'error': str(e)})
+            # Pooled questions are graded from QuestionBank at submit time,
+            # so the compiled key only covers the fixed questions
+            questions = batch_get(question_table, question_ids, 'question_id')
+            answer_key, correct_answers, choices = compile_answer_key(question_ids, questions)
+ 
+        item = {
+            'quiz_id': quiz_id,
+            'title': title,
+            'topic': topic,
+            'duration': duration,
+            'marks': marks,
+            'question_ids': question_ids,
+            'answer_key': answer_key,
+            'correct_answers': correct_answers,
+            'choices': choices,
+            'created_at': created_at
+        }
+        if pool_specs:
+            item['pools'] = pool_specs
+            item['question_count'] = len(question_ids) + sum(s['count'] for s in pool_specs)
+ 
+        # Save quiz to DynamoDB; pool members first, so a visible quiz always
+        # has them
+        with phase('write'):
+            failures = batch_write(meta_table, [{'PutRequest': {'Item': m}} for m in members], 'meta_key')
+            if failures:
+                raise Exception(f'Could not save question pools: {failures}')
+            table.put_item(Item=item)
+            # getQuizQuestions builds the body itself until a snapshot exists
+            if not pool_specs:
+                try:
+                    publish_snapshot(snapshot_table, item, questions)
+                except Exception as e:
+                    print("Error publishing snapshot:", str(e))
+            bump_catalog_version(meta_table)
+            try:
+                add_counts(meta_table, quizzes=1)
+            except Exception as e:
+                print("Error updating summary:", str(e))
+ 
+        return response(200, {
+            'message': 'Quiz created successfully',
+            'quiz_id': quiz_id
+        })
+ 
+    except Exception as e:
+        print("Error:", str(e))
+        return response(500, {'error': str(e)})
@@ -0,0 +1,186 @@
+import heapq
+import os
+from quiz_common import responses
+from quiz_common.aws import lazy_client, lazy_table
+from quiz_common.batch import batch_get
+from quiz_common.metrics import instrumented, phase
+from quiz_common.pagination import decode_token, encode_token
+from quiz_common.summary import RECENT_SUBMISSIONS, read_summary, write_summary
+ 
+cognito_client = lazy_client("cognito-idp")
+question_table = lazy_table("QuestionBank")
+quiz_table = lazy_table("Quizzes")
+results_table = lazy_table("Results")
+meta_table = lazy_table("QuizMeta")
+ 
+REBUILD_KEY = "summary#rebuild"
+REBUILD_TABLES = ("QuestionBank", "Quizzes", "Results")
+COUNTED_TABLES = {"QuestionBank": ("questions", question_table), "Quizzes": ("quizzes", quiz_table)}
+REBUILD_PAGE_SIZE = 1000    # Results per call
+ 
+ 
+# Cognito keeps an estimate of the pool size, so counting users does not
+# need the full listing viewUsers does
+def user_count():
+    user_pool_id = os.environ.get("USER_POOL_ID")
+    if not user_pool_id:
+        return None
+    pool = cognito_client.describe_user_pool(UserPoolId=user_pool_id)["UserPool"]
+    return pool.get("EstimatedNumberOfUsers", 0)
+ 
+ 
+def max_score(quiz):
+    marks = int(quiz.get("marks_per_question", 1))
+    if quiz.get("pools"):
+        return int(quiz.get("question_count", 0)) * marks
+    return len(quiz.get("answer_key") or quiz.get("question_ids", [])) * marks
+ 
+ 
+def new_rebuild():
+    return {
+        "meta_key": REBUILD_KEY,
+        "counts": {"questions": 0, "quizzes": 0, "attempts": 0, "score_sum": 0, "max_score_sum": 0},
+        "latest": [],
+        "cursor": None,
+    }
+ 
+ 
+# Count one page of QuestionBank or Quizzes
+def count_page(counter, table, state, start_key):
+    kwargs = {"Select": "COUNT"}
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    page = table.scan(**kwargs)
+    state["counts"][counter] += page["Count"]
+    return page.get("LastEvaluatedKey")
+ 
+ 
+# Add one page of Results to the counters and keep the latest submissions
+def results_page(state, start_key):
+    kwargs = {
+        "Limit": REBUILD_PAGE_SIZE,
+        "ProjectionExpression": "result_id, quiz_id, user_email, user_name, score, submitted_at",
+    }
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    page = results_table.scan(**kwargs)
+    results = page.get("Items", [])
+    quizzes = batch_get(
+        quiz_table, list({result["quiz_id"] for result in results}), "quiz_id",
+        projection=("quiz_id", "title", "question_ids", "answer_key", "marks_per_question",
+                    "pools", "question_count")
+    )
+ 
+    counts = state["counts"]
+    latest = [(entry.get("submitted_at") or "", entry["result_id"], entry) for entry in state["latest"]]
+    heapq.heapify(latest)
+    for result in results:
+        quiz = quizzes.get(result["quiz_id"], {})
+        counts["attempts"] += 1
+        counts["score_sum"] += result.get("score", 0)
+        counts["max_score_sum"] += max_score(quiz)
+        entry = dict(result, quiz_title=quiz.get("title"), max_score=max_score(quiz))
+        item = (result.get("submitted_at") or "", result["result_id"], entry)
+        if len(latest) < RECENT_SUBMISSIONS:
+            heapq.heappush(latest, item)
+        else:
+            heapq.heappushpop(latest, item)
+    state["latest"] = [entry for _, _, entry in latest]
+    return page.get("LastEvaluatedKey")
+ 
+ 
+def write_rebuilt(state):
+    counts = state["counts"]
+    # Number the latest submissions so new ones continue the sequence
+    latest = sorted(state["latest"], key=lambda e: (e.get("submitted_at") or "", e["result_id"]), reverse=True)
+    for offset, entry in enumerate(latest):
+        entry["seq"] = counts["attempts"] - offset
+    write_summary(meta_table, counts, latest)
+ 
+ 
+# Recount everything from the tables, for the first deployment of the
+# counters or after they drift: one page of QuestionBank, Quizzes or
+# Results per call, repeated with the returned next_token until it is null.
+# The running counts are staged in QuizMeta under summary#rebuild together
+# with the token the next call has to bring, so a retried call does not
+# count its page twice. Submissions made while it runs can be missed, so
+# run it when the site is quiet.
+def rebuild_page(next_token):
+    cursor = decode_token(next_token)
+    if cursor is None:
+        state = new_rebuild()
+        cursor = {"table": REBUILD_TABLES[0]}
+    else:
+        state = meta_table.get_item(Key={"meta_key": REBUILD_KEY}, ConsistentRead=True).get("Item")
+        if state and state.get("applied") == next_token:
+            # This page was counted already; its response was lost
+            return {"counts": state["counts"], "next_token": state["cursor"]}
+        if not state or state.get("cursor") != next_token:
+            raise ValueError("next_token does not belong to the rebuild in progress")
+ 
+    table = cursor["table"]
+    start_key = cursor.get("key")
+    if table == "Results":
+        last_key = results_page(state, start_key)
+    else:
+        counter, counted = COUNTED_TABLES[table]
+        last_key = count_page(counter, counted, state, start_key)
+ 
+    if last_key:
+        following = {"table": table, "key": last_key}
+    elif table != REBUILD_TABLES[-1]:
+        following = {"table": REBUILD_TABLES[REBUILD_TABLES.index(table) + 1]}
+    else:
+        following = None
+ 
+    if following is None:
+        write_rebuilt(state)
+ 
+    state["applied"] = next_token
+    state["cursor"] = encode_token(following)
+    condition = {}
+    if next_token:
+        # Two runners of the same rebuild must not both count this page
+        condition = {"ConditionExpression": "#cursor = :token",
+                     "ExpressionAttributeNames": {"#cursor": "cursor"},
+                     "ExpressionAttributeValues": {":token": next_token}}
+    meta_table.put_item(Item=state, **condition)
+    return {"counts": state["counts"], "next_token": state["cursor"]}
+ 
+ 
+# GET → counters, average score and the latest submissions in a couple of
+# reads; POST {"rebuild": true, "next_token": ...} recounts them from the
+# tables a page at a time
+@instrumented("dashboardSummary")
+def lambda_handler(event, context):
+    try:
+        with phase("auth"):
+            claims = event["requestContext"]["authorizer"]["claims"]
+            groups = claims.get("cognito:groups", "")
+            if "Admins" not in groups:
+                return response(403, {"error": "Access denied: Admins only"})
+ 
+        if event["httpMethod"] == "POST":
+            body = responses.json_body(event)
+            if not body.get("rebuild"):
+                return response(400, {"error": "Unsupported request"})
+            try:
+                with phase("read"):
+                    result = rebuild_page(body.get("next_token"))
+            except ValueError as e:
+                return response(400, {"error": str(e)})
+            message = "Summary rebuilt" if result["next_token"] is None else "Summary rebuild in progress"
+            return response(200, dict(result, message=message))
+ 
+        with phase("read"):
+            summary = read_summary(meta_table)
+            summary["users"] = user_count()
+        return response(200, summary)
+ 
+    except Exception as e:
+        print("Error:", str(e))
+        return response(500, {"error": str(e)})
+ 
+ 
+def response(status, body):
+    return responses.response(status, body, methods="GET, POST, OPTIONS")
@@ -0,0 +1,36 @@
+from quiz_common import responses
+from quiz_common.aws import lazy_table
+from quiz_common.metrics import instrumented, phase
+from quiz_common.stats import read_quiz_stats
+ 
+meta_table = lazy_table("QuizMeta")
+ 
+ 
+# GET ?quiz_id= → aggregate stats and leaderboard maintained by submitQuiz
+@instrumented("quizStats")
+def lambda_handler(event, context):
+    try:
+        with phase("auth"):
+            claims = event["requestContext"]["authorizer"]["claims"]
+            groups = claims.get("cognito:groups", "")
+            if "Admins" not in groups:
+                return response(403, {"error": "Access denied: Admins only"})
+ 
+        quiz_id = (event.get("queryStringParameters") or {}).get("quiz_id")
+        if not quiz_id:
+            return response(400, {"error": "quiz_id is required"})
+ 
+        with phase("read"):
+            stats = read_quiz_stats(meta_table, quiz_id)
+        if stats is None:
+            return response(404, {"error": "No attempts recorded for this quiz"})
+ 
+        return response(200, stats)
+ 
+    except Exception as e:
+        print("Error:", str(e))
+        return response(500, {"error": str(e)})
+ 
+ 
+def response(status, body):
+    return responses.response(status, body, methods="GET, OPTIONS")
@@ -0,0 +1,473 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Attr, Key
+from quiz_common import responses
+from quiz_common.answers import AnswerDecoder, normalize_answer
+from quiz_common.aws import lazy_table
+from quiz_common.metrics import instrumented, phase
+from quiz_common.stats import (LIVE_MARK, apply_rebuilt_stats, fence_quiz_stats, histogram_bucket,
+                               merge_leaderboard)
+ 
+# NumPy is optional: add it to the layer for large regrades, the pure Python
+# path gives the same scores
+try:
+    import numpy as np
+except ImportError:
+    np = None
+ 
+quiz_table = lazy_table("Quizzes")
+results_table = lazy_table("Results")
+meta_table = lazy_table("QuizMeta")
+ 
+REGRADE_SEGMENTS = int(os.environ.get("REGRADE_SEGMENTS", 8))
+REGRADE_MIN_REMAINING_MS = int(os.environ.get("REGRADE_MIN_REMAINING_MS", 10000))
+MAX_QUIZZES_PER_JOB = 50    # keeps the quiz_id IN (...) filter and checkpoint small
+WRITE_WORKERS = 4           # score updates in flight per segment
+QUIZ_INDEX = os.environ.get("RESULTS_QUIZ_INDEX", "quiz_id-submitted_at-index")
+# Longer than a submission takes from submitted_at to its stats update
+# (including a short submission queue backlog)
+REGRADE_FENCE_MARGIN_SECONDS = int(os.environ.get("REGRADE_FENCE_MARGIN_SECONDS", 300))
+ 
+JOB_PREFIX = "regrade#"
+ 
+ 
+# Grades results of one quiz against its current answer key. Answers are
+# encoded as per-question indices (0 is the correct answer, unknown strings
+# get the next free index), so a batch of results becomes an integer matrix
+# compared against the key in one operation.
+class Grader:
+    def __init__(self, quiz):
+        answer_key = quiz["answer_key"]
+        self.question_ids = [qid for qid in quiz.get("question_ids", []) if qid in answer_key]
+        self.marks = int(quiz.get("marks_per_question", 1))
+        self.max_score = len(answer_key) * self.marks
+        # Per question: raw answer → index, seeded with the correct answer
+        self._vocab = [{} for _ in self.question_ids]
+        self._correct = [answer_key[qid] for qid in self.question_ids]
+ 
+    def _index(self, column, raw):
+        if not isinstance(raw, str):
+            # Stored answers can be lists or maps, which cannot key the
+            # vocabulary; they grade by their string form as in submitQuiz
+            raw = str(raw)
+        vocab = self._vocab[column]
+        index = vocab.get(raw)
+        if index is None:
+            normalized = normalize_answer(raw)
+            index = 0 if normalized == self._correct[column] else len(vocab) + 1
+            vocab[raw] = index
+        return index
+ 
+    def encode(self, answers):
+        return [self._index(c, answers.get(qid, "")) for c, qid in enumerate(self.question_ids)]
+ 
+    # Returns (scores, correct counts per question) for a list of answer maps
+    def grade(self, answer_maps):
+        rows = [self.encode(answers) for answers in answer_maps]
+        if not rows or not self.question_ids:
+            return [0] * len(rows), [0] * len(self.question_ids)
+ 
+        if np is not None:
+            correct = np.asarray(rows, dtype=np.int32) == 0
+            scores = correct.sum(axis=1) * self.marks
+            return scores.tolist(), correct.sum(axis=0).tolist()
+ 
+        per_question = [0] * len(self.question_ids)
+        scores = []
+        for row in rows:
+            hits = 0
+            for column, index in enumerate(row):
+                if index == 0:
+                    hits += 1
+                    per_question[column] += 1
+            scores.append(hits * self.marks)
+        return scores, per_question
+ 
+ 
+def empty_totals(grader):
+    return {
+        "attempts": 0, "score_sum": 0, "min_score": None, "max_score": None,
+        "histogram": {}, "correct": {qid: 0 for qid in grader.question_ids},
+        "leaderboard": [], "score_change": 0,
+    }
+ 
+ 
+def merge_totals(totals, other):
+    totals["attempts"] += other["attempts"]
+    totals["score_sum"] += other["score_sum"]
+    totals["score_change"] += other["score_change"]
+    for bound, pick in (("min_score", min), ("max_score", max)):
+        values = [v for v in (totals[bound], other[bound]) if v is not None]
+        totals[bound] = pick(values) if values else None
+    for bucket, n in other["histogram"].items():
+        totals["histogram"][bucket] = totals["histogram"].get(bucket, 0) + n
+    for qid, n in other["correct"].items():
+        totals["correct"][qid] = totals["correct"].get(qid, 0) + n
+    totals["leaderboard"] = merge_leaderboard(totals["leaderboard"], other["leaderboard"])
+ 
+ 
+# The score a result had before job_id first rewrote it
+def original_score(result, job_id):
+    if result.get("regrade_job") == job_id:
+        return result["score_before_regrade"]
+    return result.get("score", 0)
+ 
+ 
+# Grade a page of results: returns the score changes to write (the score
+# read, the new one and the original score the job marks the result with,
+# so a chunk re-run after a crash still knows how much it changed them) and
+# each quiz's totals, where score_change is the change in the sum of scores
+def grade_page(items, graders, decoder, job_id):
+    by_quiz = {}
+    for item in items:
+        by_quiz.setdefault(item["quiz_id"], []).append(item)
+ 
+    changed, page_totals = [], {}
+    for quiz_id, results in by_quiz.items():
+        grader = graders[quiz_id]
+        scores, per_question = grader.grade(decoder.answers(results))
+ 
+        totals = page_totals[quiz_id] = empty_totals(grader)
+        totals["attempts"] = len(results)
+        totals["score_sum"] = sum(scores)
+        totals["min_score"] = min(scores)
+        totals["max_score"] = max(scores)
+        totals["correct"] = dict(zip(grader.question_ids, per_question))
+        totals["score_change"] = sum(score - original_score(r, job_id) for r, score in zip(results, scores))
+        for score in scores:
+            bucket = str(histogram_bucket(score, grader.max_score))
+            totals["histogram"][bucket] = totals["histogram"].get(bucket, 0) + 1
+        totals["leaderboard"] = merge_leaderboard([], [
+            {
+                "user_email": r.get("user_email"),
+                "user_name": r.get("user_name"),
+                "result_id": r["result_id"],
+                "submitted_at": r.get("submitted_at"),
+                "score": score,
+            }
+            for r, score in zip(results, scores)
+        ])
+ 
+        for result, score in zip(results, scores):
+            if result.get("score") != score:
+                changed.append({
+                    "result_id": result["result_id"],
+                    "quiz_id": quiz_id,
+                    "score_read": result.get("score"),
+                    "score": score,
+                    "regrade_job": job_id,
+                    "score_before_regrade": original_score(result, job_id),
+                })
+ 
+    return changed, page_totals
+ 
+ 
+# Write back changed scores and return (written, failed ids, skipped ids).
+# Only the score fields are set, and only while the result still has the
+# score that was graded: a result whose score changed since it was read is
+# skipped and keeps it, other writes to the item (a submitted_at backfill)
+# are left alone.
+def write_changed(changed):
+    client = results_table.meta.client
+    conditional_failed = client.exceptions.ConditionalCheckFailedException
+    regraded_at = datetime.utcnow().isoformat()
+ 
+    def write(change):
+        kwargs = {
+            "TableName": results_table.name,
+            "Key": {"result_id": change["result_id"]},
+            "UpdateExpression": "SET score = :score, regrade_job = :job, "
+                                "score_before_regrade = :before, regraded_at = :at",
+            "ExpressionAttributeValues": {
+                ":score": change["score"], ":job": change["regrade_job"],
+                ":before": change["score_before_regrade"], ":at": regraded_at,
+            },
+        }
+        if change["score_read"] is None:
+            kwargs["ConditionExpression"] = "attribute_exists(result_id) AND attribute_not_exists(score)"
+        else:
+            kwargs["ConditionExpression"] = "score = :read"
+            kwargs["ExpressionAttributeValues"][":read"] = change["score_read"]
+        try:
+            client.update_item(**kwargs)
+            return "written"
+        except conditional_failed:
+            return "skipped"
+        except Exception as e:
+            print("Could not write score of", change["result_id"], str(e))
+            return "failed"
+ 
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as pool:
+        outcomes = list(pool.map(write, changed))
+    failed = [c["result_id"] for c, outcome in zip(changed, outcomes) if outcome == "failed"]
+    skipped = [c["result_id"] for c, outcome in zip(changed, outcomes) if outcome == "skipped"]
+    return outcomes.count("written"), failed, skipped
+ 
+ 
+def add_totals(totals, more):
+    for quiz_id, quiz_totals in more.items():
+        if quiz_id in totals:
+            merge_totals(totals[quiz_id], quiz_totals)
+        else:
+            totals[quiz_id] = quiz_totals
+ 
+ 
+# Scan one segment from start_key, regrading page by page and writing back
+# changed scores, until it is finished or the invocation runs low on time.
+# Only results submitted before counted_until go into the totals; later
+# ones are counted by finish_quiz, and those marked live by submitQuiz.
+# Returns (next_key, scanned, changed, failed, skipped, totals by quiz).
+def regrade_segment(client, segment, total_segments, start_key, filters, graders, decoder,
+                    job_id, counted_until, time_left):
+    scanned = changed_count = skipped_count = 0
+    failed = []
+    totals = {}
+    key = start_key
+    while True:
+        kwargs = dict(filters, TableName=results_table.name, Segment=segment,
+                      TotalSegments=total_segments)
+        if key:
+            kwargs["ExclusiveStartKey"] = key
+        page = client.scan(**kwargs)
+        items = page.get("Items", [])
+        scanned += len(items)
+ 
+        counted, later = [], []
+        for item in items:
+            if (item.get("submitted_at") or "") < counted_until and item.get(LIVE_MARK) != job_id:
+                counted.append(item)
+            else:
+                later.append(item)
+        changed, page_totals = grade_page(counted, graders, decoder, job_id)
+        changed_later, _ = grade_page(later, graders, decoder, job_id)
+        written, failures, skipped = write_changed(changed + changed_later)
+        changed_count += written
+        skipped_count += len(skipped)
+        failed.extend(failures)
+        uncount_failed(page_totals, changed, failures + skipped)
+        add_totals(totals, page_totals)
+ 
+        key = page.get("LastEvaluatedKey")
+        if not key or time_left() < REGRADE_MIN_REMAINING_MS:
+            return key, scanned, changed_count, failed, skipped_count, totals
+ 
+ 
+def load_graders(quiz_ids):
+    graders, skipped = {}, {}
+    for quiz_id in quiz_ids:
+        quiz = quiz_table.get_item(Key={"quiz_id": quiz_id}).get("Item")
+        if not quiz:
+            skipped[quiz_id] = "Quiz not found"
+        elif "answer_key" not in quiz:
+            # Compiled on the quiz's first submission; until then there is
+            # nothing stored to regrade against
+            skipped[quiz_id] = "Quiz has no compiled answer key yet"
+        elif quiz.get("pools"):
+            # Each student answered their own draw, which the column-per-question
+            # grader does not model
+            skipped[quiz_id] = "Quizzes with question pools are not regraded"
+        else:
+            graders[quiz_id] = Grader(quiz)
+    return graders, skipped
+ 
+ 
+def new_job(quiz_ids):
+    return {
+        "meta_key": f"{JOB_PREFIX}{uuid.uuid4().hex[:12]}",
+        "quiz_ids": quiz_ids,
+        "segments": REGRADE_SEGMENTS,
+        "pending": {str(segment): None for segment in range(REGRADE_SEGMENTS)},
+        "totals": {},
+        "scanned": 0,
+        "changed": 0,
+        "failed": [],
+        "skipped_results": 0,
+        "status": "running",
+        "started_at": datetime.utcnow().isoformat(),
+    }
+ 
+ 
+# Results submitted from here on are read through the quiz index when the
+# job finishes instead of counted from the scan, so the job sees whether
+# they were counted live, and one saved after the scan passed its place is
+# not missed
+def counted_before(job):
+    started = datetime.fromisoformat(job["started_at"])
+    return (started - timedelta(seconds=REGRADE_FENCE_MARGIN_SECONDS)).isoformat()
+ 
+ 
+def query_since(quiz_id, since):
+    kwargs = {
+        "IndexName": QUIZ_INDEX,
+        "KeyConditionExpression": Key("quiz_id").eq(quiz_id) & Key("submitted_at").gte(since),
+    }
+    items = []
+    while True:
+        page = results_table.query(**kwargs)
+        items.extend(page.get("Items", []))
+        if "LastEvaluatedKey" not in page:
+            return items
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+ 
+ 
+# A result that could not be written, or was skipped, keeps the score it
+# has in Results
+def uncount_failed(totals, changed, failures):
+    failures = set(failures)
+    for item in changed:
+        if item["result_id"] in failures:
+            totals[item["quiz_id"]]["score_change"] -= item["score"] - item["score_before_regrade"]
+ 
+ 
+# Regrade the results submitted since counted_before and apply the rebuilt
+# aggregate: those counted live during the job already are in the
+# aggregate, the others complete the scan's totals. Returns (changed,
+# failed, skipped).
+def finish_quiz(job, quiz_id, grader, decoder):
+    job_id = job["meta_key"][len(JOB_PREFIX):]
+    graders = {quiz_id: grader}
+    recent = query_since(quiz_id, counted_before(job))
+    before = [item for item in recent if item.get(LIVE_MARK) != job_id]
+    since = [item for item in recent if item.get(LIVE_MARK) == job_id]
+    changed, totals = grade_page(before, graders, decoder, job_id)
+    changed_live, live = grade_page(since, graders, decoder, job_id)
+    written, failures, skipped = write_changed(changed + changed_live)
+    uncount_failed(totals, changed, failures + skipped)
+    uncount_failed(live, changed_live, failures + skipped)
+ 
+    rebuilt = empty_totals(grader)
+    for part in (job["totals"].get(quiz_id), totals.get(quiz_id)):
+        if part:
+            merge_totals(rebuilt, part)
+    live = live.get(quiz_id) or empty_totals(grader)
+    apply_rebuilt_stats(meta_table, quiz_id, job_id, rebuilt, live,
+                        rebuilt["score_change"] + live["score_change"], job["started_at"])
+    return written, failures, len(skipped)
+ 
+ 
+# Run the job until every segment is finished or time runs low, saving the
+# checkpoint (pending scan keys and running totals) at the end of the chunk.
+# Re-running a chunk after a crash is safe: scores already written back
+# compare equal and are not written again, and keep the score they had
+# before the job for its score_change.
+def run_job(job, context):
+    job_id = job["meta_key"][len(JOB_PREFIX):]
+    graders, skipped = load_graders(job["quiz_ids"])
+    for quiz_id in list(graders):
+        if not fence_quiz_stats(meta_table, quiz_id, job_id):
+            skipped[quiz_id] = "Another regrade job is running for this quiz"
+            del graders[quiz_id]
+    job["skipped"] = skipped
+    if not graders:
+        job["status"] = "done"
+        job["pending"] = {}
+        return job
+ 
+    filters = {"FilterExpression": Attr("quiz_id").is_in(list(graders))}
+    if context is not None:
+        time_left = context.get_remaining_time_in_millis
+    else:
+        deadline = time.monotonic() + 60
+        time_left = lambda: (deadline - time.monotonic()) * 1000
+ 
+    client = results_table.meta.client
+    decoder = AnswerDecoder(quiz_table)
+    pending = job["pending"]
+    with ThreadPoolExecutor(max_workers=max(len(pending), 1)) as pool:
+        futures = {
+            segment: pool.submit(regrade_segment, client, int(segment), int(job["segments"]), key,
+                                 filters, graders, decoder, job_id, counted_before(job), time_left)
+            for segment, key in pending.items()
+        }
+        still_pending = {}
+        for segment, future in futures.items():
+            next_key, scanned, changed, failed, skipped, totals = future.result()
+            job["scanned"] += scanned
+            job["changed"] += changed
+            job["skipped_results"] = job.get("skipped_results", 0) + skipped
+            job["failed"] = (job["failed"] + failed)[:100]
+            add_totals(job["totals"], totals)
+            if next_key:
+                still_pending[segment] = next_key
+    job["pending"] = still_pending
+ 
+    if not still_pending:
+        # Every result was seen: apply the rebuilt aggregates
+        for quiz_id, grader in graders.items():
+            changed, failed, skipped = finish_quiz(job, quiz_id, grader, decoder)
+            job["changed"] += changed
+            job["skipped_results"] = job.get("skipped_results", 0) + skipped
+            job["failed"] = (job["failed"] + failed)[:100]
+        job["status"] = "done"
+        job["finished_at"] = datetime.utcnow().isoformat()
+    return job
+ 
+ 
+def job_summary(job):
+    return {
+        "job_id": job["meta_key"][len(JOB_PREFIX):],
+        "status": job["status"],
+        "quiz_ids": job["quiz_ids"],
+        "scanned": job["scanned"],
+        "changed": job["changed"],
+        "failed": job["failed"],
+        "skipped_results": job.get("skipped_results", 0),
+        "skipped": job.get("skipped", {}),
+        "segments_remaining": len(job["pending"]),
+    }
+ 
+ 
+# POST {"quiz_ids": [...]} starts a job; POST {"job_id": ...} continues it
+# until status is "done"; GET ?job_id= reports progress.
+@instrumented("regradeQuiz")
+def lambda_handler(event, context):
+    try:
+        with phase("auth"):
+            claims = event["requestContext"]["authorizer"]["claims"]
+            groups = claims.get("cognito:groups", "")
+            if "Admins" not in groups:
+                return response(403, {"error": "Access denied: Admins only"})
+ 
+        if event["httpMethod"] == "GET":
+            job_id = (event.get("queryStringParameters") or {}).get("job_id")
+            job = meta_table.get_item(Key={"meta_key": f"{JOB_PREFIX}{job_id}"}).get("Item")
+            if not job_id or not job:
+                return response(404, {"error": "Regrade job not found"})
+            return response(200, job_summary(job))
+ 
+        body = responses.json_body(event)
+        if body.get("job_id"):
+            job = meta_table.get_item(
+                Key={"meta_key": f"{JOB_PREFIX}{body['job_id']}"}, ConsistentRead=True
+            ).get("Item")
+            if not job:
+                return response(404, {"error": "Regrade job not found"})
+            if job["status"] == "done":
+                return response(200, job_summary(job))
+        else:
+            quiz_ids = body.get("quiz_ids") or ([body["quiz_id"]] if body.get("quiz_id") else [])
+            quiz_ids = list(dict.fromkeys(quiz_ids))
+            if not quiz_ids or len(quiz_ids) > MAX_QUIZZES_PER_JOB:
+                return response(400, {"error": f"Provide 1-{MAX_QUIZZES_PER_JOB} quiz_ids"})
+            job = new_job(quiz_ids)
+            # Saved before any quiz is fenced, so the job can always be
+            # continued to lift its fences
+            meta_table.put_item(Item=job)
+ 
+        with phase("grade"):
+            job = run_job(job, context)
+        with phase("write"):
+            meta_table.put_item(Item=job)
+ 
+        return response(200, job_summary(job))
+ 
+    except Exception as e:
+        print("Error:", str(e))
+        return response(500, {"error": str(e)})
+ 
+ 
+def response(status, body):
+    return responses.response(status, body, methods="GET, POST, OPTIONS")
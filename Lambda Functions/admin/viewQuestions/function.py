@@ -1,63 +1,257 @@
-import json
-import boto3
-from decimal import Decimal
- 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table("QuestionBank")
- 
- 
-def lambda_handler(event, context):
-    print("RAW EVENT:", event)   # debug
- 
-    method = event["httpMethod"]
- 
-    # extract claims (same fix you applied earlier)
-    authorizer = event.get("requestContext", {}).get("authorizer", {})
-    claims = authorizer.get("claims") or authorizer.get("jwt", {}).get("claims", {})
-    groups = claims.get("cognito:groups") or ""
-    if "Admins" not in groups:
-        return response(403, {"error": "Admins only"})
- 
-    # GET → return all questions
-    if method == "GET":
-        items = table.scan().get("Items", [])
-        return response(200, {"questions": items})
- 
-    # PUT → update question
-    if method == "PUT":
-        body = json.loads(event["body"])
-        question_id = body["question_id"]
-        updates = {k: v for k, v in body.items() if k != "question_id"}
- 
-        update_expr = ", ".join([f"{k} = :{k}" for k in updates])
-        values = {f":{k}": v for k, v in updates.items()}
- 
-        table.update_item(
-            Key={"question_id": question_id},
-            UpdateExpression=f"SET {update_expr}",
-            ExpressionAttributeValues=values
-        )
- 
-        return response(200, {"message": "Question updated"})
- 
-    # DELETE → delete question
-    if method == "DELETE":
-        body = json.loads(event["body"])
-        question_id = body["question_id"]
- 
-        table.delete_item(Key={"question_id": question_id})
-        return response(200, {"message": "Question deleted"})
- 
-    return response(400, {"error": "Method not supported"})
- 
- 
-def response(status, body):
-    return {
-        "statusCode": status,
-        "headers": {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Authorization, Content-Type",
-            "Access-Control-Allow-Methods": "GET, PUT, DELETE, OPTIONS"
-        },
-        "body": json.dumps(body),
-    }
+import os
+from concurrent.futures import ThreadPoolExecutor
+from quiz_common import responses
+from quiz_common.aws import lazy_resource, lazy_table
+from quiz_common.batch import batch_get, batch_write
+from quiz_common.cache import bump_catalog_version
+from quiz_common.metrics import instrumented, phase
+from quiz_common.pagination import decode_token, encode_token, page_limit
+from quiz_common.quiz_sync import sync_quizzes
+from quiz_common.search import SEARCH_FIELDS, search_questions, update_index
+from quiz_common.summary import add_counts
+ 
+dynamodb = lazy_resource()
+table = lazy_table("QuestionBank")
+index_table = lazy_table("QuestionIndex")
+quiz_table = lazy_table("Quizzes")
+meta_table = lazy_table("QuizMeta")
+snapshot_table = lazy_table("QuizSnapshots")
+ 
+UPDATE_MAX_WORKERS = int(os.environ.get("UPDATE_MAX_WORKERS", 8))
+REINDEX_PAGE_SIZE = 500  # questions indexed per reindex call
+ 
+ 
+@instrumented("viewQuestions")
+def lambda_handler(event, context):
+    method = event["httpMethod"]
+ 
+    # extract claims (same fix you applied earlier)
+    with phase("auth"):
+        authorizer = event.get("requestContext", {}).get("authorizer", {})
+        claims = authorizer.get("claims") or authorizer.get("jwt", {}).get("claims", {})
+        groups = claims.get("cognito:groups") or ""
+        if "Admins" not in groups:
+            return response(403, {"error": "Admins only"})
+ 
+    # GET → search (?q=, ?topic=) or page (?limit=, ?next_token=) through
+    # the bank; without parameters, return all questions
+    if method == "GET":
+        params = event.get("queryStringParameters") or {}
+        try:
+            with phase("read"):
+                if params.get("q") or params.get("topic"):
+                    body = search_page(params)
+                elif params.get("limit") or params.get("next_token"):
+                    body = scan_page(params)
+                else:
+                    body = {"questions": scan_all()}
+        except ValueError as e:
+            return response(400, {"error": str(e)})
+        return responses.compress(response(200, body), event)
+ 
+    # PUT → update one question, or a list of them
+    if method == "PUT":
+        try:
+            body = responses.json_body(event)
+        except ValueError:
+            return response(400, {"error": "Invalid JSON body"})
+        if isinstance(body, dict) and body.get("reindex"):
+            with phase("write"):
+                result = reindex_page(body.get("next_token"))
+            return response(200, result)
+ 
+        if isinstance(body, dict) and "updates" not in body:
+            with phase("write"):
+                result = update_questions([body])[0]
+            if result["status"] == "updated":
+                return response(200, {"message": "Question updated"})
+            if result["status"] == "not_found":
+                return response(404, {"error": "Question not found"})
+            return response(400, {"error": result["error"]})
+ 
+        updates = body["updates"] if isinstance(body, dict) else body
+        if not list_of(updates, dict):
+            return response(400, {"error": "updates must be a list of question objects"})
+        with phase("write"):
+            results = update_questions(updates)
+        return response(200, {"results": results})
+ 
+    # DELETE → delete one question, or a list of question_ids
+    if method == "DELETE":
+        try:
+            body = responses.json_body(event)
+        except ValueError:
+            return response(400, {"error": "Invalid JSON body"})
+        if isinstance(body, dict) and "question_ids" not in body:
+            if not isinstance(body.get("question_id"), str) or not body["question_id"]:
+                return response(400, {"error": "question_id is required"})
+            with phase("write"):
+                result = delete_questions([body["question_id"]])[0]
+            if result["status"] != "deleted":
+                return response(500, {"error": result["error"]})
+            return response(200, {"message": "Question deleted"})
+ 
+        question_ids = body["question_ids"] if isinstance(body, dict) else body
+        if not list_of(question_ids, str):
+            return response(400, {"error": "question_ids must be a list of strings"})
+        with phase("write"):
+            results = delete_questions(question_ids)
+        return response(200, {"results": results})
+ 
+    return response(400, {"error": "Method not supported"})
+ 
+ 
+def list_of(values, kind):
+    return isinstance(values, list) and all(isinstance(value, kind) for value in values)
+ 
+ 
+# One page of questions matching every keyword in q and the topic; the
+# cursor is the last question_id examined
+def search_page(params):
+    limit = page_limit(params)
+    cursor = decode_token(params.get("next_token")) or {}
+    found = search_questions(index_table, table, params.get("q"), params.get("topic"),
+                             limit, cursor.get("after"))
+    if found is None:
+        raise ValueError("Search needs a topic or a keyword of at least two characters")
+    questions, after = found
+    return {"questions": questions, "next_token": encode_token({"after": after} if after else None)}
+ 
+ 
+def scan_page(params):
+    kwargs = {"Limit": page_limit(params)}
+    start_key = decode_token(params.get("next_token"))
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    page = table.scan(**kwargs)
+    return {"questions": page.get("Items", []),
+            "next_token": encode_token(page.get("LastEvaluatedKey"))}
+ 
+ 
+def scan_all():
+    items, kwargs = [], {}
+    while True:
+        page = table.scan(**kwargs)
+        items.extend(page.get("Items", []))
+        if "LastEvaluatedKey" not in page:
+            return items
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+ 
+ 
+# Write the search postings for one page of the bank. Run once after
+# creating the QuestionIndex table, repeating with next_token until it is
+# null; re-running is harmless.
+def reindex_page(next_token):
+    kwargs = {
+        "Limit": REINDEX_PAGE_SIZE,
+        "ProjectionExpression": ", ".join(f"#p{i}" for i in range(len(SEARCH_FIELDS))),
+        "ExpressionAttributeNames": {f"#p{i}": name for i, name in enumerate(SEARCH_FIELDS)},
+    }
+    start_key = decode_token(next_token)
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    page = table.scan(**kwargs)
+    items = page.get("Items", [])
+    failures = update_index(index_table, [(item["question_id"], None, item) for item in items])
+    return {
+        "indexed": len(items),
+        "failed": len(failures),
+        "next_token": encode_token(page.get("LastEvaluatedKey")),
+    }
+ 
+ 
+def index_questions(changes):
+    failures = update_index(index_table, changes)
+    if failures:
+        print("Index update failed for", len(failures), "postings:", list(failures.items())[:5])
+ 
+ 
+# Build "SET #f0 = :v0, ..." with placeholder names for every attribute, so
+# reserved words such as options and answer can be updated
+def update_expression(fields):
+    names, values, assignments = {}, {}, []
+    for i, (name, value) in enumerate(fields.items()):
+        names[f"#f{i}"] = name
+        values[f":v{i}"] = value
+        assignments.append(f"#f{i} = :v{i}")
+    return "SET " + ", ".join(assignments), names, values
+ 
+ 
+# Returns the status and, for updates touching question_text or topic, the
+# (question_id, old, new) change for the search index
+def update_question(update):
+    question_id = update.get("question_id") if isinstance(update, dict) else None
+    fields = {k: v for k, v in update.items() if k != "question_id"} if question_id else {}
+    if not fields:
+        return {"question_id": question_id, "status": "error",
+                "error": "Invalid input: question_id and at least one field required"}, None
+ 
+    expression, names, values = update_expression(fields)
+    names["#id"] = "question_id"
+    try:
+        old = table.update_item(
+            Key={"question_id": question_id},
+            UpdateExpression=expression,
+            ConditionExpression="attribute_exists(#id)",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_OLD"
+        )["Attributes"]
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return {"question_id": question_id, "status": "not_found"}, None
+    except Exception as e:
+        return {"question_id": question_id, "status": "error", "error": str(e)}, None
+ 
+    change = None
+    if any(field in fields for field in SEARCH_FIELDS):
+        change = (question_id, old, dict(old, **fields))
+    return {"question_id": question_id, "status": "updated"}, change
+ 
+ 
+# UpdateItem per question on a bounded pool; one failure does not stop the
+# rest. Returns a status per update, in request order.
+def update_questions(updates):
+    with ThreadPoolExecutor(max_workers=UPDATE_MAX_WORKERS) as pool:
+        outcomes = list(pool.map(update_question, updates))
+    results = [result for result, _ in outcomes]
+    changes = [change for _, change in outcomes if change]
+    if changes:
+        index_questions(changes)
+ 
+    updated = [update for update, result in zip(updates, results) if result["status"] == "updated"]
+    if not updated:
+        return results
+    sync_quizzes(quiz_table, table, snapshot_table, updates=updated)
+    bump_catalog_version(meta_table)
+    return results
+ 
+ 
+# Deletes go through BatchWriteItem, 25 keys per call. Deleting a question
+# that does not exist is not an error. The old text and topic are read first
+# to know which search postings to drop.
+def delete_questions(question_ids):
+    question_ids = list(dict.fromkeys(str(qid) for qid in question_ids))
+    previous = batch_get(table, question_ids, "question_id", projection=SEARCH_FIELDS)
+    requests = [{"DeleteRequest": {"Key": {"question_id": qid}}} for qid in question_ids]
+    failures = batch_write(table, requests, "question_id")
+ 
+    deleted = [qid for qid in question_ids if qid not in failures]
+    removed = [qid for qid in deleted if qid in previous]
+    index_questions([(qid, previous[qid], None) for qid in removed])
+    try:
+        add_counts(meta_table, questions=-len(removed))
+    except Exception as e:
+        print("Error updating summary:", str(e))
+    if deleted:
+        sync_quizzes(quiz_table, table, snapshot_table, deleted=deleted)
+        bump_catalog_version(meta_table)
+ 
+    return [
+        {"question_id": qid, "status": "error", "error": failures[qid]} if qid in failures
+        else {"question_id": qid, "status": "deleted"}
+        for qid in question_ids
+    ]
+ 
+ 
+def response(status, body):
+    return responses.response(status, body, methods="GET, PUT, DELETE, OPTIONS")
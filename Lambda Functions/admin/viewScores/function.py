@@ -1,50 +1,269 @@
-import json
-import boto3
-from decimal import Decimal
- 
-# Custom encoder to handle Decimal types from DynamoDB
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            # Convert Decimal to int if it’s a whole number, else float
-            if o % 1 == 0:
-                return int(o)
-            else:
-                return float(o)
-        return super(DecimalEncoder, self).default(o)
- 
-def lambda_handler(event, context):
-    try:
-        # Verify Admin access via Cognito group
-        claims = event["requestContext"]["authorizer"]["claims"]
-        groups = claims.get("cognito:groups", "")
-        if "Admins" not in groups:
-            return {
-                "statusCode": 403,
-                "body": json.dumps({"error": "Access denied: Admins only"})
-            }
- 
-        # Connect to DynamoDB Results table (updated)
-        dynamodb = boto3.resource("dynamodb")
-        results_table = dynamodb.Table("Results")
- 
-        # Scan all quiz results
-        response = results_table.scan()
-        items = response.get("Items", [])
- 
-        # Return all results in JSON
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            "body": json.dumps({"results": items}, cls=DecimalEncoder)
-        }
- 
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+import csv
+import io
+import os
+import time
+from boto3.dynamodb.conditions import Attr, Key
+from concurrent.futures import ThreadPoolExecutor
+from quiz_common.answers import AnswerDecoder
+from quiz_common.aws import lazy_table
+from quiz_common.metrics import instrumented, phase
+from quiz_common.pagination import decode_token, encode_token, page_limit
+from quiz_common.responses import compress, cors_headers, dumps, json_body, response
+ 
+# GSI on Results: quiz_id (partition) / submitted_at (sort)
+QUIZ_INDEX = os.environ.get("RESULTS_QUIZ_INDEX", "quiz_id-submitted_at-index")
+ 
+# Export tuning: parallel scan segments and bytes returned per invocation
+# (kept well under the 6 MB Lambda response limit)
+EXPORT_SEGMENTS = int(os.environ.get("EXPORT_SEGMENTS", 8))
+EXPORT_CHUNK_BYTES = int(os.environ.get("EXPORT_CHUNK_BYTES", 4 * 1024 * 1024))
+EXPORT_MIN_REMAINING_MS = 5000
+EXPORT_FIRST_PAGE_ITEMS = 100   # Limit of a segment's first scan, before row sizes are known
+ 
+CSV_COLUMNS = ["result_id", "quiz_id", "user_email", "user_name", "score", "submitted_at", "answers"]
+ 
+# Results examined per backfill call, and the submitted_at given to results
+# saved before submitQuiz recorded it (their real time is unknown; this sorts
+# them after every dated result in newest-first lists)
+BACKFILL_PAGE_SIZE = 1000
+BACKFILL_WORKERS = 8
+LEGACY_SUBMITTED_AT = "1970-01-01T00:00:00"
+ 
+# Lets the browser read the export cursor header
+EXPOSE_HEADERS = {"Access-Control-Expose-Headers": "X-Next-Token"}
+ 
+results_table = lazy_table("Results")
+quiz_table = lazy_table("Quizzes")
+ 
+ 
+# Optional date-range filter on submitted_at (ISO strings compare in order)
+def date_condition(params, attr):
+    start, end = params.get("from"), params.get("to")
+    if start and end:
+        return attr("submitted_at").between(start, end)
+    if start:
+        return attr("submitted_at").gte(start)
+    if end:
+        return attr("submitted_at").lte(end)
+    return None
+ 
+ 
+# Dashboard mode: one page of results. With quiz_id this is a Query on the
+# quiz index (newest first), otherwise a paginated scan.
+def fetch_page(results_table, params):
+    kwargs = {"Limit": page_limit(params, default=100, maximum=1000)}
+    start_key = decode_token(params.get("next_token"))
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+ 
+    if params.get("quiz_id"):
+        key_condition = Key("quiz_id").eq(params["quiz_id"])
+        date_range = date_condition(params, Key)
+        if date_range is not None:
+            key_condition = key_condition & date_range
+        page = results_table.query(
+            IndexName=QUIZ_INDEX,
+            KeyConditionExpression=key_condition,
+            ScanIndexForward=False,
+            **kwargs
+        )
+    else:
+        date_range = date_condition(params, Attr)
+        if date_range is not None:
+            kwargs["FilterExpression"] = date_range
+        page = results_table.scan(**kwargs)
+ 
+    return page.get("Items", []), page.get("LastEvaluatedKey")
+ 
+ 
+# FilterExpression for export scans. Export threads share the table's client
+# (thread-safe, and it still converts to/from native types) instead of the
+# resource, which is not thread-safe.
+def export_filter(params):
+    condition = date_condition(params, Attr)
+    if params.get("quiz_id"):
+        quiz_condition = Attr("quiz_id").eq(params["quiz_id"])
+        condition = quiz_condition if condition is None else quiz_condition & condition
+    return {"FilterExpression": condition} if condition is not None else {}
+ 
+ 
+def encode_row(item, fmt):
+    if fmt == "csv":
+        buffer = io.StringIO()
+        row = dict(item, answers=dumps(item.get("answers", {})))
+        csv.DictWriter(buffer, CSV_COLUMNS, extrasaction="ignore").writerow(row)
+        return buffer.getvalue()
+    return dumps(item) + "\n"
+ 
+ 
+# Read one scan segment from start_key until it is exhausted, its share of the
+# chunk budget is used, or the invocation is running out of time.
+# Returns (rows, next_key); next_key is None once the segment is finished.
+# Each scan's Limit is sized from the rows seen so far; a row that would
+# overflow the budget ends the chunk mid-page, and the segment resumes after
+# the last row returned (at least one row is always returned).
+def scan_segment(client, table_name, segment, start_key, fmt, filters, decoder, byte_budget,
+                 time_left):
+    rows, size, key = [], 0, start_key
+    while True:
+        limit = EXPORT_FIRST_PAGE_ITEMS
+        if rows:
+            limit = max(1, (byte_budget - size) * len(rows) // size)
+        kwargs = dict(filters, TableName=table_name, Segment=segment, TotalSegments=EXPORT_SEGMENTS,
+                      Limit=limit)
+        if key:
+            kwargs["ExclusiveStartKey"] = key
+        page = client.scan(**kwargs)
+        for item in decoder.decode(page.get("Items", [])):
+            line = encode_row(item, fmt)
+            line_bytes = len(line.encode("utf-8"))
+            if rows and size + line_bytes > byte_budget:
+                return rows, key
+            rows.append(line)
+            size += line_bytes
+            key = {"result_id": item["result_id"]}
+ 
+        key = page.get("LastEvaluatedKey")
+        if not key or size >= byte_budget or time_left() < EXPORT_MIN_REMAINING_MS:
+            return rows, key
+ 
+ 
+# Export mode: parallel segmented scan streamed as NDJSON/CSV chunks. The
+# cursor holds the LastEvaluatedKey of every unfinished segment, so a large
+# export continues across invocations by passing next_token back.
+def export_chunk(results_table, params, context):
+    fmt = params.get("format", "ndjson")
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError("format must be ndjson or csv")
+ 
+    cursor = decode_token(params.get("next_token"))
+    if cursor is None:
+        pending = {str(segment): None for segment in range(EXPORT_SEGMENTS)}
+    else:
+        pending = cursor.get("pending", {})
+        if cursor.get("segments") != EXPORT_SEGMENTS:
+            raise ValueError("Export cursor was created with a different segment count")
+ 
+    client = results_table.meta.client
+    filters = export_filter(params)
+    decoder = AnswerDecoder(quiz_table)
+    byte_budget = EXPORT_CHUNK_BYTES // max(len(pending), 1)
+    if context is not None:
+        time_left = context.get_remaining_time_in_millis
+    else:
+        deadline = time.monotonic() + 60
+        time_left = lambda: (deadline - time.monotonic()) * 1000
+ 
+    with ThreadPoolExecutor(max_workers=max(len(pending), 1)) as pool:
+        futures = {
+            segment: pool.submit(scan_segment, client, results_table.name, int(segment), key,
+                                 fmt, filters, decoder, byte_budget, time_left)
+            for segment, key in pending.items()
+        }
+        chunks, still_pending = [], {}
+        for segment, future in futures.items():
+            rows, next_key = future.result()
+            chunks.extend(rows)
+            if next_key:
+                still_pending[segment] = next_key
+ 
+    if fmt == "csv" and cursor is None:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(CSV_COLUMNS)
+        chunks.insert(0, buffer.getvalue())
+ 
+    next_token = None
+    if still_pending:
+        next_token = encode_token({"segments": EXPORT_SEGMENTS, "pending": still_pending})
+ 
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    headers = dict(cors_headers(), **EXPOSE_HEADERS)
+    headers["Content-Type"] = content_type
+    if next_token:
+        headers["X-Next-Token"] = next_token
+ 
+    return {
+        "statusCode": 200,
+        "headers": headers,
+        "body": "".join(chunks)
+    }
+ 
+ 
+# Give results without submitted_at one, so the submitted_at indexes (and
+# with them viewScore and the quiz view) include them. Works through one
+# page of the table per call; repeat with next_token until it is null.
+# The condition keeps a value that was set in the meantime.
+def backfill_page(next_token, submitted_at):
+    kwargs = {
+        "Limit": BACKFILL_PAGE_SIZE,
+        "FilterExpression": Attr("submitted_at").not_exists(),
+        "ProjectionExpression": "result_id",
+    }
+    start_key = decode_token(next_token)
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+    page = results_table.scan(**kwargs)
+ 
+    def backfill(item):
+        try:
+            results_table.update_item(
+                Key={"result_id": item["result_id"]},
+                UpdateExpression="SET submitted_at = if_not_exists(submitted_at, :at)",
+                ExpressionAttributeValues={":at": submitted_at}
+            )
+            return True
+        except Exception as e:
+            print("Backfill failed for", item["result_id"], str(e))
+            return False
+ 
+    with ThreadPoolExecutor(max_workers=BACKFILL_WORKERS) as pool:
+        outcomes = list(pool.map(backfill, page.get("Items", [])))
+    return {
+        "updated": sum(outcomes),
+        "failed": len(outcomes) - sum(outcomes),
+        "next_token": encode_token(page.get("LastEvaluatedKey")),
+    }
+ 
+ 
+@instrumented("viewScores")
+def lambda_handler(event, context):
+    try:
+        # Verify Admin access via Cognito group
+        with phase("auth"):
+            claims = event["requestContext"]["authorizer"]["claims"]
+            groups = claims.get("cognito:groups", "")
+            if "Admins" not in groups:
+                return response(403, {"error": "Access denied: Admins only"})
+ 
+        params = event.get("queryStringParameters") or {}
+ 
+        try:
+            # POST {"backfill": true} → give undated results a submitted_at
+            if event.get("httpMethod") == "POST":
+                body = json_body(event)
+                if not body.get("backfill"):
+                    return response(400, {"error": "Unsupported request"})
+                with phase("write"):
+                    result = backfill_page(body.get("next_token"),
+                                           body.get("submitted_at") or LEGACY_SUBMITTED_AT)
+                return response(200, result)
+ 
+            if params.get("mode") == "export":
+                with phase("read"):
+                    chunk = export_chunk(results_table, params, context)
+                return compress(chunk, event)
+ 
+            with phase("read"):
+                items, last_key = fetch_page(results_table, params)
+                items = AnswerDecoder(quiz_table).decode(items)
+        except ValueError as e:
+            return response(400, {"error": str(e)})
+ 
+        # Return one page of results in JSON
+        return compress(response(200, {
+            "results": items,
+            "next_token": encode_token(last_key)
+        }), event)
+ 
+    except Exception as e:
+        return response(500, {"error": str(e)})
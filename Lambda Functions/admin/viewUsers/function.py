@@ -1,56 +1,118 @@
-import json
-import boto3
-import os
- 
-def lambda_handler(event, context):
-    try:
-        claims = event["requestContext"]["authorizer"]["claims"]
-        groups = claims.get("cognito:groups", "")
-        if "Admins" not in groups:
-            return {
-                "statusCode": 403,
-                "body": json.dumps({"error": "Access denied: Admins only"})
-            }
- 
-        user_pool_id = os.environ.get("USER_POOL_ID")
-        cognito_client = boto3.client("cognito-idp")
- 
-        users = []
-        response = cognito_client.list_users(UserPoolId=user_pool_id)
- 
-        for user in response["Users"]:
-            # Get user's email
-            email = next(
-                (attr["Value"] for attr in user["Attributes"] if attr["Name"] == "email"),
-                "N/A"
-            )
- 
-            # Fetch Cognito user groups
-            groups_resp = cognito_client.admin_list_groups_for_user(
-                UserPoolId=user_pool_id,
-                Username=user["Username"]
-            )
- 
-            group_name = groups_resp["Groups"][0]["GroupName"] if groups_resp.get("Groups") else "User"
- 
-            users.append({
-                "username": user["Username"],
-                "email": email,
-                "group": group_name   # Include group in payload
-            })
- 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            "body": json.dumps({"users": users})
-        }
- 
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+import os
+from concurrent.futures import ThreadPoolExecutor
+from quiz_common.aws import lazy_client
+from quiz_common.cache import QuizCache
+from quiz_common.metrics import instrumented, phase
+from quiz_common.pagination import decode_token, encode_token, page_limit
+from quiz_common.responses import response
+ 
+MAX_WORKERS = int(os.environ.get("COGNITO_MAX_WORKERS", 4))
+ 
+cognito_client = lazy_client("cognito-idp")
+ 
+# Short-lived warm cache of the full user list; Cognito is the source of truth
+cache = QuizCache(max_entries=4, ttl_seconds=int(os.environ.get("USERS_CACHE_SECONDS", 60)))
+ 
+ 
+# Follow PaginationToken/NextToken until the listing is complete
+def list_all_users(cognito_client, user_pool_id):
+    users, kwargs = [], {"UserPoolId": user_pool_id, "Limit": 60}
+    while True:
+        response = cognito_client.list_users(**kwargs)
+        users.extend(response["Users"])
+        if not response.get("PaginationToken"):
+            return users
+        kwargs["PaginationToken"] = response["PaginationToken"]
+ 
+ 
+def list_all_groups(cognito_client, user_pool_id):
+    groups, kwargs = [], {"UserPoolId": user_pool_id, "Limit": 60}
+    while True:
+        response = cognito_client.list_groups(**kwargs)
+        groups.extend(group["GroupName"] for group in response["Groups"])
+        if not response.get("NextToken"):
+            return groups
+        kwargs["NextToken"] = response["NextToken"]
+ 
+ 
+def list_group_members(cognito_client, user_pool_id, group_name):
+    usernames, kwargs = [], {"UserPoolId": user_pool_id, "GroupName": group_name, "Limit": 60}
+    while True:
+        response = cognito_client.list_users_in_group(**kwargs)
+        usernames.extend(user["Username"] for user in response["Users"])
+        if not response.get("NextToken"):
+            return usernames
+        kwargs["NextToken"] = response["NextToken"]
+ 
+ 
+# One listing per group instead of one admin_list_groups_for_user per user.
+# The user listing and every group listing run concurrently on a bounded pool.
+def load_users(cognito_client, user_pool_id):
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        users_future = pool.submit(list_all_users, cognito_client, user_pool_id)
+        group_names = list_all_groups(cognito_client, user_pool_id)
+        members = pool.map(
+            lambda name: list_group_members(cognito_client, user_pool_id, name),
+            group_names
+        )
+ 
+        # Keep the first group per user, as admin_list_groups_for_user did
+        user_groups = {}
+        for group_name, usernames in zip(group_names, members):
+            for username in usernames:
+                user_groups.setdefault(username, group_name)
+ 
+        users = users_future.result()
+ 
+    result = []
+    for user in users:
+        # Get user's email
+        email = next(
+            (attr["Value"] for attr in user["Attributes"] if attr["Name"] == "email"),
+            "N/A"
+        )
+        result.append({
+            "username": user["Username"],
+            "email": email,
+            "group": user_groups.get(user["Username"], "User")   # Include group in payload
+        })
+    result.sort(key=lambda u: u["username"])
+    return result
+ 
+ 
+@instrumented("viewUsers")
+def lambda_handler(event, context):
+    try:
+        with phase("auth"):
+            claims = event["requestContext"]["authorizer"]["claims"]
+            groups = claims.get("cognito:groups", "")
+            if "Admins" not in groups:
+                return response(403, {"error": "Access denied: Admins only"})
+ 
+        params = event.get("queryStringParameters") or {}
+        try:
+            limit = page_limit(params, default=100, maximum=1000)
+            cursor = decode_token(params.get("next_token")) or {}
+            offset = int(cursor.get("offset", 0))
+        except ValueError as e:
+            return response(400, {"error": str(e)})
+ 
+        user_pool_id = os.environ.get("USER_POOL_ID")
+ 
+        users = cache.get(user_pool_id)
+        if users is None:
+            with phase("read"):
+                users = load_users(cognito_client, user_pool_id)
+            cache.set(user_pool_id, users)
+ 
+        page = users[offset:offset + limit]
+        next_token = encode_token({"offset": offset + limit}) if offset + limit < len(users) else None
+ 
+        return response(200, {
+            "users": page,
+            "total": len(users),
+            "next_token": next_token
+        })
+ 
+    except Exception as e:
+        return response(500, {"error": str(e)})
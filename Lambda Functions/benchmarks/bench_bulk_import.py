@@ -0,0 +1,84 @@
+"""Question import throughput: one addQuestion call per question vs bulk mode.
+
+    pip install boto3 moto
+    python "Lambda Functions/benchmarks/bench_bulk_import.py" [--questions 2000]
+
+Every mode loads the same questions into an empty QuestionBank on moto and
+reports questions per second and the DynamoDB calls the handler made.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import standin  # noqa: E402
+
+
+def csv_body(questions):
+    out = io.StringIO()
+    option_keys = sorted({key for q in questions for key in q['options']})
+    writer = csv.writer(out)
+    writer.writerow(['question_id', 'question_text', 'answer', 'topic']
+                    + [f'option_{key}' for key in option_keys])
+    for q in questions:
+        writer.writerow([q['question_id'], q['question_text'], q['answer'], q['topic']]
+                        + [q['options'].get(key, '') for key in option_keys])
+    return out.getvalue()
+
+
+def single(handler, questions):
+    for q in questions:
+        handler.lambda_handler(standin.admin_event('POST', q), None)
+
+
+def bulk_json(handler, questions):
+    handler.lambda_handler(standin.admin_event('POST', {'questions': questions}), None)
+
+
+def bulk_csv(handler, questions):
+    event = standin.admin_event('POST')
+    event['headers'] = {'Content-Type': 'text/csv'}
+    event['body'] = csv_body(questions)
+    handler.lambda_handler(event, None)
+
+
+MODES = {'single': single, 'bulk-json': bulk_json, 'bulk-csv': bulk_csv}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('modes', nargs='*', default=list(MODES))
+    args = parser.parse_args()
+
+    standin.prepare_environment()
+    import boto3
+    from moto import mock_aws
+    import quiz_common.aws
+
+    questions = [standin.question(i) for i in range(args.questions)]
+
+    print(f'{"mode":<10} {"seconds":>8} {"q/s":>9} {"stored":>7}  dynamodb calls')
+    for mode in args.modes:
+        with mock_aws():
+            dynamodb = boto3.resource('dynamodb')
+            standin.create_tables(dynamodb)
+            quiz_common.aws._dynamodb = None
+            handler = standin.load_handler('admin/addQuestion')
+            counts = standin.count_calls(quiz_common.aws.dynamodb_resource().meta.client)
+
+            start = time.perf_counter()
+            MODES[mode](handler, questions)
+            elapsed = time.perf_counter() - start
+
+            stored = dynamodb.Table('QuestionBank').scan(Select='COUNT')['Count']
+            calls = ', '.join(f'{name}={n}' for name, n in sorted(counts.items()))
+            print(f'{mode:<10} {elapsed:8.2f} {len(questions) / elapsed:9.0f} {stored:7d}  {calls}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Cold-start and warm-invoke timings for every Lambda handler.
+
+    pip install boto3 moto
+    python "Lambda Functions/benchmarks/bench_cold_start.py" [--invokes 50] [function ...]
+
+Each function runs in a fresh interpreter, so "import" is the real module
+import cost (boto3 included) and "first" includes lazy client construction.
+"warm" is the median of the following invocations against moto.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import standin  # noqa: E402
+
+
+def run_child(function, invokes):
+    standin.prepare_environment()
+
+    # Time the handler import before anything else pulls in boto3
+    start = time.perf_counter()
+    module = standin.load_handler(function)
+    import_ms = (time.perf_counter() - start) * 1000
+
+    import boto3
+    from moto import mock_aws
+    import quiz_common.aws
+
+    with mock_aws():
+        # Set up through a separate session so the handler's first call still
+        # pays for loading service models and building its own client
+        session = boto3.session.Session()
+        dynamodb = session.resource('dynamodb')
+        standin.create_tables(dynamodb)
+        standin.create_user_pool(session.client('cognito-idp'), users=20)
+        quiz_ids, quiz_items = standin.seed(dynamodb, questions=50, quizzes=3, results=50)
+        make_event = standin.sample_events(quiz_ids, quiz_items)[function]
+
+        quiz_common.aws._dynamodb = None
+        quiz_common.aws._clients.clear()
+        boto3.DEFAULT_SESSION = None
+
+        start = time.perf_counter()
+        module.lambda_handler(make_event(), None)
+        first_ms = (time.perf_counter() - start) * 1000
+
+        warm = []
+        for _ in range(invokes):
+            event = make_event()
+            start = time.perf_counter()
+            module.lambda_handler(event, None)
+            warm.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        'function': function,
+        'import_ms': import_ms,
+        'first_ms': first_ms,
+        'warm_p50_ms': statistics.median(warm),
+        'warm_max_ms': max(warm),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('functions', nargs='*', default=standin.FUNCTIONS)
+    parser.add_argument('--invokes', type=int, default=50)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.invokes)
+        return
+
+    print(f'{"function":<24} {"import":>9} {"first":>9} {"warm p50":>9} {"warm max":>9}  (ms)')
+    for function in args.functions:
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', function, '--invokes', str(args.invokes)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        row = json.loads(output.strip().splitlines()[-1])
+        print(f'{function:<24} {row["import_ms"]:9.1f} {row["first_ms"]:9.1f} '
+              f'{row["warm_p50_ms"]:9.1f} {row["warm_max_ms"]:9.1f}')
+
+
+if __name__ == '__main__':
+    main()
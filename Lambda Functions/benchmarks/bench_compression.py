@@ -0,0 +1,53 @@
+"""Payload size and encode time for compressed admin responses.
+
+    python "Lambda Functions/benchmarks/bench_compression.py" [items ...]
+
+Builds viewQuestions- and viewScores-shaped bodies and reports the JSON size,
+the base64 body actually returned to API Gateway for identity, gzip and
+deflate, and the time to serialize and compress. Stdlib only.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'layer', 'python'))
+
+from bench_serialization import make_results  # noqa: E402
+from quiz_common.responses import compress, dumps  # noqa: E402
+from standin import question  # noqa: E402
+
+LAMBDA_RESPONSE_LIMIT = 6 * 1024 * 1024
+
+PAYLOADS = {
+    'questions': lambda count: {'questions': [question(i) for i in range(count)]},
+    'results': lambda count: {'results': make_results(count)},
+}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, (time.perf_counter() - start) * 1000
+
+
+def main(sizes):
+    print(f'{"payload":<10} {"items":>7} {"encoding":<9} {"body bytes":>12} {"ratio":>6} '
+          f'{"dumps ms":>9} {"compress ms":>12}  fits 6 MB')
+    for name, build in PAYLOADS.items():
+        for size in sizes:
+            payload = build(size)
+            body, dumps_ms = timed(lambda: dumps(payload))
+            raw = {'statusCode': 200, 'headers': {}, 'body': body}
+            rows = [('identity', len(body), 0.0)]
+            for coding in ('gzip', 'deflate'):
+                event = {'headers': {'Accept-Encoding': coding}}
+                result, compress_ms = timed(lambda: compress(raw, event))
+                rows.append((coding, len(result['body']), compress_ms))
+            for coding, length, compress_ms in rows:
+                print(f'{name:<10} {size:7d} {coding:<9} {length:12d} {length / len(body):6.2f} '
+                      f'{dumps_ms:9.1f} {compress_ms:12.1f}  {"yes" if length < LAMBDA_RESPONSE_LIMIT else "no"}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
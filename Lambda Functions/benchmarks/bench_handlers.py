@@ -0,0 +1,126 @@
+"""Load test for every Lambda handler against a local AWS stand-in.
+
+    pip install boto3 moto
+    python "Lambda Functions/benchmarks/bench_handlers.py" \\
+        [--questions 500] [--quizzes 20] [--users 100] [--results 2000] \\
+        [--requests 200] [--concurrency 8] [function ...]
+
+Seeds moto with synthetic data at the given scale, then drives --requests
+invocations per handler from --concurrency threads and reports latency
+percentiles, throughput, AWS calls and consumed DynamoDB capacity per invocation
+(read from the handlers' embedded-metric log lines). moto runs in-process,
+so absolute numbers include its overhead; compare runs, not environments.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import standin  # noqa: E402
+
+CAPACITY_SAMPLES = 20
+
+
+# Sum the capacity the handlers reported in their embedded-metric log lines
+def consumed_capacity(log_output):
+    reads = writes = 0.0
+    for line in log_output.splitlines():
+        if line.startswith('{"_aws"'):
+            record = json.loads(line)
+            reads += record['ReadCapacityUnits']
+            writes += record['WriteCapacityUnits']
+    return reads, writes
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+# Run one handler `requests` times from `concurrency` threads; returns
+# per-invocation latencies (ms), wall time (s) and the number of errors
+def drive(module, make_event, requests, concurrency):
+    events = [make_event() for _ in range(requests)]
+
+    def invoke(event):
+        start = time.perf_counter()
+        result = module.lambda_handler(event, None)
+        return (time.perf_counter() - start) * 1000, result.get('statusCode', 500) >= 500
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(invoke, events))
+    wall = time.perf_counter() - start
+    return sorted(o[0] for o in outcomes), wall, sum(o[1] for o in outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('functions', nargs='*', default=standin.FUNCTIONS)
+    parser.add_argument('--questions', type=int, default=500)
+    parser.add_argument('--quizzes', type=int, default=20)
+    parser.add_argument('--questions-per-quiz', type=int, default=20)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--results', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    standin.prepare_environment()
+    import boto3
+    from moto import mock_aws
+    import quiz_common.aws
+
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        standin.create_tables(dynamodb)
+        standin.create_user_pool(boto3.client('cognito-idp'), users=args.users)
+        with contextlib.redirect_stdout(io.StringIO()):
+            quiz_ids, quiz_items = standin.seed(
+                dynamodb, questions=args.questions, quizzes=args.quizzes,
+                questions_per_quiz=args.questions_per_quiz, results=args.results, users=args.users)
+        events = standin.sample_events(quiz_ids, quiz_items, users=args.users)
+
+        counts = standin.count_calls(quiz_common.aws.dynamodb_resource().meta.client)
+        cognito_counts = standin.count_calls(quiz_common.aws.client('cognito-idp'))
+
+        print(f'scale: {args.questions} questions, {args.quizzes} quizzes, {args.users} users, '
+              f'{args.results} results; {args.requests} requests x {args.concurrency} threads')
+        print(f'{"function":<24} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8} {"errors":>6} '
+              f'{"RCU/req":>8} {"WCU/req":>8}  calls per invocation')
+        for function in args.functions:
+            module = standin.load_handler(function)
+            # One untimed call so lazy clients and caches are in their warm state
+            with contextlib.redirect_stdout(io.StringIO()):
+                module.lambda_handler(events[function](), None)
+            counts.clear()
+            cognito_counts.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies, wall, errors = drive(module, events[function], args.requests, args.concurrency)
+
+            calls = ', '.join(
+                f'{name}={n / args.requests:.2f}'
+                for name, n in sorted((counts + cognito_counts).items())
+            )
+
+            # The metrics layer tracks one invocation at a time, as Lambda runs
+            # them, so capacity comes from a short sequential pass
+            logs = io.StringIO()
+            with contextlib.redirect_stdout(logs):
+                drive(module, events[function], CAPACITY_SAMPLES, 1)
+            reads, writes = consumed_capacity(logs.getvalue())
+            print(f'{function:<24} {percentile(latencies, 50):8.2f} {percentile(latencies, 95):8.2f} '
+                  f'{percentile(latencies, 99):8.2f} {args.requests / wall:8.1f} {errors:6d} '
+                  f'{reads / CAPACITY_SAMPLES:8.2f} {writes / CAPACITY_SAMPLES:8.2f}  {calls}')
+            if errors:
+                print(f'  warning: {errors} invocations returned 5xx', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
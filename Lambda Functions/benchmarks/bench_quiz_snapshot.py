@@ -0,0 +1,91 @@
+"""getQuizQuestions served from a published snapshot versus built from the tables.
+
+    pip install boto3 moto
+    python "Lambda Functions/benchmarks/bench_quiz_snapshot.py" [--requests 100] [questions ...]
+
+Creates one quiz per size through createQuiz (which publishes its snapshot),
+then calls getQuizQuestions --requests times per quiz, once with the snapshot
+in place and once with it deleted so the handler falls back to the quiz item,
+BatchGetItem and json.dumps. "cold" clears the handler's warm cache before
+every call, as a new container would; "warm" keeps it. Reports latency, the
+DynamoDB calls per request and the body size. moto does not size Query
+capacity realistically, so read units are left out.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import standin  # noqa: E402
+from bench_handlers import percentile  # noqa: E402
+
+
+def measure(module, event, requests, cold):
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(requests):
+            if cold:
+                module.cache.clear()
+            start = time.perf_counter()
+            result = module.lambda_handler(event, None)
+            latencies.append((time.perf_counter() - start) * 1000)
+    if result['statusCode'] != 200:
+        raise SystemExit(f'getQuizQuestions returned {result["statusCode"]}: {result["body"]}')
+    return sorted(latencies), result['body']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sizes', nargs='*', type=int, default=[20, 100, 400])
+    parser.add_argument('--requests', type=int, default=100)
+    args = parser.parse_args()
+
+    standin.prepare_environment()
+    import boto3
+    from moto import mock_aws
+    import quiz_common.aws
+    from quiz_common.snapshots import delete_snapshot
+
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        standin.create_tables(dynamodb)
+        with contextlib.redirect_stdout(io.StringIO()):
+            standin.seed(dynamodb, questions=max(args.sizes), quizzes=0, results=0)
+        create_quiz = standin.load_handler('admin/createQuiz')
+        module = standin.load_handler('user/getQuizQuestions')
+        snapshots = dynamodb.Table('QuizSnapshots')
+        counts = standin.count_calls(quiz_common.aws.dynamodb_resource().meta.client)
+
+        print(f'{"questions":>9} {"source":<9} {"cache":<5} {"p50 ms":>8} {"p95 ms":>8} '
+              f'{"KB":>6}  calls per request')
+        for size in args.sizes:
+            with contextlib.redirect_stdout(io.StringIO()):
+                body = json.loads(create_quiz.lambda_handler(standin.admin_event('POST', {
+                    'title': f'Quiz of {size}', 'topic': 'bench', 'duration': 30, 'marks': size,
+                    'question_ids': [standin.question(i)['question_id'] for i in range(size)],
+                }), None)['body'])
+            event = standin.user_event('student1@example.com', params={'quiz_id': body['quiz_id']})
+
+            rows = []
+            for source in ('snapshot', 'tables'):
+                if source == 'tables':
+                    delete_snapshot(snapshots, body['quiz_id'])
+                for cold in (True, False):
+                    module.cache.clear()
+                    module.cache.version = None
+                    counts.clear()
+                    latencies, payload = measure(module, event, args.requests, cold)
+                    calls = ', '.join(f'{name}={n / args.requests:.2f}' for name, n in sorted(counts.items()))
+                    rows.append((source, 'cold' if cold else 'warm', latencies, len(payload), calls))
+            for source, cache, latencies, size_bytes, calls in rows:
+                print(f'{size:>9} {source:<9} {cache:<5} {percentile(latencies, 50):8.2f} '
+                      f'{percentile(latencies, 95):8.2f} {size_bytes / 1024:6.1f}  {calls}')
+
+
+if __name__ == '__main__':
+    main()
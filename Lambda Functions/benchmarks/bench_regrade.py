@@ -0,0 +1,62 @@
+"""Grading throughput of the regrade job, with and without NumPy.
+
+    pip install boto3 [numpy]
+    python "Lambda Functions/benchmarks/bench_regrade.py" [results ...]
+
+Grades synthetic results for a 20-question quiz in scan-page-sized batches
+with regradeQuiz's Grader, once per available backend.
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import standin  # noqa: E402
+
+QUESTIONS = 20
+PAGE = 2000     # roughly one 1 MB scan page of results
+
+
+def make_quiz():
+    questions = [standin.question(i) for i in range(QUESTIONS)]
+    return {
+        'quiz_id': 'quiz-bench',
+        'question_ids': [q['question_id'] for q in questions],
+        'answer_key': {q['question_id']: q['answer'].strip().lower() for q in questions},
+    }, questions
+
+
+def make_answers(questions, count, rng):
+    return [
+        {q['question_id']: rng.choice(list(q['options'].values())) for q in questions}
+        for _ in range(count)
+    ]
+
+
+def main(sizes):
+    standin.prepare_environment()
+    module = standin.load_handler('admin/regradeQuiz')
+    numpy = module.np
+    quiz, questions = make_quiz()
+    rng = random.Random(3)
+
+    backends = [('numpy', numpy)] if numpy is not None else []
+    backends.append(('python', None))
+    print(f'{"results":>8} {"backend":<8} {"seconds":>8} {"results/s":>10}')
+    for size in sizes:
+        answers = make_answers(questions, size, rng)
+        for name, backend in backends:
+            module.np = backend
+            grader = module.Grader(quiz)
+            start = time.perf_counter()
+            for offset in range(0, size, PAGE):
+                grader.grade(answers[offset:offset + PAGE])
+            elapsed = time.perf_counter() - start
+            print(f'{size:8d} {name:<8} {elapsed:8.2f} {size / elapsed:10.0f}')
+    module.np = numpy
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 300000])
@@ -0,0 +1,139 @@
+"""Compare raw and packed answer storage for Results items.
+
+    python "Lambda Functions/benchmarks/bench_result_encoding.py" [questions ...]
+
+Builds a synthetic quiz per question count and 2000 submissions against it,
+then reports the DynamoDB item size (by the documented sizing rules), the
+write and scan capacity that implies, and the per-item cost of the wire
+conversion boto3 does on put and read, with packing/unpacking included.
+"""
+import math
+import os
+import random
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'layer', 'python'))
+
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer  # noqa: E402
+
+from quiz_common.answers import (  # noqa: E402
+    OTHER_FIELD, PACKED_FIELD, pack_answers, question_choices, unpack_answers,
+)
+
+RESULTS = 2000
+INDEXES = 2     # Results GSIs, both projecting ALL: every write is paid three times
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+def value_size(value):
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, Binary)):
+        return len(bytes(value))
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, float, Decimal)):
+        digits = len(str(abs(value)).replace('.', '').lstrip('0')) or 1
+        return math.ceil(digits / 2) + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(k.encode()) + value_size(v) + 1 for k, v in value.items())
+    return 3 + sum(value_size(v) + 1 for v in value)
+
+
+def item_size(item):
+    return sum(len(name.encode()) + value_size(value) for name, value in item.items())
+
+
+def make_quiz(questions, rng):
+    question_ids = [f'q-{rng.getrandbits(32):08x}' for _ in range(questions)]
+    options = {
+        qid: {key: f'Answer {key} to question {qid} ' + 'x' * rng.randrange(10, 40) for key in 'ABCD'}
+        for qid in question_ids
+    }
+    return question_ids, {qid: question_choices({'options': opts}) for qid, opts in options.items()}
+
+
+def make_results(question_ids, choices, rng):
+    results = []
+    for i in range(RESULTS):
+        answers = {}
+        for qid in question_ids:
+            roll = rng.random()
+            if roll < 0.9:
+                answers[qid] = rng.choice(choices[qid])
+            elif roll < 0.92:
+                answers[qid] = 'free text answer'
+        results.append({
+            'result_id': f'res-{i:08x}',
+            'quiz_id': 'quiz-bench',
+            'user_email': f'student{i}@example.com',
+            'user_name': f'Student {i}',
+            'score': Decimal(rng.randrange(len(question_ids) + 1)),
+            'submitted_at': '2025-01-01T10:00:00.000000',
+            'answers': answers,
+        })
+    return results
+
+
+def packed_item(item, question_ids, choices):
+    packed, other = pack_answers(question_ids, choices, item['answers'])
+    result = {k: v for k, v in item.items() if k != 'answers'}
+    result[PACKED_FIELD] = Binary(packed)
+    if other:
+        result[OTHER_FIELD] = other
+    return result
+
+
+def serialize(item):
+    return {k: serializer.serialize(v) for k, v in item.items()}
+
+
+def deserialize(wire):
+    return {k: deserializer.deserialize(v) for k, v in wire.items()}
+
+
+def per_item_us(fn, items):
+    runs = min(timeit.repeat(lambda: [fn(i) for i in items], number=1, repeat=3))
+    return runs / len(items) * 1e6
+
+
+def main(sizes):
+    rng = random.Random(5)
+    print(f'{RESULTS} results per quiz; WCU include {INDEXES} ALL-projected indexes')
+    print(f'{"questions":>9} {"format":<7} {"bytes/item":>10} {"WCU/put":>8} '
+          f'{"RCU/10k scan":>12} {"put us":>8} {"read us":>8}')
+    for questions in sizes:
+        question_ids, choices = make_quiz(questions, rng)
+        raw = make_results(question_ids, choices, rng)
+        packed = [packed_item(item, question_ids, choices) for item in raw]
+
+        wire_raw = [serialize(item) for item in raw]
+        wire_packed = [serialize(item) for item in packed]
+
+        def put_packed(item):
+            return serialize(packed_item(item, question_ids, choices))
+
+        def read_packed(wire):
+            item = deserialize(wire)
+            return unpack_answers(question_ids, choices, item[PACKED_FIELD], item.get(OTHER_FIELD, {}))
+
+        rows = [
+            ('raw', raw, per_item_us(serialize, raw), per_item_us(deserialize, wire_raw)),
+            ('packed', packed, per_item_us(put_packed, raw), per_item_us(read_packed, wire_packed)),
+        ]
+        for name, items, put_us, read_us in rows:
+            sizes_ = [item_size(item) for item in items]
+            average = sum(sizes_) / len(sizes_)
+            wcu = sum(math.ceil(s / 1024) for s in sizes_) / len(sizes_) * (1 + INDEXES)
+            # Scans read 4 KB per eventually consistent half unit
+            rcu = average * 10000 / 4096 / 2
+            print(f'{questions:>9} {name:<7} {average:>10.0f} {wcu:>8.1f} {rcu:>12.0f} '
+                  f'{put_us:>8.1f} {read_us:>8.1f}')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10, 50, 200])
@@ -0,0 +1,71 @@
+"""Compare JSON serialization of DynamoDB-style items.
+
+    python "Lambda Functions/benchmarks/bench_serialization.py" [items ...]
+
+Runs the copy-then-dump helper the handlers used to carry (decimal_to_native),
+the old DecimalEncoder class, and quiz_common.responses.dumps.
+"""
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'layer', 'python'))
+
+from quiz_common.responses import dumps  # noqa: E402
+
+
+def decimal_to_native(obj):
+    if isinstance(obj, list):
+        return [decimal_to_native(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: decimal_to_native(v) for k, v in obj.items()}
+    elif isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    else:
+        return obj
+
+
+class DecimalEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, Decimal):
+            if o % 1 == 0:
+                return int(o)
+            else:
+                return float(o)
+        return super(DecimalEncoder, self).default(o)
+
+
+def make_results(count):
+    return [{
+        'result_id': f'res-{i:08d}',
+        'quiz_id': f'quiz-{i % 50:04d}',
+        'user_email': f'student{i}@example.com',
+        'user_name': f'Student {i}',
+        'score': Decimal(i % 20),
+        'percent': Decimal('72.5'),
+        'answers': {f'q{j}': f'option {j % 4}' for j in range(20)},
+        'submitted_at': '2025-01-01T10:00:00',
+    } for i in range(count)]
+
+
+CANDIDATES = {
+    'decimal_to_native + dumps': lambda items: json.dumps(decimal_to_native({'results': items})),
+    'DecimalEncoder': lambda items: json.dumps({'results': items}, cls=DecimalEncoder),
+    'quiz_common.responses.dumps': lambda items: dumps({'results': items}),
+}
+
+
+def main(sizes):
+    for size in sizes:
+        items = make_results(size)
+        repeat = max(1, 20000 // size)
+        print(f'{size} items ({repeat} runs each)')
+        for name, fn in CANDIDATES.items():
+            seconds = min(timeit.repeat(lambda: fn(items), number=repeat, repeat=3)) / repeat
+            print(f'  {name:<30} {seconds * 1000:9.2f} ms')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,190 @@
+"""Exam-end burst against submitQuiz with a throttled Results table.
+
+    pip install boto3 moto
+    python "Lambda Functions/benchmarks/bench_submit_burst.py" [--students 300] [--rate 150]
+
+Every student submits once, all at the same moment, from --concurrency
+threads. PutItem on Results is throttled by a token bucket (standin.throttle)
+and a share of successful writes loses its response, so the client sees an
+error although the result was saved. Clients retry failed submissions up to
+--client-retries times, as a student pressing Submit again would.
+
+Modes:
+  legacy     standard retries, no idempotency key (the old behaviour)
+  resilient  adaptive retries, Idempotency-Key, 503 + Retry-After
+  buffered   SUBMIT_MODE=buffered on an SQS stand-in, drained by queue_handler
+
+Reports client-visible failures, duplicate results, latency percentiles of
+the whole submission (including client retries) and throttled requests.
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import standin  # noqa: E402
+
+MODES = {
+    'legacy': {'env': {'AWS_RETRY_MODE': 'standard', 'AWS_MAX_ATTEMPTS': '5'}, 'key': False},
+    'resilient': {'env': {}, 'key': True},
+    'buffered': {'env': {'SUBMIT_MODE': 'buffered'}, 'key': True},
+}
+MODE_ENV = ('AWS_RETRY_MODE', 'AWS_MAX_ATTEMPTS', 'SUBMIT_MODE', 'SUBMISSION_QUEUE_URL')
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))] if ordered else 0.0
+
+
+def student_submission(handler, quiz, student, use_key, retries, rng_seed):
+    rng = random.Random(rng_seed)
+    event = standin.submit_event(quiz, f'student{student}@example.com', rng)
+    if use_key:
+        event['headers'] = {'Idempotency-Key': str(uuid.uuid4())}
+
+    start = time.perf_counter()
+    for _ in range(retries + 1):
+        result = handler.lambda_handler(event, None)
+        if result['statusCode'] < 500:
+            return time.perf_counter() - start, result['statusCode']
+        # Retry-After is seconds; the stand-in compresses time tenfold
+        delay = float(result['headers'].get('Retry-After', 1)) / 10
+        time.sleep(delay * (0.5 + rng.random()))
+    return time.perf_counter() - start, result['statusCode']
+
+
+def queue_empty(sqs, queue_url):
+    attributes = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=[
+        'ApproximateNumberOfMessages', 'ApproximateNumberOfMessagesNotVisible',
+    ])['Attributes']
+    return not any(int(n) for n in attributes.values())
+
+
+# Stand-in for the SQS event source mapping: workers receive batches of up to
+# ten, hand them to queue_handler and delete what it did not report as failed
+def drain(handler, sqs, queue_url, workers=4):
+    processed = []
+
+    def worker():
+        while True:
+            # Longer than any batch takes, as the function timeout would be
+            messages = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=10,
+                                           VisibilityTimeout=120).get('Messages', [])
+            if not messages:
+                if queue_empty(sqs, queue_url):
+                    return
+                time.sleep(0.05)
+                continue
+            records = [{'messageId': m['MessageId'], 'body': m['Body']} for m in messages]
+            failed = {f['itemIdentifier'] for f in handler.queue_handler({'Records': records}, None)['batchItemFailures']}
+            for message in messages:
+                if message['MessageId'] in failed:
+                    # Make it visible again right away instead of after the timeout
+                    sqs.change_message_visibility(QueueUrl=queue_url, ReceiptHandle=message['ReceiptHandle'],
+                                                  VisibilityTimeout=0)
+                else:
+                    sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=message['ReceiptHandle'])
+                    processed.append(message['MessageId'])
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(processed)
+
+
+def run(mode, args):
+    import boto3
+    from moto import mock_aws
+    import quiz_common.aws
+
+    settings = MODES[mode]
+    for name in MODE_ENV:
+        os.environ.pop(name, None)
+    os.environ.update(settings['env'])
+
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        standin.create_tables(dynamodb)
+        quiz_common.aws._config = None
+        quiz_common.aws._dynamodb = None
+        quiz_common.aws._clients.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            quiz_ids, quiz_items = standin.seed(dynamodb, questions=100, quizzes=1, results=0)
+        quiz = quiz_items[quiz_ids[0]]
+
+        sqs = boto3.client('sqs')
+        if mode == 'buffered':
+            os.environ['SUBMISSION_QUEUE_URL'] = sqs.create_queue(QueueName='submissions')['QueueUrl']
+
+        handler = standin.load_handler('user/submitQuiz')
+        client = quiz_common.aws.dynamodb_resource().meta.client
+        counts = standin.throttle(client, 'PutItem', 'Results', args.rate, args.burst, args.lost)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                outcomes = list(pool.map(
+                    lambda s: student_submission(handler, quiz, s, settings['key'], args.client_retries, s),
+                    range(args.students)
+                ))
+            accepted = time.perf_counter() - start
+            if mode == 'buffered':
+                drain(handler, sqs, os.environ['SUBMISSION_QUEUE_URL'])
+        finished = time.perf_counter() - start
+
+        results = dynamodb.Table('Results').scan()['Items']
+        saved_students = {item['user_email'] for item in results}
+        latencies = [seconds * 1000 for seconds, _ in outcomes]
+        failures = sum(1 for _, status in outcomes if status >= 500)
+        return {
+            'mode': mode,
+            'failed': failures,
+            'saved': len(saved_students),
+            'duplicates': len(results) - len(saved_students),
+            'p50': statistics.median(latencies),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'accepted_s': accepted,
+            'finished_s': finished,
+            'throttled': counts['throttled'],
+            'lost': counts['lost'],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=48)
+    parser.add_argument('--rate', type=float, default=150, help='Results writes per second')
+    parser.add_argument('--burst', type=float, default=20)
+    parser.add_argument('--lost', type=float, default=0.03, help='share of writes whose response is lost')
+    parser.add_argument('--client-retries', type=int, default=2)
+    parser.add_argument('modes', nargs='*', default=list(MODES))
+    args = parser.parse_args()
+
+    standin.prepare_environment()
+    print(f'{args.students} students, Results limited to {args.rate:g} writes/s '
+          f'(burst {args.burst:g}), {args.lost:.0%} lost responses')
+    print(f'{"mode":<10} {"failed":>6} {"saved":>6} {"dupes":>6} {"p50 ms":>8} {"p95 ms":>8} '
+          f'{"p99 ms":>8} {"accept s":>9} {"done s":>7} {"throttled":>9} {"lost":>5}')
+    for mode in args.modes:
+        r = run(mode, args)
+        print(f'{r["mode"]:<10} {r["failed"]:>6} {r["saved"]:>6} {r["duplicates"]:>6} {r["p50"]:>8.0f} '
+              f'{r["p95"]:>8.0f} {r["p99"]:>8.0f} {r["accepted_s"]:>9.2f} {r["finished_s"]:>7.2f} '
+              f'{r["throttled"]:>9} {r["lost"]:>5}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""Local AWS stand-in shared by the handler benchmarks.
+
+Uses moto (``pip install boto3 moto``) to emulate DynamoDB and Cognito, creates
+the tables and indexes listed in the README, seeds synthetic data and builds
+API Gateway events for every function under ``Lambda Functions/``.
+"""
+import importlib.util
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+LAYER = os.path.join(ROOT, 'layer', 'python')
+
+FUNCTIONS = [
+    'admin/addQuestion',
+    'admin/createQuiz',
+    'admin/dashboardSummary',
+    'admin/quizStats',
+    'admin/regradeQuiz',
+    'admin/viewQuestions',
+    'admin/viewScores',
+    'admin/viewUsers',
+    'user/getQuizQuestions',
+    'user/listQuizzes',
+    'user/submitQuiz',
+    'user/viewScore',
+]
+
+ADMIN_CLAIMS = {'cognito:groups': 'Admins', 'email': 'admin@example.com', 'name': 'Admin'}
+
+
+def prepare_environment():
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    if LAYER not in sys.path:
+        sys.path.insert(0, LAYER)
+
+
+def load_handler(function):
+    path = os.path.join(ROOT, function, 'function.py')
+    spec = importlib.util.spec_from_file_location('bench_' + function.replace('/', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _gsi(name, partition, sort):
+    return {
+        'IndexName': name,
+        'KeySchema': [
+            {'AttributeName': partition, 'KeyType': 'HASH'},
+            {'AttributeName': sort, 'KeyType': 'RANGE'},
+        ],
+        'Projection': {'ProjectionType': 'ALL'},
+    }
+
+
+def create_tables(dynamodb):
+    def create(name, key, attributes=(), indexes=(), sort_key=None):
+        key_schema = [{'AttributeName': key, 'KeyType': 'HASH'}]
+        if sort_key:
+            key_schema.append({'AttributeName': sort_key[0], 'KeyType': 'RANGE'})
+        definitions = {key: 'S', **dict(attributes)}
+        if sort_key:
+            definitions[sort_key[0]] = sort_key[1]
+        kwargs = {
+            'TableName': name,
+            'KeySchema': key_schema,
+            'AttributeDefinitions': [
+                {'AttributeName': n, 'AttributeType': t} for n, t in definitions.items()
+            ],
+            'BillingMode': 'PAY_PER_REQUEST',
+        }
+        if indexes:
+            kwargs['GlobalSecondaryIndexes'] = list(indexes)
+        dynamodb.create_table(**kwargs)
+
+    create('QuestionBank', 'question_id')
+    create('QuestionIndex', 'term', sort_key=('question_id', 'S'))
+    create('Quizzes', 'quiz_id', {'topic': 'S', 'created_at': 'S'},
+           [_gsi('topic-created_at-index', 'topic', 'created_at')])
+    create('Results', 'result_id', {'user_email': 'S', 'quiz_id': 'S', 'submitted_at': 'S'},
+           [_gsi('user_email-submitted_at-index', 'user_email', 'submitted_at'),
+            _gsi('quiz_id-submitted_at-index', 'quiz_id', 'submitted_at')])
+    create('QuizMeta', 'meta_key')
+    create('QuizSnapshots', 'quiz_id', sort_key=('part', 'N'))
+
+
+def create_user_pool(cognito, users):
+    pool_id = cognito.create_user_pool(PoolName='quiz-bench')['UserPool']['Id']
+    for group in ('Admins', 'Students'):
+        cognito.create_group(UserPoolId=pool_id, GroupName=group)
+    for i in range(users):
+        username = f'student{i}'
+        cognito.admin_create_user(
+            UserPoolId=pool_id, Username=username,
+            UserAttributes=[{'Name': 'email', 'Value': f'{username}@example.com'}]
+        )
+        cognito.admin_add_user_to_group(
+            UserPoolId=pool_id, Username=username, GroupName='Admins' if i == 0 else 'Students'
+        )
+    os.environ['USER_POOL_ID'] = pool_id
+    return pool_id
+
+
+# Count API calls made through a boto3 client, by operation name
+def count_calls(client):
+    counts = Counter()
+
+    def before_call(model, **kwargs):
+        counts[model.name] += 1
+
+    client.meta.events.register('before-call', before_call)
+    return counts
+
+
+# Token-bucket throttling of one DynamoDB operation on one table, in front of
+# moto: requests over `rate` per second (after a `burst`) get
+# ProvisionedThroughputExceededException. With lost_responses, that share of
+# the writes that did go through fail on the way back, as a timeout would.
+# The hook runs after botocore's own before-send handlers (the adaptive
+# rate limiter), the way a real endpoint sees the traffic.
+def throttle(client, operation, table_name, rate, burst, lost_responses=0.0, seed_value=3):
+    from botocore.awsrequest import AWSResponse
+    from botocore.exceptions import ConnectionClosedError
+    from moto.core.botocore_stubber import MockRawResponse
+    from moto.core.models import botocore_stubber
+
+    state = {'tokens': float(burst), 'at': time.monotonic()}
+    counts = Counter()
+    lock = threading.Lock()
+    rng = random.Random(seed_value)
+    # after-call has no request body, so before-send leaves its verdict here
+    local = threading.local()
+
+    def targeted(event_name, body):
+        return event_name.endswith(f'.{operation}') and json.loads(body or b'{}').get('TableName') == table_name
+
+    def before_send(request, event_name, **kwargs):
+        if not targeted(event_name, request.body):
+            return None
+        with lock:
+            now = time.monotonic()
+            state['tokens'] = min(burst, state['tokens'] + (now - state['at']) * rate)
+            state['at'] = now
+            if state['tokens'] >= 1:
+                state['tokens'] -= 1
+                counts['sent'] += 1
+                local.lose = rng.random() < lost_responses
+                return None
+            counts['throttled'] += 1
+        body = json.dumps({
+            '__type': 'com.amazonaws.dynamodb.v20120810#ProvisionedThroughputExceededException',
+            'message': 'The level of configured provisioned throughput for the table was exceeded.',
+        }).encode()
+        return AWSResponse(request.url, 400, {'Content-Type': 'application/x-amz-json-1.0'},
+                           MockRawResponse(body))
+
+    def after_call(http_response, **kwargs):
+        if getattr(local, 'lose', False) and http_response.status_code == 200:
+            local.lose = False
+            with lock:
+                counts['lost'] += 1
+            raise ConnectionClosedError(endpoint_url='https://dynamodb.stand-in')
+        local.lose = False
+
+    events = client.meta.events
+    events.unregister('before-send', botocore_stubber)
+    events.register_last('before-send', before_send)
+    events.register_last('before-send', botocore_stubber)
+    events.register('after-call.dynamodb', after_call)
+    return counts
+
+
+def question(i):
+    options = {str(o): f'Option {o} for question {i}' for o in range(4)}
+    return {
+        'question_id': f'q-{i:06d}',
+        'question_text': f'Synthetic question {i} about topic {i % 10}',
+        'topic': f'topic-{i % 10}',
+        'options': options,
+        'answer': options[str(i % 4)],
+    }
+
+
+# Seed questions, quizzes and results through the real createQuiz and
+# submitQuiz handlers so every derived item (answer keys, stats) exists.
+def seed(dynamodb, questions=200, quizzes=10, questions_per_quiz=20, results=500, users=50,
+         seed_value=7):
+    rng = random.Random(seed_value)
+    bank = dynamodb.Table('QuestionBank')
+    with bank.batch_writer() as batch:
+        for i in range(questions):
+            batch.put_item(Item=question(i))
+
+    view_questions = load_handler('admin/viewQuestions')
+    token = None
+    while True:
+        body = json.loads(view_questions.lambda_handler(
+            admin_event('PUT', {'reindex': True, 'next_token': token}), None)['body'])
+        token = body['next_token']
+        if not token:
+            break
+
+    create_quiz = load_handler('admin/createQuiz')
+    quiz_ids = []
+    for i in range(quizzes):
+        picked = rng.sample(range(questions), min(questions_per_quiz, questions))
+        body = json.loads(create_quiz.lambda_handler(admin_event('POST', {
+            'title': f'Quiz {i}',
+            'topic': f'topic-{i % 5}',
+            'duration': 30,
+            'marks': len(picked),
+            'question_ids': [question(q)['question_id'] for q in picked],
+        }), None)['body'])
+        quiz_ids.append(body['quiz_id'])
+
+    submit_quiz = load_handler('user/submitQuiz')
+    quiz_table = dynamodb.Table('Quizzes')
+    quiz_items = {qid: quiz_table.get_item(Key={'quiz_id': qid})['Item'] for qid in quiz_ids}
+    for i in range(results):
+        quiz = quiz_items[rng.choice(quiz_ids)]
+        submit_quiz.lambda_handler(submit_event(quiz, f'student{i % users}@example.com', rng), None)
+
+    return quiz_ids, quiz_items
+
+
+def admin_event(method='GET', body=None, params=None):
+    return {
+        'httpMethod': method,
+        'requestContext': {'authorizer': {'claims': ADMIN_CLAIMS}},
+        'queryStringParameters': params,
+        'body': json.dumps(body) if body is not None else None,
+    }
+
+
+def user_event(email, method='GET', body=None, params=None):
+    claims = {'cognito:groups': 'Students', 'email': email, 'name': email.split('@')[0]}
+    return {
+        'httpMethod': method,
+        'requestContext': {'authorizer': {'claims': claims}},
+        'queryStringParameters': params,
+        'body': json.dumps(body) if body is not None else None,
+    }
+
+
+def submit_event(quiz, email, rng):
+    answers = {
+        qid: answer if rng.random() < 0.6 else 'wrong'
+        for qid, answer in quiz['correct_answers'].items()
+    }
+    return user_event(email, 'POST', {'quiz_id': quiz['quiz_id'], 'answers': answers})
+
+
+# One representative request per function
+def sample_events(quiz_ids, quiz_items, rng=None, users=50):
+    rng = rng or random.Random(11)
+    quiz_id = quiz_ids[0]
+    return {
+        'admin/addQuestion': lambda: admin_event('POST', question(rng.randrange(10 ** 6))),
+        'admin/createQuiz': lambda: admin_event('POST', {
+            'title': 'Bench quiz', 'topic': 'topic-0', 'duration': 30, 'marks': 5,
+            'question_ids': list(quiz_items[quiz_id]['question_ids'])[:5],
+        }),
+        'admin/dashboardSummary': lambda: admin_event(),
+        'admin/quizStats': lambda: admin_event(params={'quiz_id': quiz_id}),
+        'admin/regradeQuiz': lambda: admin_event('POST', {'quiz_ids': [quiz_id]}),
+        'admin/viewQuestions': lambda: admin_event(params={
+            'q': 'synthetic question', 'topic': f'topic-{rng.randrange(10)}', 'limit': '50'}),
+        'admin/viewScores': lambda: admin_event(params={'quiz_id': quiz_id}),
+        'admin/viewUsers': lambda: admin_event(),
+        'user/getQuizQuestions': lambda: user_event(
+            'student1@example.com', params={'quiz_id': rng.choice(quiz_ids)}),
+        'user/listQuizzes': lambda: user_event('student1@example.com'),
+        'user/submitQuiz': lambda: submit_event(
+            quiz_items[rng.choice(quiz_ids)], f'student{rng.randrange(users)}@example.com', rng),
+        'user/viewScore': lambda: user_event(f'student{rng.randrange(users)}@example.com'),
+    }
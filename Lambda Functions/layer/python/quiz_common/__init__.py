@@ -0,0 +1,3 @@
+# Shared helpers for the quiz Lambda functions, deployed as a Lambda layer.
+# Lambda adds the layer's python/ directory to sys.path, so handlers simply
+# `import quiz_common`.
@@ -0,0 +1,121 @@
+import threading
+from quiz_common.batch import batch_get
+
+# Compact storage of a submission's answers. A quiz carries "choices",
+# {question_id: [answer text, ...]}, seeded from each question's option
+# values (in option key order) and only ever appended to, so an index keeps
+# its meaning after options are edited. A result then stores answers_packed:
+# one byte per question of the quiz's question_ids, 0 for unanswered and
+# n for choices[n - 1]. Answers that are not one of the choices are kept
+# verbatim in answers_other and marked OTHER.
+PACKED_FIELD = 'answers_packed'
+OTHER_FIELD = 'answers_other'
+UNANSWERED = 0
+OTHER = 255
+
+
+# The one normalization grading compares with; answer keys hold its result
+def normalize_answer(answer):
+    return str(answer).strip().lower()
+
+
+def question_choices(question):
+    options = question.get('options') or {}
+    if isinstance(options, dict):
+        return [options[key] for key in sorted(options)]
+    return list(options)
+
+
+# Grading data for the questions of question_ids found in questions
+# ({question_id: QuestionBank item}): answer_key holds normalized answers for
+# grading, correct_answers the original text that is sent back to the student
+# after submission, and choices the option list answers are packed against.
+def compile_answer_key(question_ids, questions):
+    answer_key, correct_answers, choices = {}, {}, {}
+    for qid in question_ids:
+        question = questions.get(qid)
+        if not question:
+            continue
+        answer = question.get('answer', '')
+        answer_key[qid] = normalize_answer(answer)
+        correct_answers[qid] = answer
+        choices[qid] = question_choices(question)
+    return answer_key, correct_answers, choices
+
+
+def pack_answers(question_ids, choices, answers):
+    packed = bytearray()
+    other = {}
+    for qid in question_ids:
+        answer = answers.get(qid)
+        if answer is None or answer == '':
+            packed.append(UNANSWERED)
+            continue
+        options = choices.get(qid) or []
+        code = options.index(answer) + 1 if answer in options else OTHER
+        if code >= OTHER:
+            packed.append(OTHER)
+            other[qid] = answer
+        else:
+            packed.append(code)
+    return bytes(packed), other
+
+
+def unpack_answers(question_ids, choices, packed, other):
+    answers = {}
+    for qid, code in zip(question_ids, bytes(packed)):
+        if code == OTHER:
+            answers[qid] = other.get(qid, '')
+        elif code != UNANSWERED:
+            answers[qid] = choices[qid][code - 1]
+    return answers
+
+
+# Decodes result items for readers, loading each quiz's question order and
+# choices once (one BatchGetItem per batch of unseen quizzes). Safe to share
+# between the threads of one invocation. Items stored with a plain answers
+# map pass through unchanged.
+class AnswerDecoder:
+    def __init__(self, quiz_table):
+        self.quiz_table = quiz_table
+        self._quizzes = {}
+        self._lock = threading.Lock()
+
+    def _load(self, items):
+        with self._lock:
+            missing = {item['quiz_id'] for item in items
+                       if PACKED_FIELD in item and item['quiz_id'] not in self._quizzes}
+        if not missing:
+            return
+        found = batch_get(self.quiz_table, list(missing), 'quiz_id',
+                          projection=('quiz_id', 'question_ids', 'choices'))
+        with self._lock:
+            for quiz_id in missing:
+                self._quizzes[quiz_id] = found.get(quiz_id)
+
+    # The answers map of one item; the quiz must already be loaded
+    def _answers(self, item):
+        if PACKED_FIELD not in item:
+            return item.get('answers') or {}
+        quiz = self._quizzes.get(item['quiz_id'])
+        if not quiz:
+            return {}
+        return unpack_answers(quiz.get('question_ids', []), quiz.get('choices', {}),
+                              item[PACKED_FIELD], item.get(OTHER_FIELD, {}))
+
+    # Answer maps for items, in order
+    def answers(self, items):
+        self._load(items)
+        return [self._answers(item) for item in items]
+
+    # Copies of items with the packed fields replaced by an answers map
+    def decode(self, items):
+        self._load(items)
+        decoded = []
+        for item in items:
+            if PACKED_FIELD in item:
+                answers = self._answers(item)
+                item = {k: v for k, v in item.items() if k not in (PACKED_FIELD, OTHER_FIELD)}
+                item['answers'] = answers
+            decoded.append(item)
+        return decoded
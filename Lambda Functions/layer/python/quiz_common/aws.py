@@ -0,0 +1,100 @@
+import os
+import threading
+from quiz_common.metrics import instrument_client
+
+# Table names can be overridden per function, as documented in the README
+TABLE_ENV = {
+    'QuestionBank': 'QUESTION_TABLE',
+    'QuestionIndex': 'QUESTION_INDEX_TABLE',
+    'Quizzes': 'QUIZ_TABLE',
+    'Results': 'RESULTS_TABLE',
+    'QuizMeta': 'META_TABLE',
+    'QuizSnapshots': 'SNAPSHOT_TABLE',
+}
+
+# Retry settings for functions that do not override them, see
+# set_retry_defaults; AWS_RETRY_MODE and AWS_MAX_ATTEMPTS take precedence
+_retry_defaults = {'mode': 'standard', 'max_attempts': 5}
+
+_lock = threading.Lock()
+_config = None
+_dynamodb = None
+_clients = {}
+
+
+# Change this function's default retry mode ("standard" or "adaptive", which
+# also rate-limits the client after throttling) and attempt count. Call it at
+# module scope, before the first client is built.
+def set_retry_defaults(mode=None, max_attempts=None):
+    if mode:
+        _retry_defaults['mode'] = mode
+    if max_attempts:
+        _retry_defaults['max_attempts'] = max_attempts
+
+
+# Connection pooling, TCP keep-alive, tight timeouts and jittered retries
+# (standard mode unless the function asks for adaptive) for every AWS client
+# the functions create
+def boto_config():
+    global _config
+    if _config is None:
+        from botocore.config import Config
+        _config = Config(
+            retries={
+                'mode': os.environ.get('AWS_RETRY_MODE', _retry_defaults['mode']),
+                'max_attempts': int(os.environ.get('AWS_MAX_ATTEMPTS', _retry_defaults['max_attempts'])),
+            },
+            max_pool_connections=int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', 32)),
+            tcp_keepalive=True,
+            connect_timeout=float(os.environ.get('AWS_CONNECT_TIMEOUT', 2)),
+            read_timeout=float(os.environ.get('AWS_READ_TIMEOUT', 10)),
+        )
+    return _config
+
+
+def dynamodb_resource():
+    global _dynamodb
+    if _dynamodb is None:
+        with _lock:
+            if _dynamodb is None:
+                import boto3
+                resource = boto3.resource('dynamodb', config=boto_config())
+                instrument_client(resource.meta.client)
+                _dynamodb = resource
+    return _dynamodb
+
+
+def client(service):
+    if service not in _clients:
+        with _lock:
+            if service not in _clients:
+                import boto3
+                _clients[service] = instrument_client(boto3.client(service, config=boto_config()))
+    return _clients[service]
+
+
+# Stand-in for a module-level boto3 object that is only built on first use,
+# so importing a handler does no client construction and warm invocations
+# reuse the same connections.
+class Lazy:
+    def __init__(self, factory):
+        self._factory = factory
+        self._target = None
+
+    def __getattr__(self, name):
+        if self._target is None:
+            self._target = self._factory()
+        return getattr(self._target, name)
+
+
+def lazy_resource():
+    return Lazy(dynamodb_resource)
+
+
+def lazy_table(default_name):
+    name = os.environ.get(TABLE_ENV.get(default_name, ''), default_name)
+    return Lazy(lambda: dynamodb_resource().Table(name))
+
+
+def lazy_client(service):
+    return Lazy(lambda: client(service))
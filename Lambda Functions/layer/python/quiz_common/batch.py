@@ -0,0 +1,81 @@
+import time
+from quiz_common.retry import backoff_delay
+
+BATCH_WRITE_LIMIT = 25     # DynamoDB BatchWriteItem hard limit per request
+BATCH_WRITE_MAX_RETRIES = 5
+BATCH_GET_LIMIT = 100      # DynamoDB BatchGetItem hard limit per request
+BATCH_GET_MAX_RETRIES = 5
+
+
+# key_name is one attribute name, or a tuple of them for composite keys
+def _request_key(request, key_name):
+    if 'PutRequest' in request:
+        item = request['PutRequest']['Item']
+    else:
+        item = request['DeleteRequest']['Key']
+    if isinstance(key_name, tuple):
+        return tuple(item[name] for name in key_name)
+    return item[key_name]
+
+
+# Write put/delete requests with BatchWriteItem, 25 per call. UnprocessedItems
+# are retried with jittered exponential backoff; a chunk that still fails only fails
+# its own rows. Requests must have unique keys (BatchWriteItem rejects
+# duplicates). Returns {key: error message} for every request not written,
+# keyed by the key value (a tuple for composite keys).
+def batch_write(table, requests, key_name):
+    client = table.meta.client
+    failures = {}
+
+    for start in range(0, len(requests), BATCH_WRITE_LIMIT):
+        pending = requests[start:start + BATCH_WRITE_LIMIT]
+        attempt = 0
+        while pending:
+            try:
+                response = client.batch_write_item(RequestItems={table.name: pending})
+            except Exception as e:
+                for request in pending:
+                    failures[_request_key(request, key_name)] = str(e)
+                break
+
+            pending = response.get('UnprocessedItems', {}).get(table.name, [])
+            if pending:
+                attempt += 1
+                if attempt > BATCH_WRITE_MAX_RETRIES:
+                    for request in pending:
+                        failures[_request_key(request, key_name)] = 'Throttled: not written after retries'
+                    break
+                time.sleep(backoff_delay(attempt))
+
+    return failures
+
+
+# Fetch items by partition key with BatchGetItem, 100 keys per call, retrying
+# UnprocessedKeys with jittered backoff. Returns {key value: item}; missing keys are
+# left out.
+def batch_get(table, keys, key_name, projection=None):
+    client = table.meta.client
+    found = {}
+    unique = list(dict.fromkeys(keys))
+
+    for start in range(0, len(unique), BATCH_GET_LIMIT):
+        request = {'Keys': [{key_name: key} for key in unique[start:start + BATCH_GET_LIMIT]]}
+        if projection:
+            request['ProjectionExpression'] = ', '.join(f'#p{i}' for i in range(len(projection)))
+            request['ExpressionAttributeNames'] = {f'#p{i}': name for i, name in enumerate(projection)}
+        pending = {table.name: request}
+
+        attempt = 0
+        while pending:
+            response = client.batch_get_item(RequestItems=pending)
+            for item in response.get('Responses', {}).get(table.name, []):
+                found[item[key_name]] = item
+
+            pending = response.get('UnprocessedKeys') or {}
+            if pending:
+                attempt += 1
+                if attempt > BATCH_GET_MAX_RETRIES:
+                    raise Exception('Too many unprocessed keys in BatchGetItem')
+                time.sleep(backoff_delay(attempt))
+
+    return found
@@ -0,0 +1,73 @@
+import os
+import time
+from collections import OrderedDict
+
+CATALOG_VERSION_KEY = 'catalog_version'
+
+
+# Bump the catalog version after any admin write to quizzes or questions.
+# Warm readers compare it against their cached version and drop stale entries.
+def bump_catalog_version(meta_table):
+    meta_table.update_item(
+        Key={'meta_key': CATALOG_VERSION_KEY},
+        UpdateExpression='ADD #v :one',
+        ExpressionAttributeNames={'#v': 'version'},
+        ExpressionAttributeValues={':one': 1}
+    )
+
+
+def read_catalog_version(meta_table):
+    item = meta_table.get_item(Key={'meta_key': CATALOG_VERSION_KEY}).get('Item') or {}
+    return int(item.get('version', 0))
+
+
+# In-process TTL + LRU cache. Create it at module scope so it survives across
+# invocations of a warm container.
+class QuizCache:
+    def __init__(self, max_entries=None, ttl_seconds=None):
+        self.max_entries = max_entries or int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+        self.ttl_seconds = ttl_seconds or int(os.environ.get('CACHE_TTL_SECONDS', 300))
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    # Drop everything if the admin writers bumped the catalog version.
+    # Returns the current version.
+    def sync_version(self, meta_table):
+        version = read_catalog_version(meta_table)
+        if version != self.version:
+            self.clear()
+            self.version = version
+        return version
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'version': self.version,
+        }
@@ -0,0 +1,162 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'QuizApp')
+
+# DynamoDB operations that accept ReturnConsumedCapacity, and whether their
+# capacity counts as reads or writes
+_CAPACITY_OPERATIONS = {
+    'GetItem': 'read', 'BatchGetItem': 'read', 'Query': 'read', 'Scan': 'read',
+    'TransactGetItems': 'read',
+    'PutItem': 'write', 'UpdateItem': 'write', 'DeleteItem': 'write',
+    'BatchWriteItem': 'write', 'TransactWriteItems': 'write',
+}
+
+# Lambda runs one invocation per container at a time, so the active record
+# is module state. Worker threads of that invocation report into it too.
+_current = None
+
+
+class InvocationMetrics:
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.calls = {}
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self.tables = {}
+        self.properties = {}
+        self._lock = threading.Lock()
+
+    def add_phase(self, name, ms):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    def add_call(self, service, operation):
+        key = f'{service}.{operation}'
+        with self._lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def add_capacity(self, operation, consumed):
+        kind = _CAPACITY_OPERATIONS.get(operation)
+        if not kind:
+            return
+        # Batch and transaction calls return one entry per table
+        entries = consumed if isinstance(consumed, list) else [consumed]
+        with self._lock:
+            for entry in entries:
+                units = float(entry.get('CapacityUnits', 0))
+                if kind == 'read':
+                    self.read_units += units
+                else:
+                    self.write_units += units
+                table = entry.get('TableName', '?')
+                self.tables[table] = self.tables.get(table, 0.0) + units
+
+    # Embedded metric format: CloudWatch extracts the listed metrics from
+    # this log line, and the rest stays searchable in Logs Insights
+    def emf(self, status):
+        duration = (time.perf_counter() - self.started) * 1000
+        dynamodb_calls = sum(n for key, n in self.calls.items() if key.startswith('dynamodb.'))
+        values = {
+            'DurationMs': (duration, 'Milliseconds'),
+            'DynamoDBCalls': (dynamodb_calls, 'Count'),
+            'ReadCapacityUnits': (self.read_units, 'None'),
+            'WriteCapacityUnits': (self.write_units, 'None'),
+        }
+        for name, ms in self.phases.items():
+            values[f'{name.capitalize()}Ms'] = (ms, 'Milliseconds')
+
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [['FunctionName']],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, (_, unit) in values.items()],
+                }],
+            },
+            'FunctionName': self.function_name,
+            'StatusCode': status,
+            'Calls': self.calls,
+            'CapacityByTable': self.tables,
+        }
+        record.update(self.properties)
+        record.update({name: value for name, (value, _) in values.items()})
+        return record
+
+
+# Time a block of the active invocation under name (auth, read, grade,
+# write, serialize, ...). A no-op outside an instrumented handler.
+@contextmanager
+def phase(name):
+    metrics = _current
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_phase(name, (time.perf_counter() - start) * 1000)
+
+
+def set_property(name, value):
+    if _current is not None:
+        _current.properties[name] = value
+
+
+# Wrap a lambda_handler so each invocation emits one EMF log line with its
+# duration, phase timings, AWS call counts and consumed DynamoDB capacity
+def instrumented(function_name):
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _current
+            metrics = _current = InvocationMetrics(function_name)
+            status = 500
+            try:
+                result = handler(event, context)
+                status = result.get('statusCode', 200) if isinstance(result, dict) else 200
+                return result
+            finally:
+                if _current is metrics:
+                    _current = None
+                print(json.dumps(metrics.emf(status), separators=(',', ':')))
+        return wrapper
+    return decorator
+
+
+# ReturnConsumedCapacity has to be added before parameter validation (and
+# after botocore copies DynamoDB params), and the call is counted once the
+# request is about to be sent
+def _before_parameter_build(params, model, **kwargs):
+    if _current is not None and model.name in _CAPACITY_OPERATIONS:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _count_call(model, **kwargs):
+    metrics = _current
+    if metrics is not None:
+        metrics.add_call(model.service_model.endpoint_prefix, model.name)
+
+
+def _after_call(http_response, parsed, model, **kwargs):
+    metrics = _current
+    if metrics is not None and 'ConsumedCapacity' in parsed:
+        metrics.add_capacity(model.name, parsed['ConsumedCapacity'])
+
+
+# Register the hooks on a botocore client; quiz_common.aws does this for
+# every client it builds
+def instrument_client(client):
+    events = client.meta.events
+    events.register('before-parameter-build.dynamodb', _before_parameter_build)
+    events.register('before-call', _count_call)
+    events.register('after-call.dynamodb', _after_call)
+    return client
@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+
+
+# LastEvaluatedKey <-> opaque cursor handed to clients. Numbers are tagged so
+# key attributes of type N survive the round trip as Decimal.
+def encode_token(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(
+        last_evaluated_key,
+        separators=(',', ':'),
+        default=lambda o: {'$n': str(o)} if isinstance(o, Decimal) else str(o)
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        key = json.loads(raw, object_hook=lambda d: Decimal(d['$n']) if set(d) == {'$n'} else d)
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid next_token')
+    if not isinstance(key, dict):
+        raise ValueError('Invalid next_token')
+    return key
+
+
+# Page size from ?limit=, clamped to [1, maximum]
+def page_limit(params, default=50, maximum=100):
+    try:
+        limit = int((params or {}).get('limit') or default)
+    except ValueError:
+        raise ValueError('limit must be a number')
+    return max(1, min(limit, maximum))
@@ -0,0 +1,71 @@
+import hashlib
+import heapq
+from boto3.dynamodb.conditions import Key
+from quiz_common.batch import batch_get
+from quiz_common.search import TOPIC_PREFIX, normalize_topic
+
+# A pooled quiz draws "count" questions per pool for each student. The pool
+# members are frozen at createQuiz time into one QuizMeta item per pool,
+# pool#<quiz_id>#<n>, holding the question ids as a single newline-joined
+# string (far smaller than a list attribute of the same ids).
+POOL_PREFIX = 'pool#'
+MAX_POOL_BYTES = 350_000    # stays under the 400 KB item limit
+MAX_POOLS = 20
+
+
+def pool_key(quiz_id, index):
+    return f'{POOL_PREFIX}{quiz_id}#{index}'
+
+
+# Question ids tagged with topic, from the topic postings of the search index
+def topic_question_ids(index_table, topic):
+    kwargs = {
+        'KeyConditionExpression': Key('term').eq(TOPIC_PREFIX + normalize_topic(topic)),
+        'ProjectionExpression': 'question_id',
+    }
+    question_ids = []
+    while True:
+        page = index_table.query(**kwargs)
+        question_ids.extend(item['question_id'] for item in page.get('Items', []))
+        if 'LastEvaluatedKey' not in page:
+            return question_ids
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+def pool_items(quiz_id, pools):
+    items = []
+    for index, question_ids in enumerate(pools):
+        members = '\n'.join(sorted(question_ids))
+        if len(members.encode()) > MAX_POOL_BYTES:
+            raise ValueError(f'Pool {index} is too large to store')
+        items.append({'meta_key': pool_key(quiz_id, index), 'question_ids': members})
+    return items
+
+
+# Member ids of every pool of quiz, in pool order
+def load_pools(meta_table, quiz):
+    keys = [pool_key(quiz['quiz_id'], index) for index in range(len(quiz.get('pools', [])))]
+    items = batch_get(meta_table, keys, 'meta_key')
+    return [
+        items[key]['question_ids'].split('\n') if key in items and items[key]['question_ids'] else []
+        for key in keys
+    ]
+
+
+def _rank(quiz_id, user, question_id):
+    return hashlib.blake2b(f'{quiz_id}\n{user}\n{question_id}'.encode(), digest_size=8).digest()
+
+
+# The questions one student gets: the quiz's fixed question_ids, then count
+# questions from each pool. Pool members are ordered by a keyed hash of
+# (quiz_id, user, question_id), so the same student always draws the same
+# questions in the same order and nothing per student has to be stored.
+def sample_question_ids(quiz, pools, user):
+    picked = list(quiz.get('question_ids', []))
+    seen = set(picked)
+    for spec, members in zip(quiz.get('pools', []), pools):
+        drawn = heapq.nsmallest(int(spec['count']), (m for m in members if m not in seen),
+                                key=lambda qid: _rank(quiz['quiz_id'], user, qid))
+        picked.extend(drawn)
+        seen.update(drawn)
+    return picked
@@ -0,0 +1,143 @@
+from quiz_common.answers import normalize_answer, question_choices
+from quiz_common.snapshots import publish_snapshots
+
+# Quizzes hold copies of their questions: the compiled answer key
+# (answer_key, correct_answers), the choices stored results are packed
+# against, and the QuizSnapshots body. Every writer of QuestionBank brings
+# them in line through sync_quizzes after changing or deleting questions.
+ANSWER_KEY_CHUNK = 50   # question ids per answer key UpdateItem
+
+
+# {quiz_id: [question_id, ...]} for quizzes using any of question_ids,
+# from one projected scan of Quizzes
+def quizzes_containing(quiz_table, question_ids):
+    wanted = set(question_ids)
+    found = {}
+    kwargs = {'ProjectionExpression': 'quiz_id, question_ids'}
+    while True:
+        page = quiz_table.scan(**kwargs)
+        for item in page.get('Items', []):
+            hits = [qid for qid in item.get('question_ids', []) if qid in wanted]
+            if hits:
+                found[item['quiz_id']] = hits
+        if 'LastEvaluatedKey' not in page:
+            break
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+    return found
+
+
+# Only the questions of each quiz that are in wanted
+def restrict(quizzes, wanted):
+    restricted = {}
+    for quiz_id, question_ids in quizzes.items():
+        hits = [qid for qid in question_ids if qid in wanted]
+        if hits:
+            restricted[quiz_id] = hits
+    return restricted
+
+
+# Keep the compiled answer key on every quiz using these questions in sync.
+# answers maps question_id to its new answer, or None when the question was
+# deleted (removed from the key); quizzes comes from quizzes_containing.
+def sync_answer_keys(quiz_table, answers, quizzes):
+    conditional_failed = quiz_table.meta.client.exceptions.ConditionalCheckFailedException
+    for quiz_id, question_ids in restrict(quizzes, answers).items():
+        for start in range(0, len(question_ids), ANSWER_KEY_CHUNK):
+            sets, removes = [], []
+            kwargs = {
+                'Key': {'quiz_id': quiz_id},
+                'ExpressionAttributeNames': {},
+                # Quizzes created before answer keys existed compile theirs on first submit
+                'ConditionExpression': 'attribute_exists(answer_key)',
+            }
+            values = {}
+            for i, qid in enumerate(question_ids[start:start + ANSWER_KEY_CHUNK]):
+                kwargs['ExpressionAttributeNames'][f'#q{i}'] = qid
+                if answers[qid] is None:
+                    removes.append(f'answer_key.#q{i}, correct_answers.#q{i}')
+                else:
+                    sets.append(f'answer_key.#q{i} = :k{i}, correct_answers.#q{i} = :a{i}')
+                    values[f':k{i}'] = normalize_answer(answers[qid])
+                    values[f':a{i}'] = answers[qid]
+            clauses = []
+            if sets:
+                clauses.append('SET ' + ', '.join(sets))
+                kwargs['ExpressionAttributeValues'] = values
+            if removes:
+                clauses.append('REMOVE ' + ', '.join(removes))
+            kwargs['UpdateExpression'] = ' '.join(clauses)
+            try:
+                quiz_table.update_item(**kwargs)
+            except conditional_failed:
+                pass
+
+
+# Add new option values to the choices of every quiz using these questions.
+# Stored results index into choices, so entries are only ever appended.
+def sync_choices(quiz_table, options, quizzes):
+    for quiz_id, question_ids in restrict(quizzes, options).items():
+        for start in range(0, len(question_ids), ANSWER_KEY_CHUNK):
+            chunk = question_ids[start:start + ANSWER_KEY_CHUNK]
+            names = {f'#q{i}': qid for i, qid in enumerate(chunk)}
+            quiz = quiz_table.get_item(
+                Key={'quiz_id': quiz_id},
+                ProjectionExpression=', '.join(f'choices.{name}' for name in names),
+                ExpressionAttributeNames=names
+            ).get('Item')
+            if not quiz or 'choices' not in quiz:
+                continue  # compiled from QuestionBank on the next submission
+
+            sets, values = [], {}
+            for i, qid in enumerate(chunk):
+                current = quiz['choices'].get(qid)
+                new = question_choices({'options': options[qid]})
+                if current is None:
+                    sets.append(f'choices.#q{i} = :c{i}')
+                    values[f':c{i}'] = new
+                else:
+                    added = [value for value in new if value not in current]
+                    if added:
+                        sets.append(f'choices.#q{i} = list_append(choices.#q{i}, :c{i})')
+                        values[f':c{i}'] = added
+            if not sets:
+                continue
+            used = {f'#q{i}': qid for i, qid in enumerate(chunk) if f':c{i}' in values}
+            quiz_table.update_item(
+                Key={'quiz_id': quiz_id},
+                UpdateExpression='SET ' + ', '.join(sets),
+                ExpressionAttributeNames=used,
+                ExpressionAttributeValues=values
+            )
+
+
+# Bring the quizzes using changed questions in line. updates are dicts of
+# question_id plus the fields that changed; deleted are question ids. A
+# quiz whose snapshot cannot be republished loses it, and getQuizQuestions
+# builds its body from the tables until the next publish or rebuild.
+def sync_quizzes(quiz_table, question_table, snapshot_table, updates=(), deleted=()):
+    deleted = list(deleted)
+    question_ids = [update['question_id'] for update in updates] + deleted
+    if not question_ids:
+        return
+    quizzes = quizzes_containing(quiz_table, question_ids)
+    if not quizzes:
+        return
+
+    answers = {update['question_id']: update['answer'] for update in updates if 'answer' in update}
+    answers.update(dict.fromkeys(deleted))
+    if answers:
+        sync_answer_keys(quiz_table, answers, quizzes)
+    options = {update['question_id']: update['options'] for update in updates if 'options' in update}
+    if options:
+        sync_choices(quiz_table, options, quizzes)
+
+    # Students never see the answer, so answer-only edits keep the snapshots
+    visible = {update['question_id'] for update in updates if set(update) - {'question_id', 'answer'}}
+    visible.update(deleted)
+    stale = restrict(quizzes, visible)
+    if not stale:
+        return
+    statuses = publish_snapshots(snapshot_table, quiz_table, question_table, list(stale))
+    failed = {qid: status for qid, status in statuses.items() if status not in ('published', 'pooled')}
+    if failed:
+        print('Snapshot refresh failed for', len(failed), 'quizzes:', list(failed.items())[:5])
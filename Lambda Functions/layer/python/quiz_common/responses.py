@@ -0,0 +1,171 @@
+import base64
+import hashlib
+import json
+import os
+import zlib
+from decimal import Decimal
+from quiz_common.metrics import phase
+
+ALLOW_HEADERS = 'Authorization, Content-Type, If-None-Match, Idempotency-Key'
+
+# Bodies smaller than this are sent as-is; compressing them costs more than
+# it saves on the wire
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 4096))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+# zlib wbits per Content-Encoding: gzip container, or zlib stream ("deflate")
+_ENCODINGS = {'gzip': 31, 'deflate': 15}
+
+# Prebuilt CORS header dicts, one per method list, shared by every response
+_cors_headers = {}
+
+
+def cors_headers(methods='GET, POST, OPTIONS'):
+    headers = _cors_headers.get(methods)
+    if headers is None:
+        headers = _cors_headers[methods] = {
+            'Access-Control-Allow-Origin': '*',
+            'Access-Control-Allow-Headers': ALLOW_HEADERS,
+            'Access-Control-Allow-Methods': methods
+        }
+    return headers
+
+
+# Called by the C encoder only for values it cannot serialize itself, so
+# DynamoDB items are encoded in one pass without building a converted copy.
+def _encode_dynamodb(o):
+    if isinstance(o, Decimal):
+        # Convert Decimal to int if it's a whole number, else float
+        return int(o) if o == o.to_integral_value() else float(o)
+    if isinstance(o, (set, frozenset)):
+        return sorted(o)
+    if isinstance(o, (bytes, bytearray)):
+        return o.decode('utf-8', 'replace')
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    return json.dumps(obj, default=_encode_dynamodb, separators=(',', ':'))
+
+
+# API Gateway proxy response with CORS headers and a Decimal-aware JSON body
+def response(status, body, methods='GET, POST, OPTIONS', headers=None):
+    with phase('serialize'):
+        encoded = dumps(body)
+    return raw_response(status, encoded, methods, headers)
+
+
+# The same for a body that is already JSON-encoded
+def raw_response(status, encoded, methods='GET, POST, OPTIONS', headers=None):
+    return {
+        'statusCode': status,
+        'headers': dict(cors_headers(methods), **headers) if headers else cors_headers(methods),
+        'body': encoded
+    }
+
+
+# Case-insensitive request header lookup (API Gateway keeps client casing)
+def request_header(event, name):
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+# The request body as text. With binary media types configured on the API
+# (see README) API Gateway passes request bodies base64-encoded as well.
+def request_text(event):
+    raw = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        raw = base64.b64decode(raw).decode('utf-8-sig')
+    return raw
+
+
+# The decoded JSON request body; an empty body is {}
+def json_body(event):
+    return json.loads(request_text(event) or '{}')
+
+
+# Strong ETag for content fully determined by parts, e.g. the catalog
+# version plus the request parameters
+def etag(*parts):
+    digest = hashlib.sha1('\x1f'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+# True when the client's If-None-Match already holds tag. "*" matches any
+# current representation, so callers pass exists=False until they know the
+# resource is there.
+def not_modified(event, tag, exists=True):
+    header = request_header(event, 'If-None-Match')
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(',')]
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return ((exists and '*' in candidates)
+            or tag in (c[2:] if c.startswith('W/') else c for c in candidates))
+
+
+# Cached responses are only served to authenticated callers, so only the
+# caller's own (browser) cache may keep them, never a shared cache or CDN
+def cache_headers(tag, max_age):
+    return {
+        'ETag': tag,
+        'Cache-Control': f'private, max-age={max_age}',
+        'Access-Control-Expose-Headers': 'ETag',
+    }
+
+
+# 304 with the validators and no body, for a matching If-None-Match
+def not_modified_response(tag, max_age, methods='GET, POST, OPTIONS'):
+    return {
+        'statusCode': 304,
+        'headers': dict(cors_headers(methods), **cache_headers(tag, max_age)),
+        'body': ''
+    }
+
+
+# Pick gzip or deflate from Accept-Encoding, honouring q=0; None if neither
+def accepted_encoding(event):
+    header = request_header(event, 'Accept-Encoding')
+    if not header:
+        return None
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding.strip().lower()] = q
+    for coding in ('gzip', 'deflate'):
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > 0:
+            return coding
+    return None
+
+
+# Compress a built proxy response for the client when the body is over
+# COMPRESS_MIN_BYTES. API Gateway decodes the base64 body when the API has
+# binary media types configured (see README).
+def compress(result, event, min_bytes=None):
+    body = result.get('body') or ''
+    if result.get('isBase64Encoded') or len(body) < (min_bytes or COMPRESS_MIN_BYTES):
+        return result
+    coding = accepted_encoding(event)
+    if coding is None:
+        return result
+
+    with phase('compress'):
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, _ENCODINGS[coding])
+        data = compressor.compress(body.encode('utf-8')) + compressor.flush()
+        encoded = base64.b64encode(data).decode('ascii')
+    headers = dict(result.get('headers') or {})
+    headers['Content-Encoding'] = coding
+    headers['Vary'] = 'Accept-Encoding'
+    headers.setdefault('Content-Type', 'application/json')
+    return dict(result, headers=headers, body=encoded, isBase64Encoded=True)
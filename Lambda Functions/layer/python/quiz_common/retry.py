@@ -0,0 +1,22 @@
+import random
+
+# Error codes AWS uses when a request was rejected for rate or capacity
+# reasons; the request can be repeated after backing off
+THROTTLE_CODES = frozenset({
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+    'SlowDown',
+})
+
+
+def is_throttle(error):
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') in THROTTLE_CODES
+
+
+# Full-jitter exponential backoff: a random delay up to base * 2^attempt,
+# capped, so clients throttled together do not retry in lockstep
+def backoff_delay(attempt, base=0.05, cap=1.0):
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
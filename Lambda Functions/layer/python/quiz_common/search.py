@@ -0,0 +1,106 @@
+import re
+from boto3.dynamodb.conditions import Key
+from quiz_common.batch import batch_get, batch_write
+
+# QuestionIndex table: partition key "term", sort key "question_id". Terms are
+# w#<word> for each distinct word of question_text and t#<topic>.
+WORD_PREFIX = 'w#'
+TOPIC_PREFIX = 't#'
+INDEX_KEY = ('term', 'question_id')
+
+SEARCH_FIELDS = ('question_id', 'question_text', 'topic')
+MAX_ROUNDS = 10     # index pages read per search call before returning a cursor
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from how in is it of on or that the this to what '
+    'when where which who why with'.split()
+)
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    return {
+        word for word in _WORD.findall(str(text or '').lower())
+        if len(word) > 1 and word not in STOPWORDS
+    }
+
+
+def normalize_topic(topic):
+    return str(topic).strip().lower() if topic else None
+
+
+def index_terms(question):
+    terms = {WORD_PREFIX + word for word in tokenize(question.get('question_text'))}
+    topic = normalize_topic(question.get('topic'))
+    if topic:
+        terms.add(TOPIC_PREFIX + topic)
+    return terms
+
+
+def _postings(question_id, terms, request):
+    if request == 'PutRequest':
+        return [{'PutRequest': {'Item': {'term': t, 'question_id': question_id}}} for t in terms]
+    return [{'DeleteRequest': {'Key': {'term': t, 'question_id': question_id}}} for t in terms]
+
+
+# Bring the index in line with question changes. changes is a list of
+# (question_id, old question or None, new question or None); only postings
+# whose terms differ are written. Returns {(term, question_id): error}.
+def update_index(index_table, changes):
+    requests = []
+    for question_id, old, new in changes:
+        old_terms = index_terms(old) if old else set()
+        new_terms = index_terms(new) if new else set()
+        requests += _postings(question_id, new_terms - old_terms, 'PutRequest')
+        requests += _postings(question_id, old_terms - new_terms, 'DeleteRequest')
+    return batch_write(index_table, requests, INDEX_KEY)
+
+
+def _matches(question, words, topic):
+    if topic and normalize_topic(question.get('topic')) != topic:
+        return False
+    return words <= tokenize(question.get('question_text'))
+
+
+# One page of questions matching every keyword (whole words, any order) and
+# the topic. The most selective term drives a Query on the index in
+# question_id order; candidates are then loaded and checked against their
+# current text, so postings left behind by an interrupted write never
+# produce a wrong hit. Returns (questions, cursor or None).
+def search_questions(index_table, question_table, query, topic, limit, after=None):
+    words = tokenize(query)
+    topic = normalize_topic(topic)
+    if topic:
+        driving = TOPIC_PREFIX + topic
+    elif words:
+        # Longer words tend to be rarer, so they make shorter posting lists
+        driving = WORD_PREFIX + max(words, key=lambda w: (len(w), w))
+    else:
+        return None
+
+    found = []
+    for _ in range(MAX_ROUNDS):
+        kwargs = {
+            'KeyConditionExpression': Key('term').eq(driving),
+            'ProjectionExpression': 'question_id',
+            'Limit': max(limit - len(found), 25),
+        }
+        if after:
+            kwargs['ExclusiveStartKey'] = {'term': driving, 'question_id': after}
+        page = index_table.query(**kwargs)
+        candidates = [item['question_id'] for item in page.get('Items', [])]
+
+        questions = batch_get(question_table, candidates, 'question_id')
+        for question_id in candidates:
+            after = question_id
+            question = questions.get(question_id)
+            if question and _matches(question, words, topic):
+                found.append(question)
+                if len(found) == limit:
+                    return found, after
+
+        if 'LastEvaluatedKey' not in page:
+            return found, None
+
+    return found, after
@@ -0,0 +1,133 @@
+import hashlib
+from boto3.dynamodb.conditions import Key
+from quiz_common.batch import batch_get, batch_write
+from quiz_common.responses import dumps
+
+# The student-facing getQuizQuestions body of a quiz, JSON-encoded once when
+# the quiz or one of its questions is written and stored in QuizSnapshots
+# (partition key quiz_id, sort key part). Bodies over PART_BYTES are split
+# into several parts; every part carries the snapshot id (a digest of the
+# body) and the part count, so a reader that catches a publish half-way sees
+# mismatched parts and falls back to building the body itself. Pooled
+# quizzes differ per student and have no snapshot.
+SNAPSHOT_KEY = ('quiz_id', 'part')
+PART_BYTES = 350_000    # stays under the 400 KB item limit
+
+# Grading data stored on the quiz item that must never reach students, and
+# the answer codebook, which the client has no use for
+PRIVATE_QUIZ_FIELDS = ('answer_key', 'correct_answers', 'choices')
+PRIVATE_QUESTION_FIELDS = ('answer',)
+
+
+# The getQuizQuestions body for quiz with questions in question_ids order
+def student_view(quiz, question_ids, questions):
+    metadata = {k: v for k, v in quiz.items() if k not in PRIVATE_QUIZ_FIELDS}
+    metadata['question_ids'] = question_ids
+    return {
+        'quiz_id': quiz['quiz_id'],
+        'metadata': metadata,
+        'questions': [
+            {k: v for k, v in question.items() if k not in PRIVATE_QUESTION_FIELDS}
+            for question in questions
+        ],
+    }
+
+
+def _part_numbers(snapshot_table, quiz_id):
+    kwargs = {
+        'KeyConditionExpression': Key('quiz_id').eq(quiz_id),
+        'ProjectionExpression': '#part',
+        'ExpressionAttributeNames': {'#part': 'part'},   # reserved word
+    }
+    parts = []
+    while True:
+        page = snapshot_table.query(**kwargs)
+        parts.extend(int(item['part']) for item in page.get('Items', []))
+        if 'LastEvaluatedKey' not in page:
+            return parts
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+
+# Write the snapshot of a non-pooled quiz; questions maps question_id to its
+# QuestionBank item. Parts left over from a longer previous snapshot are
+# deleted in the same batch.
+def publish_snapshot(snapshot_table, quiz, questions):
+    quiz_id = quiz['quiz_id']
+    question_ids = quiz.get('question_ids', [])
+    body = dumps(student_view(quiz, question_ids, [questions[q] for q in question_ids if q in questions]))
+    data = body.encode('utf-8')
+    snapshot_id = hashlib.blake2b(data, digest_size=8).hexdigest()
+    chunks = [data[start:start + PART_BYTES] for start in range(0, len(data), PART_BYTES)] or [b'']
+
+    requests = [
+        {'PutRequest': {'Item': {
+            'quiz_id': quiz_id, 'part': n, 'snapshot_id': snapshot_id, 'parts': len(chunks), 'body': chunk,
+        }}}
+        for n, chunk in enumerate(chunks)
+    ]
+    requests += [
+        {'DeleteRequest': {'Key': {'quiz_id': quiz_id, 'part': n}}}
+        for n in _part_numbers(snapshot_table, quiz_id) if n >= len(chunks)
+    ]
+    failures = batch_write(snapshot_table, requests, SNAPSHOT_KEY)
+    if failures:
+        raise Exception(f'Could not write snapshot of {quiz_id}: {list(failures.values())[0]}')
+    return snapshot_id
+
+
+def delete_snapshot(snapshot_table, quiz_id):
+    requests = [{'DeleteRequest': {'Key': {'quiz_id': quiz_id, 'part': n}}}
+                for n in _part_numbers(snapshot_table, quiz_id)]
+    batch_write(snapshot_table, requests, SNAPSHOT_KEY)
+
+
+# Load the quizzes and all their questions in BatchGetItem calls, then
+# publish a snapshot per quiz (or drop it, for pooled quizzes). A quiz that
+# cannot be published has its snapshot deleted so readers do not serve a
+# stale one. Returns {quiz_id: status}: published, pooled, missing or the
+# error message.
+def publish_snapshots(snapshot_table, quiz_table, question_table, quiz_ids):
+    quizzes = batch_get(quiz_table, quiz_ids, 'quiz_id')
+    needed = [qid for quiz in quizzes.values() if not quiz.get('pools') for qid in quiz.get('question_ids', [])]
+    questions = batch_get(question_table, needed, 'question_id')
+
+    statuses = {}
+    for quiz_id in dict.fromkeys(quiz_ids):
+        quiz = quizzes.get(quiz_id)
+        try:
+            if quiz is None:
+                statuses[quiz_id] = 'missing'
+                delete_snapshot(snapshot_table, quiz_id)
+            elif quiz.get('pools'):
+                statuses[quiz_id] = 'pooled'
+                delete_snapshot(snapshot_table, quiz_id)
+            else:
+                publish_snapshot(snapshot_table, quiz, questions)
+                statuses[quiz_id] = 'published'
+        except Exception as e:
+            statuses[quiz_id] = str(e)
+            try:
+                delete_snapshot(snapshot_table, quiz_id)
+            except Exception as error:
+                print('Could not delete snapshot of', quiz_id, str(error))
+    return statuses
+
+
+# The pre-encoded body of quiz_id from one Query, or None when there is no
+# complete snapshot
+def read_snapshot(snapshot_table, quiz_id):
+    kwargs = {'KeyConditionExpression': Key('quiz_id').eq(quiz_id)}
+    items = []
+    while True:
+        page = snapshot_table.query(**kwargs)
+        items.extend(page.get('Items', []))
+        if 'LastEvaluatedKey' not in page:
+            break
+        kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+    if not items:
+        return None
+    first = items[0]
+    if len(items) != int(first['parts']) or any(item['snapshot_id'] != first['snapshot_id'] for item in items):
+        return None
+    return b''.join(bytes(item['body']) for item in items).decode('utf-8')
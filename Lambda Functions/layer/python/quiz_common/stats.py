@@ -0,0 +1,303 @@
+import os
+from decimal import Decimal
+from quiz_common.summary import SUMMARY_KEY
+
+# Per-quiz aggregates live in the QuizMeta table under stats#<quiz_id>.
+# Histogram buckets and per-question counters are top-level attributes
+# (hist#<bucket>, correct#<question_id>) because ADD only works on
+# top-level attributes; read_quiz_stats folds them back into maps.
+STATS_PREFIX = 'stats#'
+HIST_PREFIX = 'hist#'
+CORRECT_PREFIX = 'correct#'
+
+LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', 10))
+LEADERBOARD_RETRIES = 3
+COUNTERS_PER_UPDATE = 200  # keeps each UpdateExpression well under 4 KB
+FENCE_RETRIES = 5
+
+# Attributes a regrade job keeps on the aggregate while it rebuilds it (see
+# fence_quiz_stats), and the Results attribute naming the job during which
+# an attempt was counted live
+FENCE_FIELDS = ('regrade_job', 'regrade_step', 'regrade_baseline')
+LIVE_MARK = 'counted_live'
+
+
+def stats_key(quiz_id):
+    return {'meta_key': f'{STATS_PREFIX}{quiz_id}'}
+
+
+# 10%-wide score buckets: 0, 10, ..., 90, 100
+def histogram_bucket(score, max_score):
+    if not max_score:
+        return 0
+    percent = int(Decimal(score) * 100 / Decimal(max_score))
+    return max(0, min(percent // 10 * 10, 100))
+
+
+def _is_conditional_failure(table, error):
+    return isinstance(error, table.meta.client.exceptions.ConditionalCheckFailedException)
+
+
+# Fold one graded attempt into the quiz aggregate with atomic ADD counters,
+# then tighten min/max and the leaderboard with conditional writes. While a
+# regrade job holds the aggregate, mark_live(job_id) is called before the
+# attempt is counted, so the job can leave the attempt out of the totals it
+# rebuilds (see fence_quiz_stats).
+def record_attempt(meta_table, quiz_id, score, max_score, correct_qids, entry, mark_live=None):
+    key = stats_key(quiz_id)
+    counters = [f'{CORRECT_PREFIX}{qid}' for qid in correct_qids]
+    first, rest = counters[:COUNTERS_PER_UPDATE], counters[COUNTERS_PER_UPDATE:]
+
+    names = {'#h': f'{HIST_PREFIX}{histogram_bucket(score, max_score)}'}
+    names.update({f'#c{i}': name for i, name in enumerate(first)})
+    adds = ['attempts :one', 'score_sum :score', '#h :one'] + [f'#c{i} :one' for i in range(len(first))]
+
+    update = {
+        'Key': key,
+        'UpdateExpression': 'ADD ' + ', '.join(adds),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': {':one': 1, ':score': score},
+        'ReturnValues': 'ALL_NEW',
+    }
+    try:
+        stats = meta_table.update_item(
+            ConditionExpression='attribute_not_exists(regrade_job)',
+            ReturnValuesOnConditionCheckFailure='ALL_OLD',
+            **update
+        )['Attributes']
+    except Exception as e:
+        if not _is_conditional_failure(meta_table, e):
+            raise
+        # The item comes back as raw attribute values
+        if mark_live:
+            mark_live(e.response['Item']['regrade_job']['S'])
+        stats = meta_table.update_item(**update)['Attributes']
+
+    for start in range(0, len(rest), COUNTERS_PER_UPDATE):
+        chunk = rest[start:start + COUNTERS_PER_UPDATE]
+        meta_table.update_item(
+            Key=key,
+            UpdateExpression='ADD ' + ', '.join(f'#c{i} :one' for i in range(len(chunk))),
+            ExpressionAttributeNames={f'#c{i}': name for i, name in enumerate(chunk)},
+            ExpressionAttributeValues={':one': 1}
+        )
+
+    if stats.get('min_score') is None or score < stats['min_score']:
+        _set_if_better(meta_table, key, 'min_score', '>', score)
+    if stats.get('max_score') is None or score > stats['max_score']:
+        _set_if_better(meta_table, key, 'max_score', '<', score)
+
+    update_leaderboard(meta_table, key, stats, dict(entry, score=score))
+
+
+# SET attr = score unless a concurrent attempt already stored a better value
+def _set_if_better(meta_table, key, attr, comparison, score):
+    try:
+        meta_table.update_item(
+            Key=key,
+            UpdateExpression=f'SET {attr} = :score',
+            ConditionExpression=f'attribute_not_exists({attr}) OR {attr} {comparison} :score',
+            ExpressionAttributeValues={':score': score}
+        )
+    except Exception as e:
+        if not _is_conditional_failure(meta_table, e):
+            raise
+
+
+# Best attempt per user, highest LEADERBOARD_SIZE kept
+def merge_leaderboard(board, entries):
+    best = {e['user_email']: e for e in board}
+    for entry in entries:
+        previous = best.get(entry['user_email'])
+        if previous is None or entry['score'] > previous['score']:
+            best[entry['user_email']] = entry
+    # Earlier attempts win ties, as they do on the live leaderboard
+    ranked = sorted(best.values(), key=lambda e: (-e['score'], e.get('submitted_at') or ''))
+    return ranked[:LEADERBOARD_SIZE]
+
+
+# Top-N leaderboard (best attempt per user), updated with optimistic locking
+# on lb_version so concurrent submissions never overwrite each other.
+def update_leaderboard(meta_table, key, stats, entry):
+    for _ in range(LEADERBOARD_RETRIES):
+        board = stats.get('leaderboard', [])
+        if len(board) >= LEADERBOARD_SIZE and board[-1]['score'] >= entry['score']:
+            return
+
+        previous = next((e for e in board if e['user_email'] == entry['user_email']), None)
+        if previous and previous['score'] >= entry['score']:
+            return
+
+        board = [e for e in board if e is not previous] + [entry]
+        board.sort(key=lambda e: e['score'], reverse=True)
+        version = stats.get('lb_version', 0)
+        try:
+            meta_table.update_item(
+                Key=key,
+                UpdateExpression='SET leaderboard = :board, lb_version = :next',
+                ConditionExpression='attribute_not_exists(lb_version) OR lb_version = :version',
+                ExpressionAttributeValues={
+                    ':board': board[:LEADERBOARD_SIZE],
+                    ':next': version + 1,
+                    ':version': version,
+                }
+            )
+            return
+        except Exception as e:
+            if not _is_conditional_failure(meta_table, e):
+                raise
+            stats = meta_table.get_item(Key=key, ConsistentRead=True).get('Item', {})
+
+
+# The whole aggregate for one quiz in a single read
+def read_quiz_stats(meta_table, quiz_id):
+    item = meta_table.get_item(Key=stats_key(quiz_id)).get('Item')
+    if not item:
+        return None
+
+    attempts = item.get('attempts', 0)
+    return {
+        'quiz_id': quiz_id,
+        'attempts': attempts,
+        'score_sum': item.get('score_sum', 0),
+        'average_score': item.get('score_sum', 0) / attempts if attempts else 0,
+        'min_score': item.get('min_score'),
+        'max_score': item.get('max_score'),
+        'histogram': {
+            k[len(HIST_PREFIX):]: v for k, v in item.items() if k.startswith(HIST_PREFIX)
+        },
+        'correct_by_question': {
+            k[len(CORRECT_PREFIX):]: v for k, v in item.items() if k.startswith(CORRECT_PREFIX)
+        },
+        'leaderboard': item.get('leaderboard', []),
+    }
+
+
+# The ADD counters of an aggregate item, by attribute name
+def _counters(item):
+    return {
+        name: value for name, value in item.items()
+        if name in ('attempts', 'score_sum') or name.startswith((HIST_PREFIX, CORRECT_PREFIX))
+    }
+
+
+# The same for rebuilt totals: attempts, score_sum, min_score, max_score,
+# histogram {bucket: n}, correct {question_id: n} and leaderboard
+def _totals_counters(totals):
+    counters = {'attempts': totals['attempts'], 'score_sum': totals['score_sum']}
+    counters.update({f'{HIST_PREFIX}{bucket}': n for bucket, n in totals['histogram'].items()})
+    counters.update({f'{CORRECT_PREFIX}{qid}': n for qid, n in totals['correct'].items()})
+    return counters
+
+
+# Hand the aggregate of quiz_id to regrade job job_id. The counters as they
+# stand are kept as the baseline the job's rebuilt totals replace; attempts
+# moves with every recorded attempt, so the fence is only set if it did not
+# change since the read. Every attempt counted later is marked live first
+# (record_attempt). Returns False while another job holds the quiz.
+def fence_quiz_stats(meta_table, quiz_id, job_id):
+    key = stats_key(quiz_id)
+    for _ in range(FENCE_RETRIES):
+        item = meta_table.get_item(Key=key, ConsistentRead=True).get('Item', {})
+        if 'regrade_job' in item:
+            return item['regrade_job'] == job_id
+
+        values = {':job': job_id, ':zero': 0, ':baseline': _counters(item)}
+        condition = 'attribute_not_exists(regrade_job) AND attribute_not_exists(attempts)'
+        if 'attempts' in item:
+            condition = 'attribute_not_exists(regrade_job) AND attempts = :attempts'
+            values[':attempts'] = item['attempts']
+        try:
+            meta_table.update_item(
+                Key=key,
+                UpdateExpression='SET regrade_job = :job, regrade_step = :zero, regrade_baseline = :baseline',
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values
+            )
+            return True
+        except Exception as e:
+            if not _is_conditional_failure(meta_table, e):
+                raise
+    raise Exception(f'Could not fence the stats of {quiz_id}: too many concurrent attempts')
+
+
+# Finish a regrade of quiz_id: rebuilt holds the totals of the attempts
+# counted before the fence, live those of the attempts marked live (regraded
+# the same way). The difference between rebuilt and the baseline is ADDed,
+# so attempts counted meanwhile are kept; min/max and the leaderboard are
+# set from both (plus live board entries submitted since the job started),
+# the fence is lifted and score_change (the change in the sum of stored
+# scores) is added to the dashboard summary in one transaction. Every step
+# is conditional on the fence, so running this again after a crash applies
+# nothing twice. Returns False if job_id no longer holds the quiz.
+def apply_rebuilt_stats(meta_table, quiz_id, job_id, rebuilt, live, score_change, started_at):
+    key = stats_key(quiz_id)
+    item = meta_table.get_item(Key=key, ConsistentRead=True).get('Item', {})
+    if item.get('regrade_job') != job_id:
+        return False
+
+    counters = _totals_counters(rebuilt)
+    baseline = item.get('regrade_baseline', {})
+    deltas = [
+        (name, counters.get(name, 0) - baseline.get(name, 0))
+        for name in sorted(set(counters) | set(baseline))
+    ]
+    deltas = [(name, n) for name, n in deltas if n]
+    chunks = [deltas[start:start + COUNTERS_PER_UPDATE] for start in range(0, len(deltas), COUNTERS_PER_UPDATE)]
+    for step in range(int(item.get('regrade_step', 0)), len(chunks)):
+        chunk = chunks[step]
+        values = {f':c{i}': n for i, (_, n) in enumerate(chunk)}
+        values.update({':job': job_id, ':step': step, ':next': step + 1})
+        meta_table.update_item(
+            Key=key,
+            UpdateExpression='ADD ' + ', '.join(f'#c{i} :c{i}' for i in range(len(chunk)))
+                             + ' SET regrade_step = :next',
+            ConditionExpression='regrade_job = :job AND regrade_step = :step',
+            ExpressionAttributeNames={f'#c{i}': name for i, (name, _) in enumerate(chunk)},
+            ExpressionAttributeValues=values
+        )
+
+    client = meta_table.meta.client
+    bounds = {
+        'min_score': [v for v in (rebuilt['min_score'], live['min_score']) if v is not None],
+        'max_score': [v for v in (rebuilt['max_score'], live['max_score']) if v is not None],
+    }
+    for _ in range(LEADERBOARD_RETRIES):
+        # Attempts recorded live that the job did not see
+        recent = [e for e in item.get('leaderboard', []) if (e.get('submitted_at') or '') >= started_at]
+        board = merge_leaderboard(rebuilt['leaderboard'], live['leaderboard'] + recent)
+        version = item.get('lb_version', 0)
+
+        sets = ['leaderboard = :board', 'lb_version = :next']
+        removes = list(FENCE_FIELDS)
+        values = {':board': board, ':next': version + 1, ':version': version, ':job': job_id,
+                  ':steps': len(chunks)}
+        if bounds['min_score']:
+            sets += ['min_score = :min', 'max_score = :max']
+            values.update({':min': min(bounds['min_score']), ':max': max(bounds['max_score'])})
+        else:
+            removes += ['min_score', 'max_score']
+        actions = [{'Update': {
+            'TableName': meta_table.name,
+            'Key': key,
+            'UpdateExpression': f"SET {', '.join(sets)} REMOVE {', '.join(removes)}",
+            'ConditionExpression': 'regrade_job = :job AND regrade_step = :steps AND '
+                                   '(attribute_not_exists(lb_version) OR lb_version = :version)',
+            'ExpressionAttributeValues': values,
+        }}]
+        if score_change:
+            actions.append({'Update': {
+                'TableName': meta_table.name,
+                'Key': {'meta_key': SUMMARY_KEY},
+                'UpdateExpression': 'ADD score_sum :change',
+                'ExpressionAttributeValues': {':change': score_change},
+            }})
+        try:
+            client.transact_write_items(TransactItems=actions)
+            return True
+        except client.exceptions.TransactionCanceledException:
+            # A live leaderboard update moved lb_version: merge its board
+            item = meta_table.get_item(Key=key, ConsistentRead=True).get('Item', {})
+            if item.get('regrade_job') != job_id:
+                return False
+    raise Exception(f'Could not finish the stats of {quiz_id}: leaderboard kept changing')
@@ -0,0 +1,76 @@
+import os
+from quiz_common.batch import batch_get
+
+# Site-wide counters for the admin dashboard live in QuizMeta under
+# "summary" (questions, quizzes, attempts, score_sum, max_score_sum), kept up
+# to date with ADD by the handlers that write those tables. The latest
+# submissions sit in a ring buffer item "recent": slot#<n % size> holds the
+# n-th submission, so recording one never reads or rewrites the others.
+SUMMARY_KEY = 'summary'
+RECENT_KEY = 'recent'
+SLOT_PREFIX = 'slot#'
+
+RECENT_SUBMISSIONS = int(os.environ.get('RECENT_SUBMISSIONS', 20))
+
+COUNTERS = ('questions', 'quizzes', 'attempts', 'score_sum', 'max_score_sum')
+
+
+# ADD the given deltas to the summary counters, e.g. questions=-3
+def add_counts(meta_table, **deltas):
+    deltas = {name: n for name, n in deltas.items() if n}
+    if not deltas:
+        return
+    meta_table.update_item(
+        Key={'meta_key': SUMMARY_KEY},
+        UpdateExpression='ADD ' + ', '.join(f'#{name} :{name}' for name in deltas),
+        ExpressionAttributeNames={f'#{name}': name for name in deltas},
+        ExpressionAttributeValues={f':{name}': n for name, n in deltas.items()}
+    )
+
+
+# Count one graded submission and put it in the ring buffer. The attempts
+# counter returned by the first update numbers the submission, which picks
+# its slot and lets readers order the slots.
+def record_submission(meta_table, score, max_score, entry):
+    counts = meta_table.update_item(
+        Key={'meta_key': SUMMARY_KEY},
+        UpdateExpression='ADD attempts :one, score_sum :score, max_score_sum :max',
+        ExpressionAttributeValues={':one': 1, ':score': score, ':max': max_score},
+        ReturnValues='UPDATED_NEW'
+    )['Attributes']
+    sequence = int(counts['attempts'])
+    meta_table.update_item(
+        Key={'meta_key': RECENT_KEY},
+        UpdateExpression='SET #slot = :entry',
+        ExpressionAttributeNames={'#slot': f'{SLOT_PREFIX}{sequence % RECENT_SUBMISSIONS}'},
+        ExpressionAttributeValues={':entry': dict(entry, score=score, max_score=max_score, seq=sequence)}
+    )
+
+
+# Counters and the latest submissions (newest first) in one BatchGetItem
+def read_summary(meta_table):
+    items = batch_get(meta_table, [SUMMARY_KEY, RECENT_KEY], 'meta_key')
+    counts = items.get(SUMMARY_KEY, {})
+    recent = [v for k, v in items.get(RECENT_KEY, {}).items() if k.startswith(SLOT_PREFIX)]
+    recent.sort(key=lambda entry: entry.get('seq', 0), reverse=True)
+
+    summary = {name: counts.get(name, 0) for name in COUNTERS}
+    attempts = summary['attempts']
+    summary['average_score'] = summary['score_sum'] / attempts if attempts else 0
+    summary['average_percent'] = (
+        summary['score_sum'] * 100 / summary['max_score_sum'] if summary['max_score_sum'] else 0
+    )
+    summary['recent'] = recent[:RECENT_SUBMISSIONS]
+    return summary
+
+
+# Replace the counters and ring buffer with values rebuilt from the tables
+def write_summary(meta_table, counts, recent):
+    item = {'meta_key': SUMMARY_KEY}
+    item.update({name: counts.get(name, 0) for name in COUNTERS})
+    meta_table.put_item(Item=item)
+
+    ring = {'meta_key': RECENT_KEY}
+    for entry in recent[:RECENT_SUBMISSIONS]:
+        ring[f"{SLOT_PREFIX}{entry['seq'] % RECENT_SUBMISSIONS}"] = entry
+    meta_table.put_item(Item=ring)
@@ -0,0 +1,78 @@
+"""Fixtures for the handler tests: moto-backed tables from benchmarks/standin.py.
+
+    pip install boto3 moto pytest
+    python -m pytest -q "Lambda Functions/tests"
+"""
+import contextlib
+import io
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import standin  # noqa: E402
+
+standin.prepare_environment()
+
+
+def _reset_clients():
+    import quiz_common.aws
+    quiz_common.aws._config = None
+    quiz_common.aws._dynamodb = None
+    quiz_common.aws._clients.clear()
+    quiz_common.aws._retry_defaults.update(mode='standard', max_attempts=5)
+
+
+# The tables from the README on a fresh moto backend, with the shared
+# clients rebuilt so handlers loaded by the test talk to it
+@pytest.fixture
+def dynamodb():
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+    with moto.mock_aws():
+        _reset_clients()
+        resource = boto3.resource('dynamodb')
+        standin.create_tables(resource)
+        yield resource
+    _reset_clients()
+
+
+# DynamoDB calls made through the handlers' shared client, by operation
+@pytest.fixture
+def calls(dynamodb):
+    import quiz_common.aws
+    return standin.count_calls(quiz_common.aws.dynamodb_resource().meta.client)
+
+
+# Load a handler as a fresh module (its warm cache starts empty)
+@pytest.fixture
+def handler(dynamodb):
+    return standin.load_handler
+
+
+# Call a handler with the metric log lines kept out of the test output;
+# returns the status and the decoded body
+def invoke(module, event, entry='lambda_handler'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = getattr(module, entry)(event, None)
+    body = result.get('body')
+    return result['statusCode'], json.loads(body) if body else None
+
+
+def create_quiz(module, question_ids, **fields):
+    quiz = {'title': 'Quiz', 'topic': 'topic-0', 'duration': 30, 'marks': len(question_ids) or 1,
+            'question_ids': question_ids}
+    quiz.update(fields)
+    status, body = invoke(module, standin.admin_event('POST', quiz))
+    assert status == 200, body
+    return body['quiz_id']
+
+
+def put_questions(dynamodb, count):
+    with dynamodb.Table('QuestionBank').batch_writer() as batch:
+        for i in range(count):
+            batch.put_item(Item=standin.question(i))
+    return [standin.question(i)['question_id'] for i in range(count)]
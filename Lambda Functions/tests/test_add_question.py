@@ -0,0 +1,47 @@
+import standin
+from conftest import create_quiz, invoke, put_questions
+
+
+def _replacement(i, **fields):
+    question = standin.question(i)
+    question.update(fields)
+    return question
+
+
+def _check_quiz_follows(handler, quiz_id, question_id, text, answer):
+    status, body = invoke(handler('user/getQuizQuestions'),
+                          standin.user_event('s@example.com', params={'quiz_id': quiz_id}))
+    assert status == 200
+    served = {q['question_id']: q for q in body['questions']}
+    assert served[question_id]['question_text'] == text
+    assert 'answer' not in served[question_id]
+
+    status, body = invoke(handler('user/submitQuiz'), standin.user_event(
+        's@example.com', 'POST', {'quiz_id': quiz_id, 'answers': {question_id: answer}}))
+    assert status == 200 and body['score'] == 1
+
+
+def test_bulk_replace_syncs_quizzes(dynamodb, handler):
+    question_ids = put_questions(dynamodb, 3)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+
+    options = dict(standin.question(1)['options'], **{'4': 'A new option'})
+    replaced = _replacement(1, question_text='Reworded question', options=options, answer='A new option')
+    status, body = invoke(handler('admin/addQuestion'), standin.admin_event('POST', [replaced]))
+    assert status == 200 and body['imported'] == 1
+
+    _check_quiz_follows(handler, quiz_id, question_ids[1], 'Reworded question', 'A new option')
+    quiz = dynamodb.Table('Quizzes').get_item(Key={'quiz_id': quiz_id})['Item']
+    assert 'A new option' in quiz['choices'][question_ids[1]]
+
+
+def test_single_replace_syncs_quizzes(dynamodb, handler):
+    question_ids = put_questions(dynamodb, 3)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+
+    answer = standin.question(2)['options']['3']   # was option 2
+    replaced = _replacement(2, question_text='Changed text', answer=answer)
+    status, _ = invoke(handler('admin/addQuestion'), standin.admin_event('POST', replaced))
+    assert status == 200
+
+    _check_quiz_follows(handler, quiz_id, question_ids[2], 'Changed text', answer)
@@ -0,0 +1,52 @@
+import standin
+from conftest import create_quiz, invoke, put_questions
+
+
+def _rebuild(module, next_token=None):
+    body = {'rebuild': True, 'next_token': next_token}
+    return invoke(module, standin.admin_event('POST', body))
+
+
+def test_rebuild_is_paged_and_resumable(dynamodb, handler, calls):
+    question_ids = put_questions(dynamodb, 12)
+    quiz_ids = [create_quiz(handler('admin/createQuiz'), question_ids[q * 4:q * 4 + 4]) for q in range(3)]
+    submit = handler('user/submitQuiz')
+    for s in range(25):
+        quiz_id = quiz_ids[s % 3]
+        answers = {qid: standin.question(i)['answer'] for i, qid in enumerate(question_ids) if s % 2}
+        answers = answers or {question_ids[0]: 'wrong'}
+        status, _ = invoke(submit, standin.user_event(f's{s}@example.com', 'POST',
+                                                      {'quiz_id': quiz_id, 'answers': answers}))
+        assert status == 200
+
+    module = handler('admin/dashboardSummary')
+    status, expected = invoke(module, standin.admin_event('GET'))
+    assert status == 200
+    # Counters drifted
+    dynamodb.Table('QuizMeta').put_item(Item={'meta_key': 'summary', 'attempts': 3, 'score_sum': 1})
+
+    module.REBUILD_PAGE_SIZE = 7
+    token, rounds = None, 0
+    while True:
+        calls.clear()
+        status, body = _rebuild(module, token)
+        assert status == 200, body
+        assert calls.get('Scan', 0) == 1    # one page per call
+        rounds += 1
+        if token:
+            # A retry of a call whose response was lost counts nothing twice
+            assert _rebuild(module, token)[1] == body
+        token = body['next_token']
+        if token is None:
+            break
+    assert rounds == 2 + 4     # QuestionBank, Quizzes, four pages of Results
+
+    status, summary = invoke(module, standin.admin_event('GET'))
+    # Questions were seeded straight into the table, so only the rebuild counts them
+    assert summary['questions'] == 12
+    for name in ('quizzes', 'attempts', 'score_sum', 'max_score_sum'):
+        assert summary[name] == expected[name], name
+    assert summary['attempts'] == 25
+    assert [e['result_id'] for e in summary['recent']] == [e['result_id'] for e in expected['recent']]
+
+    assert _rebuild(module, 'bogus')[0] == 400
@@ -0,0 +1,97 @@
+import contextlib
+import io
+import math
+
+import pytest
+import standin
+from conftest import create_quiz, invoke, put_questions
+
+SIZES = [5, 50, 100, 250]
+
+
+def _quizzes(dynamodb, handler):
+    question_ids = put_questions(dynamodb, max(SIZES))
+    create = handler('admin/createQuiz')
+    return {size: create_quiz(create, question_ids[:size]) for size in SIZES}
+
+
+def _cold_calls(handler, calls, quiz_id):
+    module = handler('user/getQuizQuestions')
+    calls.clear()
+    status, body = invoke(module, standin.user_event('s@example.com', params={'quiz_id': quiz_id}))
+    assert status == 200
+    return dict(calls), body
+
+
+def test_snapshot_round_trips_do_not_grow_with_quiz_size(dynamodb, handler, calls):
+    quizzes = _quizzes(dynamodb, handler)
+    seen = {}
+    for size, quiz_id in quizzes.items():
+        seen[size], body = _cold_calls(handler, calls, quiz_id)
+        assert len(body['questions']) == size
+    # catalog version + one snapshot Query, whatever the size
+    assert all(counts == {'GetItem': 1, 'Query': 1} for counts in seen.values()), seen
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_table_path_batches_questions(dynamodb, handler, calls, size):
+    quizzes = _quizzes(dynamodb, handler)
+    from quiz_common.snapshots import delete_snapshot
+    delete_snapshot(dynamodb.Table('QuizSnapshots'), quizzes[size])
+
+    counts, body = _cold_calls(handler, calls, quizzes[size])
+    # One BatchGetItem per 100 questions instead of one GetItem per question
+    assert counts == {'GetItem': 2, 'Query': 1, 'BatchGetItem': math.ceil(size / 100)}
+    assert [q['question_id'] for q in body['questions']] == body['metadata']['question_ids']
+    assert all('answer' not in q for q in body['questions'])
+
+
+def _fetch(module, quiz_id, email, tag=None):
+    event = standin.user_event(email, params={'quiz_id': quiz_id})
+    if tag:
+        event['headers'] = {'If-None-Match': tag}
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = module.lambda_handler(event, None)
+    return result['statusCode'], result['headers']
+
+
+def test_only_pooled_quizzes_are_tagged_per_student(dynamodb, handler):
+    # Through addQuestion, so the topic postings pools draw from exist
+    questions = [standin.question(i) for i in range(20)]
+    status, _ = invoke(handler('admin/addQuestion'), standin.admin_event('POST', questions))
+    assert status == 200
+    question_ids = [q['question_id'] for q in questions]
+    create = handler('admin/createQuiz')
+    shared = create_quiz(create, question_ids[:5])
+    pooled = create_quiz(create, [], pools=[{'topic': 'topic-1', 'count': 2}])
+    module = handler('user/getQuizQuestions')
+
+    # Served from the shared snapshot: one tag for everyone, but only the
+    # browser may keep authenticated quiz content
+    _, first = _fetch(module, shared, 'a@example.com')
+    _, second = _fetch(module, shared, 'b@example.com')
+    assert first['ETag'] == second['ETag']
+    assert first['Cache-Control'].startswith('private')
+    status, headers = _fetch(module, shared, 'b@example.com', first['ETag'])
+    assert status == 304 and headers['Cache-Control'].startswith('private')
+
+    _, first = _fetch(module, pooled, 'a@example.com')
+    _, second = _fetch(module, pooled, 'b@example.com')
+    assert first['ETag'] != second['ETag']
+    assert first['Cache-Control'].startswith('private')
+    assert _fetch(module, pooled, 'a@example.com', first['ETag'])[0] == 304
+    assert _fetch(module, pooled, 'b@example.com', first['ETag'])[0] == 200
+
+
+def test_wildcard_only_matches_an_existing_quiz(dynamodb, handler):
+    quiz_id = create_quiz(handler('admin/createQuiz'), put_questions(dynamodb, 5))
+    module = handler('user/getQuizQuestions')
+    assert _fetch(module, quiz_id, 'a@example.com', '*')[0] == 304
+    assert _fetch(module, 'quiz-missing', 'a@example.com', '*')[0] == 404
+
+    # Also when the quiz has no snapshot to find it by (a cold container)
+    from quiz_common.snapshots import delete_snapshot
+    delete_snapshot(dynamodb.Table('QuizSnapshots'), quiz_id)
+    module = handler('user/getQuizQuestions')
+    assert _fetch(module, quiz_id, 'a@example.com', '*')[0] == 304
+    assert _fetch(module, 'quiz-missing', 'a@example.com', '*')[0] == 404
@@ -0,0 +1,48 @@
+import contextlib
+import io
+import json
+
+import standin
+from conftest import create_quiz, put_questions
+
+
+# Run a handler and return its response and the EMF record it logged
+def _invoke_logged(module, event):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        result = module.lambda_handler(event, None)
+    records = [json.loads(line) for line in out.getvalue().splitlines() if line.startswith('{"_aws"')]
+    assert len(records) == 1
+    return result, records[0]
+
+
+def test_submit_logs_one_emf_record(dynamodb, handler, calls):
+    question_ids = put_questions(dynamodb, 10)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+    answers = {qid: standin.question(i)['answer'] for i, qid in enumerate(question_ids)}
+
+    calls.clear()
+    result, record = _invoke_logged(handler('user/submitQuiz'), standin.user_event(
+        's@example.com', 'POST', {'quiz_id': quiz_id, 'answers': answers}))
+    assert result['statusCode'] == 200
+
+    assert record['FunctionName'] == 'submitQuiz' and record['StatusCode'] == 200
+    assert record['DynamoDBCalls'] == sum(calls.values())
+    assert record['Calls'] == {f'dynamodb.{op}': n for op, n in calls.items()}
+    assert record['ReadCapacityUnits'] > 0 and record['WriteCapacityUnits'] > 0
+    assert {'Quizzes', 'Results', 'QuizMeta'} <= set(record['CapacityByTable'])
+    for name in ('AuthMs', 'ReadMs', 'GradeMs', 'WriteMs', 'StatsMs', 'SerializeMs', 'DurationMs'):
+        assert record[name] >= 0, name
+
+    # Every value is declared as a metric for CloudWatch to extract
+    declared = {m['Name'] for m in record['_aws']['CloudWatchMetrics'][0]['Metrics']}
+    assert {'AuthMs', 'DynamoDBCalls', 'ReadCapacityUnits', 'WriteCapacityUnits'} <= declared
+
+
+def test_rejected_request_logs_auth_phase(dynamodb, handler):
+    event = standin.admin_event('GET', params={'quiz_id': 'quiz-1'})
+    event['requestContext']['authorizer']['claims'] = {'cognito:groups': 'Students'}
+    result, record = _invoke_logged(handler('admin/quizStats'), event)
+    assert result['statusCode'] == 403
+    assert record['StatusCode'] == 403 and 'AuthMs' in record
+    assert record['DynamoDBCalls'] == 0 and 'ReadMs' not in record
@@ -0,0 +1,147 @@
+import standin
+from conftest import create_quiz, invoke, put_questions
+
+
+NEW_ANSWER = standin.question(0)['options']['3']
+
+
+# Answers question 0 with option 3 when new, the questions in right correctly
+# and the rest wrong
+def _submit(handler, quiz_id, question_ids, email, right, new=False):
+    answers = {qid: standin.question(i)['answer'] if i in right else 'wrong'
+               for i, qid in enumerate(question_ids)}
+    if new:
+        answers[question_ids[0]] = NEW_ANSWER
+    status, body = invoke(handler('user/submitQuiz'), standin.user_event(
+        email, 'POST', {'quiz_id': quiz_id, 'answers': answers}))
+    assert status == 200, body
+
+
+def _quiz_with_attempts(dynamodb, handler, students=12):
+    question_ids = put_questions(dynamodb, 4)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+    for s in range(students):
+        _submit(handler, quiz_id, question_ids, f's{s}@example.com', right={0, s % 4}, new=s % 3 == 0)
+    # Question 0's answer is fixed to option 3: s0, s3, s6 and s9 gain a mark,
+    # the others lose one
+    status, _ = invoke(handler('admin/viewQuestions'), standin.admin_event(
+        'PUT', {'question_id': question_ids[0], 'answer': NEW_ANSWER}))
+    assert status == 200
+    return quiz_id, question_ids
+
+
+def _regrade(handler, body, module=None):
+    status, result = invoke(module or handler('admin/regradeQuiz'), standin.admin_event('POST', body))
+    assert status == 200, result
+    return result
+
+
+# The aggregate and the dashboard's score_sum must match the stored results
+def _assert_consistent(dynamodb, quiz_id):
+    results = [r for r in dynamodb.Table('Results').scan()['Items'] if r['quiz_id'] == quiz_id]
+    meta = dynamodb.Table('QuizMeta')
+    stats = meta.get_item(Key={'meta_key': f'stats#{quiz_id}'})['Item']
+    assert not {'regrade_job', 'regrade_step', 'regrade_baseline'} & set(stats)
+    assert stats['attempts'] == len(results)
+    assert stats['score_sum'] == sum(r['score'] for r in results)
+    assert sum(v for k, v in stats.items() if k.startswith('hist#')) == len(results)
+    assert stats['min_score'] == min(r['score'] for r in results)
+    assert stats['max_score'] == max(r['score'] for r in results)
+    summary = meta.get_item(Key={'meta_key': 'summary'})['Item']
+    assert summary['score_sum'] == sum(r['score'] for r in dynamodb.Table('Results').scan()['Items'])
+    return stats
+
+
+def test_regrade_rebuilds_stats_and_summary(dynamodb, handler):
+    quiz_id, question_ids = _quiz_with_attempts(dynamodb, handler)
+    job = _regrade(handler, {'quiz_ids': [quiz_id]})
+    assert job['status'] == 'done' and job['changed'] == 12
+
+    stats = _assert_consistent(dynamodb, quiz_id)
+    assert stats[f'correct#{question_ids[0]}'] == 4
+
+
+def test_attempts_during_regrade_are_kept(dynamodb, handler):
+    quiz_id, question_ids = _quiz_with_attempts(dynamodb, handler)
+    module = handler('admin/regradeQuiz')
+    late = iter(range(100, 200))
+
+    # Students keep submitting after the scan and while the job applies the
+    # rebuilt aggregate
+    def submitting(function):
+        def wrapper(*args, **kwargs):
+            for _ in range(3):
+                _submit(handler, quiz_id, question_ids, f's{next(late)}@example.com', right={1, 2, 3},
+                        new=True)
+            return function(*args, **kwargs)
+        return wrapper
+    module.query_since = submitting(module.query_since)
+    module.apply_rebuilt_stats = submitting(module.apply_rebuilt_stats)
+
+    assert _regrade(handler, {'quiz_ids': [quiz_id]}, module)['status'] == 'done'
+    stats = _assert_consistent(dynamodb, quiz_id)
+    assert stats['attempts'] == 18
+    assert stats[f'correct#{question_ids[0]}'] == 4 + 6
+    assert [e['score'] for e in stats['leaderboard'][:6]] == [4] * 6
+
+
+def test_interrupted_regrade_applies_score_change_once(dynamodb, handler):
+    quiz_id, _ = _quiz_with_attempts(dynamodb, handler)
+    module = handler('admin/regradeQuiz')
+    write_changed = module.write_changed
+
+    # The invocation dies after rewriting scores, before saving its checkpoint
+    def crash(changed):
+        write_changed(changed)
+        raise RuntimeError('Task timed out')
+    module.write_changed = crash
+    status, _ = invoke(module, standin.admin_event('POST', {'quiz_ids': [quiz_id]}))
+    assert status == 500
+    job_id = dynamodb.Table('QuizMeta').scan(
+        FilterExpression='begins_with(meta_key, :p)', ExpressionAttributeValues={':p': 'regrade#'}
+    )['Items'][0]['meta_key'][len('regrade#'):]
+
+    module.write_changed = write_changed
+    assert _regrade(handler, {'job_id': job_id}, module)['status'] == 'done'
+    _assert_consistent(dynamodb, quiz_id)
+    # Finishing again changes nothing
+    assert _regrade(handler, {'job_id': job_id}, module)['status'] == 'done'
+    _assert_consistent(dynamodb, quiz_id)
+
+
+def test_non_scalar_answers_are_graded_wrong(dynamodb, handler):
+    quiz_id, question_ids = _quiz_with_attempts(dynamodb, handler, students=4)
+    for email, answer in (('list@example.com', [NEW_ANSWER]), ('map@example.com', {'k': 1})):
+        status, body = invoke(handler('user/submitQuiz'), standin.user_event(
+            email, 'POST', {'quiz_id': quiz_id, 'answers': {question_ids[0]: answer}}))
+        assert status == 200 and body['score'] == 0
+
+    job = _regrade(handler, {'quiz_ids': [quiz_id]})
+    assert job['status'] == 'done' and not job['failed']
+    stats = _assert_consistent(dynamodb, quiz_id)
+    assert stats['attempts'] == 6
+
+
+def test_write_back_leaves_concurrent_writes_alone(dynamodb, handler):
+    _quiz_with_attempts(dynamodb, handler, students=4)
+    module = handler('admin/regradeQuiz')
+    results = dynamodb.Table('Results')
+    read = sorted(results.scan()['Items'], key=lambda r: r['result_id'])
+    changed = [{'result_id': r['result_id'], 'quiz_id': r['quiz_id'], 'score_read': r['score'],
+                'score': 7, 'regrade_job': 'job', 'score_before_regrade': r['score']} for r in read]
+
+    # After the results were read, one gets a new score and another a
+    # submitted_at backfill
+    results.update_item(Key={'result_id': read[0]['result_id']}, UpdateExpression='SET score = :s',
+                        ExpressionAttributeValues={':s': 99})
+    results.update_item(Key={'result_id': read[1]['result_id']}, UpdateExpression='SET submitted_at = :at',
+                        ExpressionAttributeValues={':at': '1970-01-01T00:00:00'})
+
+    written, failed, skipped = module.write_changed(changed)
+    assert (written, failed, skipped) == (3, [], [read[0]['result_id']])
+    stored = {r['result_id']: r for r in results.scan()['Items']}
+    assert stored[read[0]['result_id']]['score'] == 99
+    assert 'regrade_job' not in stored[read[0]['result_id']]
+    backfilled = stored[read[1]['result_id']]
+    assert backfilled['score'] == 7 and backfilled['submitted_at'] == '1970-01-01T00:00:00'
+    assert backfilled['user_email'] == read[1]['user_email'] and 'regraded_at' in backfilled
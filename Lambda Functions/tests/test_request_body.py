@@ -0,0 +1,36 @@
+import base64
+
+import standin
+from conftest import create_quiz, invoke, put_questions
+
+
+# What API Gateway sends when the API has */* as a binary media type
+def _binary(event):
+    body = event['body'].encode('utf-8')
+    return dict(event, body=base64.b64encode(body).decode('ascii'), isBase64Encoded=True)
+
+
+def test_base64_request_bodies_are_decoded(dynamodb, handler):
+    question_ids = put_questions(dynamodb, 3)
+    quiz = {'title': 'Binary', 'topic': 'topic-0', 'duration': 10, 'marks': 3, 'question_ids': question_ids}
+    status, body = invoke(handler('admin/createQuiz'), _binary(standin.admin_event('POST', quiz)))
+    assert status == 200, body
+
+    answers = {qid: standin.question(i)['answer'] for i, qid in enumerate(question_ids)}
+    event = standin.user_event('s@example.com', 'POST', {'quiz_id': body['quiz_id'], 'answers': answers})
+    status, body = invoke(handler('user/submitQuiz'), _binary(event))
+    assert status == 200 and body['score'] == 3
+
+    update = {'question_id': question_ids[0], 'question_text': 'Edited'}
+    status, _ = invoke(handler('admin/viewQuestions'), _binary(standin.admin_event('PUT', update)))
+    assert status == 200
+    stored = dynamodb.Table('QuestionBank').get_item(Key={'question_id': question_ids[0]})['Item']
+    assert stored['question_text'] == 'Edited'
+
+
+def test_base64_admin_commands_are_decoded(dynamodb, handler):
+    quiz_id = create_quiz(handler('admin/createQuiz'), put_questions(dynamodb, 2))
+    status, body = invoke(handler('admin/dashboardSummary'), _binary(standin.admin_event('POST', {'rebuild': True})))
+    assert status == 200, body
+    status, body = invoke(handler('admin/regradeQuiz'), _binary(standin.admin_event('POST', {'quiz_id': quiz_id})))
+    assert status == 200 and body['quiz_ids'] == [quiz_id]
@@ -0,0 +1,149 @@
+import contextlib
+import io
+
+import standin
+from conftest import create_quiz, invoke, put_questions
+
+
+def _submit(module, quiz_id, answers, email='s@example.com', headers=None):
+    event = standin.user_event(email, 'POST', {'quiz_id': quiz_id, 'answers': answers})
+    if headers:
+        event['headers'] = headers
+    return invoke(module, event)
+
+
+def test_grades_from_compiled_key_in_one_read(dynamodb, handler, calls):
+    question_ids = put_questions(dynamodb, 30)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+    answers = {qid: standin.question(i)['answer'] for i, qid in enumerate(question_ids)}
+    answers[question_ids[0]] = '  ' + answers[question_ids[0]].upper() + ' '
+    answers[question_ids[1]] = 'wrong'
+
+    module = handler('user/submitQuiz')
+    calls.clear()
+    status, body = _submit(module, quiz_id, answers)
+    assert status == 200
+    assert body['score'] == 29
+    # catalog version + quiz item, whatever the number of questions
+    assert calls['GetItem'] == 2 and 'BatchGetItem' not in calls
+
+
+def test_legacy_quiz_key_is_batch_loaded_once(dynamodb, handler, calls):
+    question_ids = put_questions(dynamodb, 150)
+    dynamodb.Table('Quizzes').put_item(Item={
+        'quiz_id': 'quiz-legacy', 'title': 'Old', 'topic': 'topic-0', 'duration': 30, 'marks': 150,
+        'question_ids': question_ids,
+    })
+    answers = {qid: standin.question(i)['answer'] for i, qid in enumerate(question_ids)}
+
+    module = handler('user/submitQuiz')
+    calls.clear()
+    status, body = _submit(module, 'quiz-legacy', answers)
+    assert status == 200 and body['score'] == 150
+    # Two BatchGetItem calls for 150 answers, two more for the choices, never
+    # one GetItem per question
+    assert calls['BatchGetItem'] == 4 and calls['GetItem'] == 2
+
+    stored = dynamodb.Table('Quizzes').get_item(Key={'quiz_id': 'quiz-legacy'})['Item']
+    assert len(stored['answer_key']) == 150
+    calls.clear()
+    status, body = _submit(module, 'quiz-legacy', answers, email='t@example.com')
+    assert body['score'] == 150 and 'BatchGetItem' not in calls
+
+
+def test_idempotent_resubmission_saves_one_result(dynamodb, handler):
+    question_ids = put_questions(dynamodb, 5)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+    module = handler('user/submitQuiz')
+    answers = {qid: 'wrong' for qid in question_ids}
+    headers = {'Idempotency-Key': 'attempt-0001'}
+
+    first = _submit(module, quiz_id, answers, headers=headers)
+    second = _submit(module, quiz_id, answers, headers=headers)
+    assert first[1]['result_id'] == second[1]['result_id']
+    assert (first[1]['replayed'], second[1]['replayed']) == (False, True)
+    assert dynamodb.Table('Results').scan()['Count'] == 1
+
+
+class _Context:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+def _counted(dynamodb, quiz_id):
+    meta = dynamodb.Table('QuizMeta')
+    stats = meta.get_item(Key={'meta_key': f'stats#{quiz_id}'}).get('Item', {})
+    summary = meta.get_item(Key={'meta_key': 'summary'}).get('Item', {})
+    return stats.get('attempts', 0), summary.get('attempts', 0)
+
+
+def test_put_retried_after_lost_response_is_counted(dynamodb, handler):
+    question_ids = put_questions(dynamodb, 5)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+    module = handler('user/submitQuiz')
+    table = module.results_table
+    put_item = table.put_item
+
+    # The first try is saved but its response is lost; the SDK's retry then
+    # fails the condition
+    def lost_response(**kwargs):
+        put_item(**kwargs)
+        return put_item(**kwargs)
+    table.put_item = lost_response
+    try:
+        status, body = _submit(module, quiz_id, {qid: 'wrong' for qid in question_ids},
+                               headers={'Idempotency-Key': 'attempt-0002'})
+    finally:
+        del table.put_item
+    assert status == 200 and body['replayed']
+    assert _counted(dynamodb, quiz_id) == (1, 1)
+
+
+def test_replay_finishes_counters_of_a_dead_invocation(dynamodb, handler):
+    question_ids = put_questions(dynamodb, 5)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+    module = handler('user/submitQuiz')
+    event = standin.user_event('s@example.com', 'POST', {
+        'quiz_id': quiz_id, 'answers': {qid: 'wrong' for qid in question_ids}})
+    event['headers'] = {'Idempotency-Key': 'attempt-0003'}
+
+    # The invocation times out between the put and the counters
+    def timed_out(*args, **kwargs):
+        raise RuntimeError('Task timed out')
+    record_counters = module.record_counters
+    module.record_counters = timed_out
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert module.lambda_handler(event, _Context(0))['statusCode'] == 500
+    module.record_counters = record_counters
+    assert _counted(dynamodb, quiz_id) == (0, 0)
+
+    for _ in range(2):
+        status, body = invoke(module, event)
+        assert status == 200 and body['replayed']
+    assert _counted(dynamodb, quiz_id) == (1, 1)
+
+
+def test_replay_leaves_counters_to_a_running_invocation(dynamodb, handler):
+    question_ids = put_questions(dynamodb, 5)
+    quiz_id = create_quiz(handler('admin/createQuiz'), question_ids)
+    module = handler('user/submitQuiz')
+    headers = {'Idempotency-Key': 'attempt-0004'}
+    answers = {qid: 'wrong' for qid in question_ids}
+
+    # A client retry arrives while the first invocation is between its put
+    # and its counters
+    record_counters = module.record_counters
+
+    def retried_meanwhile(*args, **kwargs):
+        module.record_counters = record_counters
+        assert _submit(module, quiz_id, answers, headers=headers)[1]['replayed']
+        return record_counters(*args, **kwargs)
+    module.record_counters = retried_meanwhile
+    status, body = _submit(module, quiz_id, answers, headers=headers)
+    assert status == 200 and not body['replayed']
+    assert _counted(dynamodb, quiz_id) == (1, 1)
+    stored = dynamodb.Table('Results').scan()['Items'][0]
+    assert stored['stats_recorded'] and stored['summary_recorded'] and 'stats_until' not in stored
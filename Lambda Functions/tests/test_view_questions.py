@@ -0,0 +1,33 @@
+import pytest
+import standin
+from conftest import invoke, put_questions
+
+
+@pytest.mark.parametrize('method, body', [
+    ('PUT', {'updates': 'q-000001'}),
+    ('PUT', ['q-000001']),
+    ('DELETE', {'question_ids': 'q-000001'}),
+    ('DELETE', [{'question_id': 'q-000001'}]),
+    ('DELETE', {}),
+])
+def test_malformed_bodies_are_rejected(dynamodb, handler, method, body):
+    put_questions(dynamodb, 2)
+    status, result = invoke(handler('admin/viewQuestions'), standin.admin_event(method, body))
+    assert status == 400, result
+    assert dynamodb.Table('QuestionBank').scan()['Count'] == 2
+
+
+def test_failed_single_delete_is_reported(dynamodb, handler, monkeypatch):
+    put_questions(dynamodb, 2)
+    module = handler('admin/viewQuestions')
+    monkeypatch.setattr(module, 'batch_write', lambda table, requests, key: {
+        request['DeleteRequest']['Key']['question_id']: 'ProvisionedThroughputExceededException'
+        for request in requests
+    })
+    status, result = invoke(module, standin.admin_event('DELETE', {'question_id': 'q-000001'}))
+    assert status == 500 and result['error'] == 'ProvisionedThroughputExceededException'
+
+    monkeypatch.undo()
+    status, _ = invoke(module, standin.admin_event('DELETE', {'question_id': 'q-000001'}))
+    assert status == 200
+    assert dynamodb.Table('QuestionBank').scan()['Count'] == 1
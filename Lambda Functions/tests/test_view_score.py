@@ -0,0 +1,75 @@
+import pytest
+import standin
+from conftest import invoke
+
+STUDENT = 'student0@example.com'
+
+
+def _fill_results(dynamodb, others, own=30):
+    with dynamodb.Table('Results').batch_writer() as batch:
+        for i in range(others):
+            batch.put_item(Item={
+                'result_id': f'res-o{i:06d}', 'quiz_id': f'quiz-{i % 7}', 'user_email': f'other{i % 500}@example.com',
+                'score': 1, 'submitted_at': f'2025-02-01T00:{i // 60 % 60:02d}:{i % 60:02d}',
+            })
+        for i in range(own):
+            batch.put_item(Item={
+                'result_id': f'res-s{i:04d}', 'quiz_id': f'quiz-{i % 3}', 'user_email': STUDENT,
+                'score': i, 'submitted_at': f'2025-03-01T10:00:{i:02d}',
+            })
+
+
+def _pages(module, **params):
+    pages, token = [], None
+    while True:
+        query = dict(params, next_token=token) if token else dict(params)
+        status, body = invoke(module, standin.user_event(STUDENT, params=query))
+        assert status == 200, body
+        pages.append(body['results'])
+        token = body['next_token']
+        if not token:
+            return pages
+
+
+# Reads go to the user's index partition only, so the calls per page are the
+# same with 200 or 5000 other results in the table
+@pytest.mark.parametrize('others', [200, 5000])
+def test_reads_do_not_depend_on_table_size(dynamodb, handler, calls, others):
+    _fill_results(dynamodb, others)
+    module = handler('user/viewScore')
+    calls.clear()
+    pages = _pages(module, limit='10')
+    assert [len(page) for page in pages] == [10, 10, 10]
+    assert calls['Query'] == 3 and 'Scan' not in calls
+    submitted = [item['submitted_at'] for page in pages for item in page]
+    assert submitted == sorted(submitted, reverse=True)
+
+
+def test_quiz_filter_fills_pages(dynamodb, handler):
+    _fill_results(dynamodb, 100)
+    pages = _pages(handler('user/viewScore'), limit='4', quiz_id='quiz-1')
+    results = [item for page in pages for item in page]
+    assert len(results) == 10 and all(item['quiz_id'] == 'quiz-1' for item in results)
+    assert [len(page) for page in pages[:2]] == [4, 4]
+
+
+def test_backfill_makes_undated_results_visible(dynamodb, handler):
+    _fill_results(dynamodb, 0, own=3)
+    with dynamodb.Table('Results').batch_writer() as batch:
+        for i in range(5):
+            batch.put_item(Item={'result_id': f'res-old{i}', 'quiz_id': 'quiz-0', 'user_email': STUDENT, 'score': 2})
+    module = handler('user/viewScore')
+    assert sum(map(len, _pages(module))) == 3
+
+    scores = handler('admin/viewScores')
+    token, updated = None, 0
+    while True:
+        status, body = invoke(scores, standin.admin_event('POST', {'backfill': True, 'next_token': token}))
+        assert status == 200
+        updated += body['updated']
+        token = body['next_token']
+        if not token:
+            break
+    assert updated == 5
+    results = [item for page in _pages(module) for item in page]
+    assert len(results) == 8 and results[-1]['submitted_at'] == '1970-01-01T00:00:00'
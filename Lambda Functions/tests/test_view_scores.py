@@ -0,0 +1,50 @@
+import standin
+from conftest import invoke
+
+
+def _fill_results(dynamodb, count):
+    with dynamodb.Table('Results').batch_writer() as batch:
+        for i in range(count):
+            batch.put_item(Item={
+                'result_id': f'res-{i:06d}', 'quiz_id': f'quiz-{i % 7}', 'user_email': f'student{i}@example.com',
+                'score': i % 20, 'submitted_at': f'2025-02-01T00:{i // 60 % 60:02d}:{i % 60:02d}',
+                'answers': {f'q-{q:06d}': f'Option {q % 4} for question {q}' for q in range(20)},
+            })
+
+
+def _export(module, **params):
+    chunks, token = [], None
+    while True:
+        query = dict(params, mode='export', next_token=token) if token else dict(params, mode='export')
+        result = module.lambda_handler(standin.admin_event(params=query), None)
+        assert result['statusCode'] == 200, result['body']
+        chunks.append(result['body'])
+        token = result['headers'].get('X-Next-Token')
+        if not token:
+            return chunks
+
+
+def test_export_chunks_stay_within_the_byte_budget(dynamodb, handler, monkeypatch):
+    _fill_results(dynamodb, 600)
+    module = handler('admin/viewScores')
+    monkeypatch.setattr(module, 'EXPORT_CHUNK_BYTES', 20_000)
+    monkeypatch.setattr(module, 'EXPORT_SEGMENTS', 2)
+
+    chunks = _export(module)
+    assert len(chunks) > 10
+    assert all(len(chunk.encode('utf-8')) <= 20_000 for chunk in chunks)
+    lines = [line for chunk in chunks for line in chunk.splitlines()]
+    # Every result exactly once, however the pages were cut
+    assert len(lines) == len(set(lines)) == 600
+
+
+def test_oversized_row_still_makes_progress(dynamodb, handler, monkeypatch):
+    _fill_results(dynamodb, 5)
+    module = handler('admin/viewScores')
+    monkeypatch.setattr(module, 'EXPORT_CHUNK_BYTES', 100)
+    monkeypatch.setattr(module, 'EXPORT_SEGMENTS', 1)
+
+    chunks = _export(module, format='csv')
+    assert len(chunks) == 5
+    status, _ = invoke(module, standin.admin_event(params={'mode': 'export', 'format': 'xml'}))
+    assert status == 400
@@ -0,0 +1,40 @@
+import math
+
+import pytest
+import standin
+from conftest import invoke
+
+
+@pytest.fixture
+def cognito(dynamodb, monkeypatch):
+    import boto3
+    import quiz_common.aws
+    monkeypatch.delenv('USER_POOL_ID', raising=False)
+    client = boto3.client('cognito-idp')
+    yield client, standin.count_calls(quiz_common.aws.client('cognito-idp'))
+
+
+@pytest.mark.parametrize('users', [10, 250])
+def test_calls_grow_per_page_not_per_user(cognito, handler, users):
+    client, calls = cognito
+    standin.create_user_pool(client, users)
+    module = handler('admin/viewUsers')
+
+    status, body = invoke(module, standin.admin_event(params={'limit': '1000'}))
+    assert status == 200 and body['total'] == users
+    # list_users and list_users_in_group page at 60; one list_groups
+    pages = math.ceil(users / 60)
+    assert calls == {
+        'ListUsers': pages,
+        'ListGroups': 1,
+        'ListUsersInGroup': 1 + math.ceil((users - 1) / 60),
+    }
+    assert 'AdminListGroupsForUser' not in calls and pages < users
+    groups = {user['username']: user['group'] for user in body['users']}
+    assert groups['student0'] == 'Admins' and groups['student1'] == 'Students'
+
+    # Paging and repeat requests are served from the warm cache
+    calls.clear()
+    status, body = invoke(module, standin.admin_event(params={'limit': '7'}))
+    assert len(body['users']) == 7 and body['next_token']
+    assert not calls
@@ -1,59 +1,109 @@
-import boto3
-import json
-from decimal import Decimal
- 
-dynamodb = boto3.resource('dynamodb')
-quiz_table = dynamodb.Table('Quizzes')
-question_table = dynamodb.Table('QuestionBank')
- 
-# Helper function to convert Decimal → int/float recursively
-def decimal_to_native(obj):
-    if isinstance(obj, list):
-        return [decimal_to_native(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: decimal_to_native(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        # Convert to int if no fractional part
-        return int(obj) if obj % 1 == 0 else float(obj)
-    else:
-        return obj
- 
- 
-def lambda_handler(event, context):
-    try:
-        quiz_id = event.get('queryStringParameters', {}).get('quiz_id')
-        if not quiz_id:
-            return {'statusCode': 400, 'body': json.dumps({'error': 'quiz_id is required'})}
- 
-        # Get quiz metadata
-        quiz_data = quiz_table.get_item(Key={'quiz_id': quiz_id}).get('Item')
-        if not quiz_data:
-            return {'statusCode': 404, 'body': json.dumps({'error': 'Quiz not found'})}
- 
-        # Fetch all questions
-        question_ids = quiz_data.get('question_ids', [])
-        questions = []
-        for qid in question_ids:
-            q = question_table.get_item(Key={'question_id': qid}).get('Item')
-            if q:
-                questions.append(q)
- 
-        # Convert Decimal to int/float safely
-        result = decimal_to_native({
-            'quiz_id': quiz_id,
-            'metadata': quiz_data,
-            'questions': questions
-        })
- 
-        return {
-            'statusCode': 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            'body': json.dumps(result)
-        }
- 
-    except Exception as e:
-        return {'statusCode': 500, 'body': json.dumps({'error': str(e)})}
+import os
+from quiz_common.aws import lazy_table
+from quiz_common.batch import batch_get
+from quiz_common.cache import QuizCache
+from quiz_common.metrics import instrumented, phase, set_property
+from quiz_common.pools import load_pools, sample_question_ids
+from quiz_common.responses import (
+    cache_headers, etag, not_modified, not_modified_response, raw_response, response,
+)
+from quiz_common.snapshots import read_snapshot, student_view
+ 
+quiz_table = lazy_table('Quizzes')
+question_table = lazy_table('QuestionBank')
+meta_table = lazy_table('QuizMeta')
+snapshot_table = lazy_table('QuizSnapshots')
+ 
+# Module scope so warm containers reuse quizzes and questions between invocations
+cache = QuizCache()
+ 
+MAX_AGE = int(os.environ.get('CACHE_CONTROL_MAX_AGE', 60))
+ 
+# Serve questions from the warm cache and batch-load only the missing ones
+def get_questions(question_ids):
+    found = {}
+    missing = []
+    for qid in question_ids:
+        question = cache.get(f'question:{qid}')
+        if question is None:
+            missing.append(qid)
+        else:
+            found[qid] = question
+ 
+    for qid, question in batch_get(question_table, missing, 'question_id').items():
+        cache.set(f'question:{qid}', question)
+        found[qid] = question
+ 
+    return [found[qid] for qid in question_ids if qid in found]
+ 
+ 
+@instrumented('getQuizQuestions')
+def lambda_handler(event, context):
+    try:
+        quiz_id = event.get('queryStringParameters', {}).get('quiz_id')
+        if not quiz_id:
+            return response(400, {'error': 'quiz_id is required'})
+ 
+        # Pooled quizzes give every student their own questions
+        with phase('auth'):
+            claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+            user_email = claims.get('email', '')
+ 
+        # Drop cached entries if an admin changed quizzes or questions
+        version = cache.sync_version(meta_table)
+ 
+        # Every quiz or question write bumps the version, so a matching tag
+        # is answered with a 304 before the quiz or its questions are read.
+        # Only pooled quizzes differ per student, so only their tag includes
+        # the student. Either tag can match, as the quiz cannot have changed
+        # kind without a new version. "*" waits until the quiz is found.
+        shared_tag = etag('quiz', version, quiz_id)
+        student_tag = etag('quiz', version, quiz_id, user_email)
+        for tag in (shared_tag, student_tag):
+            if not_modified(event, tag, exists=False):
+                return not_modified_response(tag, MAX_AGE)
+ 
+        # Non-pooled quizzes are served from their published snapshot as is.
+        # '' in the cache marks a quiz without one (pooled, or not rebuilt yet).
+        with phase('read'):
+            body = cache.get(f'snapshot:{quiz_id}')
+            if body is None:
+                body = read_snapshot(snapshot_table, quiz_id) or ''
+                cache.set(f'snapshot:{quiz_id}', body)
+        if body:
+            set_property('snapshot', True)
+            if not_modified(event, shared_tag):
+                return not_modified_response(shared_tag, MAX_AGE)
+            return raw_response(200, body, headers=cache_headers(shared_tag, MAX_AGE))
+ 
+        with phase('read'):
+            # Get quiz metadata
+            quiz_data = cache.get(f'quiz:{quiz_id}')
+            if quiz_data is None:
+                quiz_data = quiz_table.get_item(Key={'quiz_id': quiz_id}).get('Item')
+                if not quiz_data:
+                    return response(404, {'error': 'Quiz not found'})
+                cache.set(f'quiz:{quiz_id}', quiz_data)
+ 
+            # Fetch all questions, drawing this student's share of each pool
+            question_ids = quiz_data.get('question_ids', [])
+            if quiz_data.get('pools') and not user_email:
+                return response(401, {'error': 'Sign in to take this quiz'})
+            tag = student_tag if quiz_data.get('pools') else shared_tag
+            if not_modified(event, tag):
+                return not_modified_response(tag, MAX_AGE)
+            if quiz_data.get('pools'):
+                pools = cache.get(f'pools:{quiz_id}')
+                if pools is None:
+                    pools = load_pools(meta_table, quiz_data)
+                    cache.set(f'pools:{quiz_id}', pools)
+                question_ids = sample_question_ids(quiz_data, pools, user_email)
+            questions = get_questions(question_ids)
+        set_property('cache', cache.stats())
+ 
+        # Decimals are converted while the response is serialized
+        return response(200, student_view(quiz_data, question_ids, questions),
+                        headers=cache_headers(tag, MAX_AGE))
+ 
+    except Exception as e:
+        return response(500, {'error': str(e)})
@@ -1,36 +1,82 @@
-import json
-import boto3
-from decimal import Decimal
- 
-class DecimalEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, Decimal):
-            if o % 1 == 0:
-                return int(o)
-            else:
-                return float(o)
-        return super(DecimalEncoder, self).default(o)
- 
-def lambda_handler(event, context):
-    try:
-        dynamodb = boto3.resource("dynamodb")
-        table = dynamodb.Table("Quizzes")
- 
-        response = table.scan()
-        quizzes = response.get("Items", [])
- 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Authorization, Content-Type",
-                "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
-            },
-            "body": json.dumps({"quizzes": quizzes}, cls=DecimalEncoder)
-        }
- 
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+import os
+from boto3.dynamodb.conditions import Key
+from quiz_common.aws import lazy_table
+from quiz_common.cache import QuizCache
+from quiz_common.metrics import instrumented, phase, set_property
+from quiz_common.pagination import decode_token, encode_token, page_limit
+from quiz_common.responses import cache_headers, etag, not_modified, not_modified_response, response
+ 
+TOPIC_INDEX = os.environ.get("QUIZ_TOPIC_INDEX", "topic-created_at-index")
+MAX_AGE = int(os.environ.get("CACHE_CONTROL_MAX_AGE", 60))
+ 
+table = lazy_table("Quizzes")
+meta_table = lazy_table("QuizMeta")
+ 
+# Only the catalog fields; question_ids and answer keys stay out of the list
+CATALOG_FIELDS = ("quiz_id", "title", "topic", "duration", "marks", "created_at")
+ 
+# Module scope so warm containers reuse catalog pages between invocations
+cache = QuizCache()
+ 
+ 
+# One page of the catalog. With a topic this is a Query on the topic GSI
+# (newest first) instead of a filtered scan of the whole table.
+def fetch_page(table, topic, limit, start_key):
+    kwargs = {
+        "Limit": limit,
+        "ProjectionExpression": ", ".join(f"#f{i}" for i in range(len(CATALOG_FIELDS))),
+        "ExpressionAttributeNames": {f"#f{i}": name for i, name in enumerate(CATALOG_FIELDS)},
+    }
+    if start_key:
+        kwargs["ExclusiveStartKey"] = start_key
+ 
+    if topic:
+        page = table.query(
+            IndexName=TOPIC_INDEX,
+            KeyConditionExpression=Key("topic").eq(topic),
+            ScanIndexForward=False,
+            **kwargs
+        )
+    else:
+        page = table.scan(**kwargs)
+ 
+    return page.get("Items", []), page.get("LastEvaluatedKey")
+ 
+ 
+@instrumented("listQuizzes")
+def lambda_handler(event, context):
+    try:
+        params = event.get("queryStringParameters") or {}
+        topic = params.get("topic")
+        token = params.get("next_token")
+        try:
+            limit = page_limit(params)
+            start_key = decode_token(token)
+        except ValueError as e:
+            return response(400, {"error": str(e)})
+ 
+        # Only re-read when an admin changed the catalog or the entry expired
+        version = cache.sync_version(meta_table)
+ 
+        # A page only changes when the catalog version does, so a client
+        # holding this tag gets a 304 without any read of the Quizzes table
+        tag = etag("catalog", version, topic or "", limit, token or "")
+        if not_modified(event, tag):
+            return not_modified_response(tag, MAX_AGE)
+ 
+        cache_key = f"catalog:{topic or ''}:{limit}:{token or ''}"
+        page = cache.get(cache_key)
+        if page is None:
+            with phase("read"):
+                page = fetch_page(table, topic, limit, start_key)
+            cache.set(cache_key, page)
+        quizzes, last_key = page
+        set_property("cache", cache.stats())
+ 
+        return response(200, {
+            "quizzes": quizzes,
+            "next_token": encode_token(last_key)
+        }, headers=cache_headers(tag, MAX_AGE))
+ 
+    except Exception as e:
+        return response(500, {"error": str(e)})
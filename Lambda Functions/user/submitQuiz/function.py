@@ -1,99 +1,392 @@
-import json
-import boto3
-import decimal
-import uuid
- 
-dynamodb = boto3.resource('dynamodb')
-quizzes_table = dynamodb.Table('Quizzes')
-questions_table = dynamodb.Table('QuestionBank')
-results_table = dynamodb.Table('Results')
- 
-def decimal_to_native(obj):
-    if isinstance(obj, list):
-        return [decimal_to_native(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: decimal_to_native(v) for k, v in obj.items()}
-    elif isinstance(obj, decimal.Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    else:
-        return obj
- 
-def lambda_handler(event, context):
-    try:
-        # Parse body
-        body = json.loads(event.get('body', '{}'))
-        quiz_id = body.get('quiz_id')
-        user_answers = body.get('answers', {})
- 
-        if not quiz_id or not user_answers:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Missing quiz_id or answers"})
-            }
- 
-        # Extract user info
-        claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
-        user_email = claims.get('email', 'unknown@example.com')
-        user_name = claims.get('name', 'Anonymous User')
- 
-        # Get quiz info
-        quiz = quizzes_table.get_item(Key={'quiz_id': quiz_id}).get('Item')
-        if not quiz:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"error": "Quiz not found"})
-            }
- 
-        # Retrieve question details & calculate score
-        question_ids = quiz.get('question_ids', [])
-        total_score = 0
-        correct_count = 0
- 
-        correct_answers_map = {}  # NEW — stores correct answers to send to frontend
- 
-        for qid in question_ids:
-            question_item = questions_table.get_item(Key={'question_id': qid}).get('Item')
-            if not question_item:
-                continue
- 
-            correct_answer = question_item.get('answer', '')
-            correct_answers_map[qid] = correct_answer  # Store correct answer
- 
-            # Compare user vs correct
-            if correct_answer.strip().lower() == str(user_answers.get(qid, '')).strip().lower():
-                correct_count += 1
-                total_score += quiz.get('marks_per_question', 1)
- 
-        # Save result
-        result_id = f"res-{str(uuid.uuid4())[:8]}"
-        results_table.put_item(Item={
-            'result_id': result_id,
-            'quiz_id': quiz_id,
-            'user_email': user_email,
-            'user_name': user_name,
-            'answers': user_answers,
-            'score': total_score
-        })
- 
-        # Now returning correct answers map to frontend
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                "Access-Control-Allow-Methods": "OPTIONS,POST"
-            },
-            "body": json.dumps({
-                "message": "Quiz submitted successfully",
-                "quiz_id": quiz_id,
-                "score": total_score,
-                "correct_answers": correct_answers_map,  # NOT count, actual answers
-                "result_id": result_id
-            })
-        }
- 
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime, timedelta
+from quiz_common.answers import (
+    OTHER_FIELD, PACKED_FIELD, compile_answer_key, normalize_answer, pack_answers, question_choices,
+)
+from quiz_common.aws import lazy_client, lazy_table, set_retry_defaults
+from quiz_common.batch import batch_get
+from quiz_common.cache import QuizCache
+from quiz_common.metrics import instrumented, phase, set_property
+from quiz_common.pools import load_pools, sample_question_ids
+from quiz_common.responses import json_body, request_header, response
+from quiz_common.retry import is_throttle
+from quiz_common.stats import LIVE_MARK, record_attempt
+from quiz_common.summary import record_submission
+ 
+# Deadline bursts throttle the Results table: adaptive mode slows this
+# client down instead of spending its retries at full rate
+set_retry_defaults(mode='adaptive', max_attempts=8)
+ 
+quizzes_table = lazy_table('Quizzes')
+questions_table = lazy_table('QuestionBank')
+results_table = lazy_table('Results')
+meta_table = lazy_table('QuizMeta')
+sqs = lazy_client('sqs')
+ 
+# Module scope so warm containers reuse quiz items (and their answer keys)
+cache = QuizCache()
+ 
+# "packed" stores answers as choice indices (quiz_common.answers), "raw" as
+# the submitted map
+RESULT_ENCODING = os.environ.get('RESULT_ENCODING', 'packed')
+ 
+# "sync" grades in the request; "buffered" queues the submission on
+# SUBMISSION_QUEUE_URL and queue_handler grades it
+SUBMIT_MODE = os.environ.get('SUBMIT_MODE', 'sync')
+QUEUE_URL = os.environ.get('SUBMISSION_QUEUE_URL')
+RETRY_AFTER_SECONDS = int(os.environ.get('RETRY_AFTER_SECONDS', 2))
+ 
+IDEMPOTENCY_KEY = re.compile(r'^[A-Za-z0-9._:-]{8,128}$')
+ 
+# Set on the result once its quiz stats and dashboard summary were updated
+COUNTER_FLAGS = ('stats_recorded', 'summary_recorded')
+# How long a caller without a Lambda context may take to update them
+DEFAULT_DEADLINE_SECONDS = 60
+ 
+# Answer key compiled onto the quiz by createQuiz. Quizzes created before that
+# get theirs built once from QuestionBank and saved back for later submissions.
+def load_answer_key(quiz):
+    if 'answer_key' in quiz:
+        return quiz['answer_key'], quiz.get('correct_answers', {})
+ 
+    question_ids = quiz.get('question_ids', [])
+    questions = batch_get(questions_table, question_ids, 'question_id',
+                          projection=('question_id', 'answer'))
+    answer_key, correct_answers, _ = compile_answer_key(question_ids, questions)
+ 
+    quizzes_table.update_item(
+        Key={'quiz_id': quiz['quiz_id']},
+        UpdateExpression='SET answer_key = :key, correct_answers = :answers',
+        ExpressionAttributeValues={':key': answer_key, ':answers': correct_answers}
+    )
+    # Update the (possibly cached) quiz item so this is only done once
+    quiz['answer_key'] = answer_key
+    quiz['correct_answers'] = correct_answers
+    return answer_key, correct_answers
+ 
+# Choices compiled onto the quiz by createQuiz. Older quizzes get theirs
+# built once from QuestionBank; if_not_exists keeps a list another
+# submission already saved (and possibly appended to).
+def load_choices(quiz):
+    if 'choices' in quiz:
+        return quiz['choices']
+ 
+    questions = batch_get(questions_table, quiz.get('question_ids', []), 'question_id',
+                          projection=('question_id', 'options'))
+    choices = {qid: question_choices(question) for qid, question in questions.items()}
+    saved = quizzes_table.update_item(
+        Key={'quiz_id': quiz['quiz_id']},
+        UpdateExpression='SET choices = if_not_exists(choices, :choices)',
+        ExpressionAttributeValues={':choices': choices},
+        ReturnValues='UPDATED_NEW'
+    )['Attributes']['choices']
+    quiz['choices'] = saved
+    return saved
+ 
+# Answer key for one student's draw of a pooled quiz: the quiz's compiled key
+# for its fixed questions, plus the drawn pool questions' answers read from
+# QuestionBank (and kept in the warm cache)
+def pooled_answer_key(quiz, user_email):
+    pools = cache.get(f"pools:{quiz['quiz_id']}")
+    if pools is None:
+        pools = load_pools(meta_table, quiz)
+        cache.set(f"pools:{quiz['quiz_id']}", pools)
+    question_ids = sample_question_ids(quiz, pools, user_email)
+ 
+    answers = dict(quiz.get('correct_answers', {}))
+    missing = []
+    for qid in question_ids:
+        if qid not in answers:
+            answer = cache.get(f'answer:{qid}')
+            if answer is None:
+                missing.append(qid)
+            else:
+                answers[qid] = answer
+    for qid, item in batch_get(questions_table, missing, 'question_id',
+                               projection=('question_id', 'answer')).items():
+        answers[qid] = item.get('answer', '')
+        cache.set(f'answer:{qid}', answers[qid])
+ 
+    correct_answers = {qid: answers[qid] for qid in question_ids if qid in answers}
+    answer_key = {qid: normalize_answer(answer) for qid, answer in correct_answers.items()}
+    return question_ids, answer_key, correct_answers
+ 
+# result_id for a submission. With an idempotency key (Idempotency-Key
+# header or "idempotency_key" in the body) it is derived from the key, the
+# user and the quiz, so a retried request maps onto the same item.
+def submission_id(event, body, user_email, quiz_id):
+    key = request_header(event, 'Idempotency-Key') or body.get('idempotency_key')
+    if not key:
+        return f"res-{str(uuid.uuid4())[:8]}"
+    if not IDEMPOTENCY_KEY.match(str(key)):
+        raise ValueError("Idempotency key must be 8-128 letters, digits or ._:-")
+    digest = hashlib.blake2b(f"{user_email}\n{quiz_id}\n{key}".encode(), digest_size=10)
+    return f"res-{digest.hexdigest()}"
+ 
+def load_quiz(quiz_id):
+    # Dropping cached quizzes if an admin changed anything
+    cache.sync_version(meta_table)
+    quiz = cache.get(f'quiz:{quiz_id}')
+    if quiz is None:
+        quiz = quizzes_table.get_item(Key={'quiz_id': quiz_id}).get('Item')
+        if quiz:
+            cache.set(f'quiz:{quiz_id}', quiz)
+    return quiz
+ 
+# Returns (score, correct question ids, max score, correct answers map)
+def grade(quiz, user_email, user_answers):
+    with phase('read'):
+        answer_key, correct_answers_map = load_answer_key(quiz)
+        question_ids = quiz.get('question_ids', [])
+        if quiz.get('pools'):
+            # The same draw getQuizQuestions served this student
+            question_ids, answer_key, correct_answers_map = pooled_answer_key(quiz, user_email)
+ 
+    # Grade against the compiled answer key
+    with phase('grade'):
+        marks_per_question = quiz.get('marks_per_question', 1)
+        total_score = 0
+        correct_qids = []
+ 
+        for qid in question_ids:
+            expected = answer_key.get(qid)
+            if expected is None:
+                continue
+ 
+            # Compare user vs correct
+            if expected == normalize_answer(user_answers.get(qid, '')):
+                correct_qids.append(qid)
+                total_score += marks_per_question
+ 
+    return total_score, correct_qids, len(answer_key) * marks_per_question, correct_answers_map
+ 
+# When this invocation is over, as an ISO string like submitted_at
+def invocation_deadline(context):
+    if context is not None:
+        remaining = timedelta(milliseconds=context.get_remaining_time_in_millis())
+    else:
+        remaining = timedelta(seconds=DEFAULT_DEADLINE_SECONDS)
+    return (datetime.utcnow() + remaining).isoformat()
+ 
+# Update the quiz stats and the dashboard summary for a saved result, each
+# unless its flag in missing says it was done, then flag what succeeded.
+# Failures are logged: the result is saved, so the submission stands.
+def record_counters(quiz, result, max_score, correct_qids, missing=COUNTER_FLAGS):
+    result_id = result['result_id']
+    done = []
+    if 'stats_recorded' in missing:
+        try:
+            with phase('stats'):
+                record_attempt(
+                    meta_table, quiz['quiz_id'], result['score'],
+                    max_score=max_score,
+                    correct_qids=correct_qids,
+                    entry={
+                        'user_email': result['user_email'],
+                        'user_name': result['user_name'],
+                        'result_id': result_id,
+                        'submitted_at': result['submitted_at']
+                    },
+                    mark_live=lambda job_id: results_table.update_item(
+                        Key={'result_id': result_id},
+                        UpdateExpression='SET #mark = :job',
+                        ExpressionAttributeNames={'#mark': LIVE_MARK},
+                        ExpressionAttributeValues={':job': job_id}
+                    )
+                )
+            done.append('stats_recorded')
+        except Exception as e:
+            print("Error updating quiz stats:", str(e))
+ 
+    # Site-wide counters and recent activity for the admin dashboard
+    if 'summary_recorded' in missing:
+        try:
+            with phase('stats'):
+                record_submission(meta_table, result['score'], max_score, {
+                    'result_id': result_id,
+                    'quiz_id': quiz['quiz_id'],
+                    'quiz_title': quiz.get('title'),
+                    'user_email': result['user_email'],
+                    'user_name': result['user_name'],
+                    'submitted_at': result['submitted_at']
+                })
+            done.append('summary_recorded')
+        except Exception as e:
+            print("Error updating summary:", str(e))
+ 
+    if not done:
+        return
+    expression = 'SET ' + ', '.join(f'{flag} = :done' for flag in done)
+    if len(done) == len(missing):
+        expression += ' REMOVE stats_owner, stats_until'
+    try:
+        with phase('write'):
+            results_table.update_item(Key={'result_id': result_id}, UpdateExpression=expression,
+                                      ExpressionAttributeValues={':done': True})
+    except Exception as e:
+        print("Error flagging counters of", result_id, str(e))
+ 
+# A result saved without its counters (the invocation died after the put,
+# or a retried put's first try had succeeded) is finished by the replay that
+# takes it over: the invocation that saved it, which stats_owner names, or
+# any once that one's stats_until deadline has passed. Results saved before
+# the flags existed have no stats_until and are never counted again.
+def finish_counters(quiz, saved, owner, deadline, max_score, correct_qids):
+    missing = [flag for flag in COUNTER_FLAGS if flag not in saved]
+    if not missing or 'stats_until' not in saved:
+        return
+    try:
+        results_table.update_item(
+            Key={'result_id': saved['result_id']},
+            UpdateExpression='SET stats_owner = :owner, stats_until = :until',
+            ConditionExpression='stats_owner = :owner OR stats_until < :now',
+            ExpressionAttributeValues={
+                ':owner': owner, ':until': deadline, ':now': datetime.utcnow().isoformat(),
+            }
+        )
+    except results_table.meta.client.exceptions.ConditionalCheckFailedException:
+        return    # the invocation that saved it may still be counting
+    record_counters(quiz, saved, max_score, correct_qids, missing)
+ 
+# Grade and save one submission. The put is conditional on result_id being
+# new, so a retry of a submission that was already saved returns the stored
+# score and does not count the attempt twice. Returns (score, correct
+# answers map, replayed).
+def process_submission(quiz, result_id, user_email, user_name, user_answers, submitted_at,
+                       deadline=None):
+    quiz_id = quiz['quiz_id']
+    owner = uuid.uuid4().hex
+    deadline = deadline or invocation_deadline(None)
+    total_score, correct_qids, max_score, correct_answers_map = grade(quiz, user_email, user_answers)
+ 
+    item = {
+        'result_id': result_id,
+        'quiz_id': quiz_id,
+        'user_email': user_email,
+        'user_name': user_name,
+        'score': total_score,
+        'submitted_at': submitted_at,  # sort key of the per-user index
+        'stats_owner': owner,
+        'stats_until': deadline
+    }
+    # Pooled draws differ per student, so they have no fixed order to
+    # pack against
+    if RESULT_ENCODING == 'packed' and not quiz.get('pools'):
+        with phase('read'):
+            choices = load_choices(quiz)
+        packed, other = pack_answers(quiz.get('question_ids', []), choices, user_answers)
+        item[PACKED_FIELD] = packed
+        if other:
+            item[OTHER_FIELD] = other
+    else:
+        item['answers'] = user_answers
+    try:
+        with phase('write'):
+            results_table.put_item(Item=item, ConditionExpression='attribute_not_exists(result_id)')
+    except results_table.meta.client.exceptions.ConditionalCheckFailedException:
+        saved = results_table.get_item(Key={'result_id': result_id}, ConsistentRead=True)['Item']
+        finish_counters(quiz, saved, owner, deadline, max_score, correct_qids)
+        return saved['score'], correct_answers_map, True
+ 
+    record_counters(quiz, item, max_score, correct_qids)
+    return total_score, correct_answers_map, False
+ 
+@instrumented('submitQuiz')
+def lambda_handler(event, context):
+    try:
+        # Parse body
+        body = json_body(event)
+        quiz_id = body.get('quiz_id')
+        user_answers = body.get('answers', {})
+ 
+        if not quiz_id or not user_answers:
+            return response(400, {"error": "Missing quiz_id or answers"}, methods="POST, OPTIONS")
+ 
+        # Extract user info
+        with phase('auth'):
+            claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+            user_email = claims.get('email', 'unknown@example.com')
+            user_name = claims.get('name', 'Anonymous User')
+ 
+        try:
+            result_id = submission_id(event, body, user_email, quiz_id)
+        except ValueError as e:
+            return response(400, {"error": str(e)}, methods="POST, OPTIONS")
+        submitted_at = datetime.utcnow().isoformat()
+ 
+        # Get quiz info
+        with phase('read'):
+            quiz = load_quiz(quiz_id)
+        set_property('cache', cache.stats())
+        if not quiz:
+            return response(404, {"error": "Quiz not found"}, methods="POST, OPTIONS")
+ 
+        # Buffered: accept now, grade in queue_handler. The score shows up
+        # in viewScore once the worker has saved the result.
+        if SUBMIT_MODE == 'buffered':
+            with phase('write'):
+                sqs.send_message(QueueUrl=QUEUE_URL, MessageBody=json.dumps({
+                    'result_id': result_id,
+                    'quiz_id': quiz_id,
+                    'user_email': user_email,
+                    'user_name': user_name,
+                    'answers': user_answers,
+                    'submitted_at': submitted_at
+                }))
+            return response(202, {
+                "message": "Quiz submission accepted",
+                "quiz_id": quiz_id,
+                "result_id": result_id,
+                "status": "pending"
+            }, methods="POST, OPTIONS")
+ 
+        total_score, correct_answers_map, replayed = process_submission(
+            quiz, result_id, user_email, user_name, user_answers, submitted_at,
+            invocation_deadline(context)
+        )
+ 
+        # Now returning correct answers map to frontend
+        return response(200, {
+            "message": "Quiz submitted successfully",
+            "quiz_id": quiz_id,
+            "score": total_score,
+            "correct_answers": correct_answers_map,  # NOT count, actual answers
+            "result_id": result_id,
+            "replayed": replayed
+        }, methods="POST, OPTIONS")
+ 
+    except Exception as e:
+        # Still throttled after the client's retries: ask the caller to come
+        # back, which is safe with an idempotency key
+        if is_throttle(e):
+            return response(503, {"error": "Too many submissions right now, please retry"},
+                            methods="POST, OPTIONS",
+                            headers={'Retry-After': str(RETRY_AFTER_SECONDS)})
+        return response(500, {"error": str(e)}, methods="POST, OPTIONS")
+ 
+# SQS worker for buffered mode (same deployment package, handler
+# function.queue_handler, ReportBatchItemFailures enabled). Takes any event
+# of the {"Records": [{"messageId", "body"}]} shape, so a local queue can
+# drive it too. Throttled messages are handed back for redelivery; a
+# redelivered message is saved once thanks to the conditional put.
+@instrumented('submitQuizWorker')
+def queue_handler(event, context):
+    failures = []
+    for record in event.get('Records', []):
+        try:
+            message = json.loads(record['body'])
+            quiz = load_quiz(message['quiz_id'])
+            if not quiz:
+                print("Dropping submission for missing quiz:", message['quiz_id'])
+                continue
+            process_submission(quiz, message['result_id'], message['user_email'],
+                               message['user_name'], message['answers'], message['submitted_at'],
+                               invocation_deadline(context))
+        except Exception as e:
+            print("Error grading submission:", record.get('messageId'), str(e))
+            failures.append({'itemIdentifier': record['messageId']})
+    return {'batchItemFailures': failures}
@@ -1,59 +1,75 @@
-import json
-import boto3
-from boto3.dynamodb.conditions import Attr
-import decimal
- 
-dynamodb = boto3.resource('dynamodb')
-results_table = dynamodb.Table('Results')
- 
-# Helper to convert Decimal -> int/float for JSON
-def decimal_to_native(obj):
-    if isinstance(obj, list):
-        return [decimal_to_native(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: decimal_to_native(v) for k, v in obj.items()}
-    elif isinstance(obj, decimal.Decimal):
-        return int(obj) if obj % 1 == 0 else float(obj)
-    else:
-        return obj
- 
-def lambda_handler(event, context):
-    try:
-        # Extract user info from token
-        claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
-        user_email = claims.get('email')
-        user_name = claims.get('name')
- 
-        if not user_email:
-            return {
-                "statusCode": 403,
-                "body": json.dumps({"error": "Unauthorized - no email found in token"})
-            }
- 
-        # Query items by filtering user_email
-        response = results_table.scan(
-            FilterExpression=Attr('user_email').eq(user_email)
-        )
- 
-        items = response.get('Items', [])
-        items = decimal_to_native(items)
- 
-        return {
-            "statusCode": 200,
-            "headers": {
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Content-Type,Authorization",
-                "Access-Control-Allow-Methods": "OPTIONS,GET"
-            },
-            "body": json.dumps({
-                "user": user_name,
-                "email": user_email,
-                "results": items
-            })
-        }
- 
-    except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+import os
+from boto3.dynamodb.conditions import Attr, Key
+from quiz_common.answers import AnswerDecoder
+from quiz_common.aws import lazy_table
+from quiz_common.metrics import instrumented, phase
+from quiz_common.pagination import decode_token, encode_token, page_limit
+from quiz_common.responses import response
+ 
+results_table = lazy_table('Results')
+quiz_table = lazy_table('Quizzes')
+ 
+# GSI on Results: user_email (partition) / submitted_at (sort)
+USER_INDEX = os.environ.get('RESULTS_USER_INDEX', 'user_email-submitted_at-index')
+ 
+# With a quiz_id filter, pages the filter empties are read on until the page
+# is full, at most this many queries per request
+FILTER_MAX_ROUNDS = 10
+ 
+# One page of this user's results, newest first. quiz_id is a filter on the
+# user's partition, so the query is repeated with the remaining page size
+# until the page is full or FILTER_MAX_ROUNDS is used up; a short (even
+# empty) page with a next_token only means the user has many other results.
+def query_page(user_email, quiz_id, limit, start_key):
+    query = {
+        'IndexName': USER_INDEX,
+        'KeyConditionExpression': Key('user_email').eq(user_email),
+        'ScanIndexForward': False,
+    }
+    if quiz_id:
+        query['FilterExpression'] = Attr('quiz_id').eq(quiz_id)
+    items = []
+    for _ in range(FILTER_MAX_ROUNDS):
+        query['Limit'] = limit - len(items)
+        if start_key:
+            query['ExclusiveStartKey'] = start_key
+        page = results_table.query(**query)
+        items.extend(page.get('Items', []))
+        start_key = page.get('LastEvaluatedKey')
+        if not start_key or len(items) >= limit:
+            break
+    return items, start_key
+ 
+@instrumented('viewScore')
+def lambda_handler(event, context):
+    try:
+        # Extract user info from token
+        with phase('auth'):
+            claims = event.get('requestContext', {}).get('authorizer', {}).get('claims', {})
+            user_email = claims.get('email')
+            user_name = claims.get('name')
+ 
+            if not user_email:
+                return response(403, {"error": "Unauthorized - no email found in token"}, methods="GET, OPTIONS")
+ 
+        params = event.get('queryStringParameters') or {}
+        try:
+            limit = page_limit(params, default=20)
+            start_key = decode_token(params.get('next_token'))
+        except ValueError as e:
+            return response(400, {"error": str(e)}, methods="GET, OPTIONS")
+ 
+        # Read only this user's partition of the index
+        with phase('read'):
+            items, last_key = query_page(user_email, params.get('quiz_id'), limit, start_key)
+            items = AnswerDecoder(quiz_table).decode(items)
+ 
+        return response(200, {
+            "user": user_name,
+            "email": user_email,
+            "results": items,
+            "next_token": encode_token(last_key)
+        }, methods="GET, OPTIONS")
+ 
+    except Exception as e:
+        return response(500, {"error": str(e)}, methods="GET, OPTIONS")
@@ -7,6 +7,27 @@ export const getAuthHeaders = (idToken: string) => ({
   "Content-Type": "application/json",
 });
 
+// The list endpoints return one page and a next_token; follow it so callers
+// get the whole list. limit is the endpoint's maximum page size.
+const fetchAllPages = async (idToken: string, path: string, key: string, limit: number) => {
+  const items: unknown[] = [];
+  let token: string | null = null;
+  let data: any;
+  do {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (token) params.set("next_token", token);
+    const response = await fetch(`${API_BASE_URL}${path}?${params}`, {
+      method: "GET",
+      headers: getAuthHeaders(idToken),
+    });
+    data = await response.json();
+    if (!response.ok) return data;
+    items.push(...(data[key] || []));
+    token = data.next_token || null;
+  } while (token);
+  return { ...data, [key]: items, next_token: null };
+};
+
 // Admin APIs
 export const adminApi = {
   addQuestion: async (idToken: string, questionData: {
@@ -40,21 +61,9 @@ export const adminApi = {
     return response.json();
   },
 
-  viewUsers: async (idToken: string) => {
-    const response = await fetch(`${API_BASE_URL}/admin/viewUsers`, {
-      method: "GET",
-      headers: getAuthHeaders(idToken),
-    });
-    return response.json();
-  },
+  viewUsers: async (idToken: string) => fetchAllPages(idToken, "/admin/viewUsers", "users", 1000),
 
-  viewScores: async (idToken: string) => {
-    const response = await fetch(`${API_BASE_URL}/admin/viewScores`, {
-      method: "GET",
-      headers: getAuthHeaders(idToken),
-    });
-    return response.json();
-  },
+  viewScores: async (idToken: string) => fetchAllPages(idToken, "/admin/viewScores", "results", 1000),
 
   viewQuestions: async (idToken: string) => {
     const response = await fetch(`${API_BASE_URL}/admin/viewQuestions`, {
@@ -90,13 +99,7 @@ export const adminApi = {
 
 // User APIs
 export const userApi = {
-  listQuizzes: async (idToken: string) => {
-    const response = await fetch(`${API_BASE_URL}/user/listQuizzes`, {
-      method: "GET",
-      headers: getAuthHeaders(idToken),
-    });
-    return response.json();
-  },
+  listQuizzes: async (idToken: string) => fetchAllPages(idToken, "/user/listQuizzes", "quizzes", 100),
 
   getQuizQuestions: async (idToken: string, quizId: string) => {
     const response = await fetch(`${API_BASE_URL}/user/getQuizQuestions?quiz_id=${quizId}`, {
@@ -106,23 +109,30 @@ export const userApi = {
     return response.json();
   },
 
-  submitQuiz: async (idToken: string, quizId: string, answers: Record<string, string>) => {
-    const response = await fetch(`${API_BASE_URL}/user/submitQuiz`, {
-      method: "POST",
-      headers: getAuthHeaders(idToken),
-      body: JSON.stringify({
-        quiz_id: quizId,
-        answers,
-      }),
-    });
-    return response.json();
-  },
+  // The idempotency key identifies one quiz attempt, so resending it (a retry
+  // after a 503 or a network error) never records the attempt twice
+  submitQuiz: async (idToken: string, quizId: string, answers: Record<string, string>, idempotencyKey?: string) => {
+    const headers: Record<string, string> = getAuthHeaders(idToken);
+    if (idempotencyKey) headers["Idempotency-Key"] = idempotencyKey;
+    const body = JSON.stringify({ quiz_id: quizId, answers });
 
-  viewScore: async (idToken: string) => {
-    const response = await fetch(`${API_BASE_URL}/user/viewScore`, {
-      method: "GET",
-      headers: getAuthHeaders(idToken),
-    });
-    return response.json();
+    for (let attempt = 0; ; attempt++) {
+      let response: Response;
+      try {
+        response = await fetch(`${API_BASE_URL}/user/submitQuiz`, { method: "POST", headers, body });
+      } catch (error) {
+        // The request may have been saved before the connection dropped
+        if (!idempotencyKey || attempt >= 4) throw error;
+        await new Promise((resolve) => setTimeout(resolve, 1000 * (0.5 + Math.random())));
+        continue;
+      }
+      if (response.status !== 503 || !idempotencyKey || attempt >= 4) {
+        return response.json();
+      }
+      const retryAfter = Number(response.headers.get("Retry-After")) || 1;
+      await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000 * (0.5 + Math.random())));
+    }
   },
+
+  viewScore: async (idToken: string) => fetchAllPages(idToken, "/user/viewScore", "results", 100),
 };
@@ -38,6 +38,7 @@ const User = () => {
   const [correctAnswers, setCorrectAnswers] = useState<Record<string, string>>({});
   const [timeLeft, setTimeLeft] = useState<number>(0);
   const hasSubmittedRef = useRef(false);
+  const attemptKeyRef = useRef("");
 
   const loadQuizzes = async () => {
     setLoading(true);
@@ -65,6 +66,7 @@ const User = () => {
     setQuizResult(null);
     setTimeLeft(quiz.duration * 60); // Convert minutes to seconds
     hasSubmittedRef.current = false;
+    attemptKeyRef.current = crypto.randomUUID();
 
     try {
       const idToken = auth.user?.id_token;
@@ -101,7 +103,7 @@ const User = () => {
         formattedAnswers[q.question_id] = selectedKey ? q.options[selectedKey] : "";
       });
 
-      const result = await userApi.submitQuiz(idToken, selectedQuiz.quiz_id, formattedAnswers);
+      const result = await userApi.submitQuiz(idToken, selectedQuiz.quiz_id, formattedAnswers, attemptKeyRef.current);
 
       // Store correct answers for review
       const correctAns: Record<string, string> = {};